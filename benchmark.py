@@ -1,27 +1,34 @@
-import distro
+import argparse
+import functools
+import json
+import os
 
 from datetime import datetime
 
+VERSION = "1.0.0"
+
 SCORED = 0
 NOTSCORED = 0
 PASS = 0
 FAILED = 0
 
-from utils import unused_filesystems, pretty_print
-
-def create_env_file(os_info: dict):
-    filename = ".env"
+def create_env_file(os_info: dict, filename: str = ".env"):
     env_content = "\n".join([f"{key.upper().replace('_', '')}='{value}'" for key, value in os_info.items()])
     with open(filename, "w") as f:
         f.write(env_content)
 
+@functools.lru_cache(maxsize=None)
 def get_os_info() -> dict[str, str]:
-    """Get the OS information required to check for compatible versions
+    """Get the OS information required to check for compatible versions.
+    It is detected once per process.
 
     Returns:
         dict[str, str]: It contains information such as OS type (eg: ubuntu),
         OS version and OS codename.
     """
+    # Only needed once the checks are about to run
+    import distro
+
     os_type = distro.id()
     os_version = distro.version()
     os_codename = distro.codename()
@@ -32,20 +39,246 @@ def get_os_info() -> dict[str, str]:
         "os_codename": os_codename
     }
 
-    create_env_file(os_info)
-
     return os_info
 
+def get_root_os_info(root: str) -> dict[str, str]:
+    """Get the OS information of the system found under `root`, from its
+    os-release file, as `get_os_info` does for the running host."""
+    from utils import probes
+
+    fields = {}
+    for path in ("etc/os-release", "usr/lib/os-release"):
+        text = probes.read_text(os.path.join(root, path))
+        if text is None:
+            continue
+        for line in text.splitlines():
+            key, sep, value = line.partition("=")
+            if sep:
+                fields[key.strip()] = value.strip().strip("'\"")
+        break
+
+    return {
+        "os_type": fields.get("ID", ""),
+        "os_version": fields.get("VERSION_ID", ""),
+        "os_codename": fields.get("VERSION_CODENAME", ""),
+    }
+
+def is_supported(os_info: dict[str, str]) -> bool:
+    return os_info['os_version'] == '22.04' and os_info['os_type'] == 'ubuntu'
+
+def parse_args() -> argparse.Namespace:
+    # The defaults and choices are spelled out rather than taken from the
+    # utils modules, so that --help and --version do not import the checks
+    parser = argparse.ArgumentParser(description="CIS Benchmarking Checklist")
+    parser.add_argument("--version", action="version", version=f"%(prog)s {VERSION}")
+    parser.add_argument(
+        "-j", "--jobs", type=int, default=1,
+        help="number of checks, or of roots with several --root, to run in parallel (default: 1)"
+    )
+    parser.add_argument(
+        "--root", action="append", dest="roots", metavar="PATH",
+        help="check the system found at PATH (eg: a mounted disk image) instead of this host (repeatable)"
+    )
+    parser.add_argument(
+        "-s", "--section", action="append", dest="sections", metavar="SECTION",
+        help="only run this section and its subsections (repeatable)"
+    )
+    parser.add_argument(
+        "--level", type=int, choices=(1, 2), default=None,
+        help="only run the checks of this profile level"
+    )
+    parser.add_argument(
+        "--profile", choices=("server", "workstation"), default=None,
+        help="only run the checks of this profile"
+    )
+    parser.add_argument(
+        "--list", action="store_true",
+        help="list the selected checks and exit"
+    )
+    parser.add_argument(
+        "-q", "--quiet", action="store_true",
+        help="do not print the evidence of the checks, only the checks that are not compliant"
+    )
+    parser.add_argument(
+        "--format", choices=("text", "json"), default="text",
+        help="console output: the evidence of every check (text) or one JSON record per check (json)"
+    )
+    parser.add_argument(
+        "--jsonl", nargs="?", const="unused_filesystems_output.jsonl", default=None, metavar="PATH",
+        help="stream one JSON record per check to PATH (default: unused_filesystems_output.jsonl)"
+    )
+    parser.add_argument(
+        "--history", metavar="PATH", default=None,
+        help="store the results of the run in the SQLite history database PATH"
+    )
+    parser.add_argument(
+        "--diff", action="store_true",
+        help="only print the status changes and new evidence since the previous run in --history"
+    )
+    parser.add_argument(
+        "--scan-cache", metavar="PATH", default=None,
+        help="cache directory state at PATH to scan world-writable directories incrementally"
+    )
+    parser.add_argument(
+        "--full-scan", action="store_true",
+        help="ignore the scan cache for this run and refresh it"
+    )
+    archive = parser.add_mutually_exclusive_group()
+    archive.add_argument(
+        "--record", metavar="PATH", default=None,
+        help="save every command, file read and walk of the run to the probe archive PATH"
+    )
+    archive.add_argument(
+        "--replay", metavar="PATH", default=None,
+        help="score the host recorded in the probe archive PATH instead of this one"
+    )
+    parser.add_argument(
+        "--watch", action="store_true",
+        help="keep running and re-evaluate the checks affected by system changes"
+    )
+    parser.add_argument(
+        "--watch-interval", type=float, default=3600, metavar="SECONDS",
+        help="seconds between full re-evaluations in watch mode (default: 3600)"
+    )
+    service = parser.add_mutually_exclusive_group()
+    service.add_argument(
+        "--daemon", metavar="SOCKET", default=None,
+        help="keep the facts warm and serve the checks on the Unix socket SOCKET"
+    )
+    service.add_argument(
+        "--connect", metavar="SOCKET", default=None,
+        help="run the selected checks through the daemon listening on SOCKET, print one JSON record per check"
+    )
+    parser.add_argument(
+        "--ttl", type=float, default=None, metavar="SECONDS",
+        help="seconds after which the daemon collects every fact again (default: 300)"
+    )
+    parser.add_argument(
+        "--env-file", metavar="PATH", default=None,
+        help="write the detected OS information to PATH as KEY='value' lines"
+    )
+    parser.add_argument(
+        "--timeout", type=float, default=None,
+        help="seconds the world-writable directory scan may run, 0 for no limit (default: no limit)"
+    )
+    parser.add_argument(
+        "--deadline", type=float, default=None,
+        help="seconds after which a scan still running is stopped (default: none)"
+    )
+    args = parser.parse_args()
+    if args.diff and not args.history:
+        parser.error("--diff requires --history")
+    if args.diff and args.roots and len(args.roots) > 1:
+        parser.error("--diff cannot be combined with several --root")
+    if args.watch and (args.record or args.replay or args.roots or args.history):
+        parser.error("--watch cannot be combined with --record, --replay, --root or --history")
+    service = "--daemon" if args.daemon else "--connect" if args.connect else None
+    if service and (args.watch or args.record or args.replay or args.roots or args.history or args.jsonl):
+        parser.error(f"{service} cannot be combined with --watch, --record, --replay, --root, --history or --jsonl")
+    if args.roots and (args.replay or (args.record and len(args.roots) > 1)):
+        parser.error("--root cannot be combined with --replay, nor several of them with --record")
+    return args
+
 if __name__ == '__main__':
-    now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    pretty_print("CIS BENCHMARKING CHECKLIST 1.0.0", upper_underline=True)
-    print(f"Starting @ {now}\n")
+    args = parse_args()
+
+    from utils import commands, console, probes, registry, unused_filesystems, walker, pretty_print
+
+    if args.list:
+        for check in registry.select_checks(args.sections, args.level, args.profile):
+            print(check.heading)
+        raise SystemExit(0)
+
+    if args.connect:
+        from utils import daemon
+
+        message = {"sections": args.sections, "level": args.level, "profile": args.profile, "evidence": True}
+        try:
+            response = daemon.request(args.connect, {key: value for key, value in message.items() if value is not None})
+        except OSError as e:
+            raise SystemExit(f"Cannot reach the daemon on {args.connect}: {e}")
+        if not response["ok"]:
+            raise SystemExit(response["error"])
+        for record in response["results"]:
+            print(json.dumps(record))
+        raise SystemExit(0)
+
+    console.configure(args.format, quiet=args.quiet)
+    commands.configure(timeout=args.timeout or None, deadline=args.deadline)
+    walker.configure_cache(args.scan_cache, full_rescan=args.full_scan)
+
+    if args.roots and len(args.roots) > 1:
+        try:
+            unused_filesystems.root_output_dirs(args.roots)
+        except ValueError as e:
+            raise SystemExit(str(e))
+
+    if console.rendering():
+        now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        pretty_print(f"CIS BENCHMARKING CHECKLIST {VERSION}", upper_underline=True)
+        print(f"Starting @ {now}\n")
+
+    if args.roots and len(args.roots) > 1:
+        roots = []
+        for root in args.roots:
+            os_info = get_root_os_info(root)
+            if is_supported(os_info):
+                roots.append(root)
+            else:
+                console.error("%s: %s is currently not supported.", root, os_info['os_type'] or 'unknown OS')
+        unused_filesystems.scan_roots(
+            roots, jobs=args.jobs, sections=args.sections, level=args.level, profile=args.profile,
+            jsonl_file=args.jsonl, history_file=args.history
+        )
+        raise SystemExit(0)
+
+    root = args.roots[0] if args.roots else "/"
+
+    if args.replay:
+        archive = probes.ProbeArchive.load(args.replay)
+        probes.replay(archive)
+        os_info = archive.meta["os"]
+        # A system recorded under a root is replayed from the same paths
+        root = archive.meta.get("root", "/")
+        console.info("Replaying %s as recorded @ %s\n", archive.meta['host'], archive.meta['recorded'])
+    else:
+        os_info = get_root_os_info(root) if args.roots else get_os_info()
+        if args.record:
+            archive = probes.record({"os": os_info, "root": root})
+
+    if args.env_file:
+        create_env_file(os_info, args.env_file)
+
+    if is_supported(os_info):
+        if console.rendering():
+            print("Running Benchmark For:")
+            if root != "/":
+                print(f"System at {root}")
+            pretty_print(f"Ubuntu ({os_info['os_codename']}) {os_info['os_version']}", upper_underline=True)
 
-    os_info = get_os_info()
-    if os_info['os_version'] == '22.04' and os_info['os_type'] == 'ubuntu':
-        print("Running Benchmark For:")
-        pretty_print(f"Ubuntu ({os_info['os_codename']}) {os_info['os_version']}", upper_underline=True)
+        if args.daemon:
+            # Only imported when used, like the change monitor it relies on
+            from utils import daemon
 
-        unused_filesystems.run()
+            try:
+                daemon.serve(args.daemon, jobs=args.jobs, ttl=daemon.TTL if args.ttl is None else args.ttl)
+            except KeyboardInterrupt:
+                console.info("\nStopped serving.")
+        elif args.watch:
+            try:
+                unused_filesystems.watch(
+                    jobs=args.jobs, sections=args.sections, level=args.level, profile=args.profile,
+                    jsonl_file=args.jsonl, interval=args.watch_interval
+                )
+            except KeyboardInterrupt:
+                console.info("\nStopped watching.")
+        else:
+            unused_filesystems.run(
+                jobs=args.jobs, sections=args.sections, level=args.level, profile=args.profile,
+                jsonl_file=args.jsonl, root=root, history_file=args.history, diff=args.diff
+            )
+            if args.record:
+                archive.save(args.record)
+                console.info("Probes recorded to %s", args.record)
     else:
-        print(f"{os_info['os_type']} is currently not supported.")
\ No newline at end of file
+        console.error("%s is currently not supported.", os_info['os_type'])
\ No newline at end of file
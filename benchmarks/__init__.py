@@ -0,0 +1,3 @@
+"""
+Performance benchmark of the checklist engine, run with `python -m benchmarks`.
+"""
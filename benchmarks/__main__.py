@@ -0,0 +1,199 @@
+"""
+==========================
+Checklist Engine Benchmark
+==========================
+
+Measures how fast the checklist engine itself is, against the recorded
+fixture hosts: the latency percentiles of `unused_filesystems.run()` and of
+every check, the checks and directories handled per second and the peak
+RSS. Each fixture is measured in a fresh interpreter so that their memory
+figures do not mix.
+
+Results can be saved as a baseline and later runs compared against it. A
+metric worse than the baseline by more than the tolerance is reported as a
+regression and makes the benchmark exit with status 1.
+
+    python -m benchmarks --save-baseline              # on the release branch
+    python -m benchmarks                              # on the change
+    python -m benchmarks --fixture small-vm --scale 0.1
+"""
+
+import argparse
+import contextlib
+import json
+import math
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+from .fixtures import HOSTS, materialize
+
+from utils import unused_filesystems
+from utils.executor import run_checks
+from utils.registry import select_checks
+
+BASELINE_FILE = os.path.join(os.path.dirname(__file__), "baseline.json")
+
+WORKDIR = os.path.join(tempfile.gettempdir(), "cis-benchmark-fixtures")
+
+DEFAULT_TOLERANCE = 0.2
+
+# Latencies below this in both runs are noise and never reported as regressions
+NOISE_FLOOR_MS = 1.0
+
+def percentile(values: list[float], p: float) -> float:
+    """Nearest-rank percentile of `values`."""
+    ordered = sorted(values)
+    rank = max(1, math.ceil(p / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+def _latencies(prefix: str, durations: list[float]) -> dict[str, float]:
+    return {f"{prefix}_p{p}_ms": percentile(durations, p) * 1000 for p in (50, 90, 99)}
+
+def measure(name: str, scale: float, repeat: int, workdir: str) -> dict[str, float]:
+    """Benchmark the engine against fixture `name` in this interpreter.
+
+    Returns:
+        dict[str, float]: Metric name mapped to its value.
+    """
+    host = HOSTS[name].scaled(scale)
+    facts = materialize(host, workdir)
+    checks = select_checks()
+
+    reports = os.path.join(workdir, name, "reports")
+    os.makedirs(reports, exist_ok=True)
+    os.chdir(reports)
+
+    metrics = {}
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        for check in checks:
+            durations = []
+            for _ in range(repeat):
+                run_checks([check], facts, on_result=lambda run: durations.append(run.duration))
+            metrics.update(_latencies(f"check_{check.section}", durations))
+
+        durations = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            unused_filesystems.run(facts=facts)
+            durations.append(time.perf_counter() - start)
+
+    metrics.update(_latencies("run", durations))
+    metrics["checks_per_second"] = len(checks) / metrics["run_p50_ms"] * 1000
+    sticky = metrics.get("check_1.1.21_p50_ms")
+    if sticky:
+        metrics["directories_per_second"] = host.directories / sticky * 1000
+    metrics["peak_rss_mib"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    return metrics
+
+def _measure_in_subprocess(name: str, args: argparse.Namespace) -> dict[str, float]:
+    output = subprocess.run(
+        [
+            sys.executable, "-m", "benchmarks", "--measure", name,
+            "--scale", str(args.scale), "--repeat", str(args.repeat), "--workdir", args.workdir,
+        ],
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        stdout=subprocess.PIPE, check=True, text=True,
+    ).stdout
+    return json.loads(output)
+
+def _is_regression(metric: str, value: float, baseline: float, tolerance: float) -> bool:
+    if metric.endswith("_ms") and max(value, baseline) < NOISE_FLOOR_MS:
+        return False
+    if metric.endswith("_per_second"):
+        return value < baseline * (1 - tolerance)
+    return value > baseline * (1 + tolerance)
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    """Print every metric next to its baseline.
+
+    Returns:
+        list[str]: The regressed metrics, as `fixture: metric`.
+    """
+    regressions = []
+    for name, metrics in results.items():
+        print(f"\n{name} ({HOSTS[name].description})")
+        print(f"{'Metric':<32}{'Value':>14}{'Baseline':>14}{'Change':>10}")
+        for metric, value in metrics.items():
+            reference = baseline.get(name, {}).get(metric)
+            if reference is None:
+                print(f"{metric:<32}{value:>14.2f}{'-':>14}{'-':>10}")
+                continue
+            change = (value - reference) / reference * 100 if reference else 0.0
+            flag = ""
+            if _is_regression(metric, value, reference, tolerance):
+                flag = "  REGRESSION"
+                regressions.append(f"{name}: {metric}")
+            print(f"{metric:<32}{value:>14.2f}{reference:>14.2f}{change:>+9.1f}%{flag}")
+    return regressions
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark the checklist engine against fixture hosts")
+    parser.add_argument(
+        "--fixture", action="append", dest="fixtures", choices=sorted(HOSTS), metavar="NAME",
+        help=f"only benchmark this fixture (repeatable, default: all of {', '.join(sorted(HOSTS))})"
+    )
+    parser.add_argument(
+        "--scale", type=float, default=1.0,
+        help="multiply the number of fixture directories by this factor (default: 1.0)"
+    )
+    parser.add_argument(
+        "--repeat", type=int, default=5,
+        help="runs of each check and of the whole checklist per fixture (default: 5)"
+    )
+    parser.add_argument(
+        "--workdir", default=WORKDIR,
+        help=f"directory the fixtures are generated in and reused from (default: {WORKDIR})"
+    )
+    parser.add_argument(
+        "--baseline", default=BASELINE_FILE,
+        help="baseline to compare against (default: benchmarks/baseline.json)"
+    )
+    parser.add_argument(
+        "--save-baseline", action="store_true",
+        help="save the results as the new baseline instead of comparing"
+    )
+    parser.add_argument(
+        "--tolerance", type=float, default=DEFAULT_TOLERANCE,
+        help=f"relative change reported as a regression (default: {DEFAULT_TOLERANCE})"
+    )
+    parser.add_argument("--measure", help=argparse.SUPPRESS)
+    return parser.parse_args()
+
+if __name__ == '__main__':
+    args = parse_args()
+
+    if args.measure:
+        json.dump(measure(args.measure, args.scale, args.repeat, args.workdir), sys.stdout)
+        raise SystemExit(0)
+
+    results = {}
+    for name in args.fixtures or sorted(HOSTS):
+        print(f"Benchmarking {name}...", file=sys.stderr)
+        results[name] = _measure_in_subprocess(name, args)
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump({"scale": args.scale, "fixtures": results}, f, indent=2)
+        compare(results, {}, args.tolerance)
+        print(f"\nBaseline saved to {args.baseline}")
+        raise SystemExit(0)
+
+    baseline = {}
+    try:
+        with open(args.baseline) as f:
+            saved = json.load(f)
+        if saved.get("scale") == args.scale:
+            baseline = saved["fixtures"]
+        else:
+            print(f"Baseline {args.baseline} was recorded at scale {saved.get('scale')}, not comparing", file=sys.stderr)
+    except OSError:
+        print(f"No baseline at {args.baseline}, not comparing", file=sys.stderr)
+
+    regressions = compare(results, baseline, args.tolerance)
+    if regressions:
+        print(f"\n{len(regressions)} regression(s): {', '.join(regressions)}")
+        raise SystemExit(1)
@@ -0,0 +1,267 @@
+"""
+=============
+Fixture Hosts
+=============
+
+Recorded state of representative hosts the checks are benchmarked against:
+their mount table, fstab, loaded modules, modprobe configuration, unit
+states and the shape of their directory trees.
+
+A fixture is materialized under a work directory: the modprobe
+configuration and module index are written out, and every local filesystem
+gets a generated directory tree. The mount table keeps the recorded mount
+points and the Facts point at the work directory through their `root`, so
+the checks see the recorded host while walking the generated trees.
+Generating the large trees is slow, so they are kept and reused.
+"""
+
+import os
+
+from dataclasses import dataclass, field
+
+from utils.facts import MODULES, Facts
+from utils.fstab import parse_fstab
+from utils.modprobe import read_modprobe_config
+from utils.modules import parse_modules
+from utils.mountinfo import parse_mountinfo
+from utils.systemd import UnitState, unit_name
+from utils.walker import local_mount_points
+
+KERNEL_RELEASE = "5.15.0-91-generic"
+
+@dataclass(frozen=True)
+class Tree:
+    """Shape of a generated directory tree.
+
+    Attributes:
+        directories (int): Number of directories, including the top one.
+        fanout (int): Subdirectories per directory.
+        world_writable (int): Every n-th directory is world-writable without
+        the sticky bit, 0 for none.
+    """
+    directories: int
+    fanout: int = 16
+    world_writable: int = 0
+
+@dataclass(frozen=True)
+class FixtureHost:
+    """Recorded state of a host.
+
+    Attributes:
+        name (str): Name of the fixture (eg: small-vm).
+        description (str): What kind of host was recorded.
+        mountinfo (str): Content of /proc/self/mountinfo.
+        fstab (str): Content of /etc/fstab.
+        modules (str): Content of /proc/modules.
+        modprobe_conf (str): Concatenated modprobe.d configuration.
+        builtin_modules (tuple[str, ...]): Modules built into the kernel.
+        available_modules (tuple[str, ...]): Modules present in modules.dep.
+        unit_states (dict[str, str]): Enablement state of every unit,
+        "not-found" if the unit does not exist.
+        trees (dict[str, Tree]): Directory tree of each local mount point.
+    """
+    name: str
+    description: str
+    mountinfo: str
+    fstab: str = ""
+    modules: str = ""
+    modprobe_conf: str = ""
+    builtin_modules: tuple[str, ...] = ()
+    available_modules: tuple[str, ...] = ()
+    unit_states: dict[str, str] = field(default_factory=dict)
+    trees: dict[str, Tree] = field(default_factory=dict)
+
+    @property
+    def directories(self) -> int:
+        """Total number of generated directories."""
+        return sum(tree.directories for tree in self.trees.values())
+
+    def scaled(self, scale: float) -> "FixtureHost":
+        """The same host with `scale` times as many directories."""
+        trees = {
+            mount_point: Tree(max(1, int(tree.directories * scale)), tree.fanout, tree.world_writable)
+            for mount_point, tree in self.trees.items()
+        }
+        return FixtureHost(
+            self.name, self.description, self.mountinfo, self.fstab, self.modules, self.modprobe_conf,
+            self.builtin_modules, self.available_modules, self.unit_states, trees,
+        )
+
+def _generate_tree(path: str, tree: Tree):
+    marker = os.path.join(path, ".fixture-tree")
+    signature = f"{tree.directories} {tree.fanout} {tree.world_writable}"
+    try:
+        with open(marker) as f:
+            if f.read() == signature:
+                return
+    except OSError:
+        pass
+
+    os.makedirs(path, exist_ok=True)
+    # Breadth first, so that the tree is `fanout` wide at every level
+    queue, created, head = [path], 1, 0
+    while created < tree.directories:
+        parent = queue[head]
+        head += 1
+        for i in range(min(tree.fanout, tree.directories - created)):
+            child = os.path.join(parent, f"d{i}")
+            os.makedirs(child, exist_ok=True)
+            created += 1
+            mode = 0o777 if tree.world_writable and created % tree.world_writable == 0 else 0o755
+            os.chmod(child, mode)
+            queue.append(child)
+
+    with open(marker, "w") as f:
+        f.write(signature)
+
+def materialize(host: FixtureHost, workdir: str) -> Facts:
+    """Write out the fixture under `workdir` and build its Facts.
+
+    Args:
+        host (FixtureHost): The fixture to materialize.
+        workdir (str): Directory holding the fixture, reused between runs.
+
+    Returns:
+        Facts: The recorded state, with `root` set to the fixture root.
+    """
+    root = os.path.join(workdir, host.name, "root")
+    modprobe_dir = os.path.join(workdir, host.name, "modprobe.d")
+    modules_dir = os.path.join(workdir, host.name, "modules", KERNEL_RELEASE)
+    for directory in (root, modprobe_dir, modules_dir):
+        os.makedirs(directory, exist_ok=True)
+
+    with open(os.path.join(modprobe_dir, "fixture.conf"), "w") as f:
+        f.write(host.modprobe_conf)
+    with open(os.path.join(modules_dir, "modules.dep"), "w") as f:
+        f.writelines(f"kernel/fs/{name}/{name}.ko:\n" for name in host.available_modules)
+    with open(os.path.join(modules_dir, "modules.builtin"), "w") as f:
+        f.writelines(f"kernel/fs/{name}/{name}.ko\n" for name in host.builtin_modules)
+
+    mounts = parse_mountinfo(host.mountinfo)
+    # Local filesystems without a recorded tree are empty
+    for mount_point in local_mount_points(mounts):
+        os.makedirs(os.path.join(root, mount_point.lstrip("/")), exist_ok=True)
+    for mount_point, tree in host.trees.items():
+        _generate_tree(os.path.join(root, mount_point.lstrip("/")), tree)
+
+    return Facts(
+        mounts=mounts,
+        fstab=parse_fstab(host.fstab),
+        loaded_modules=parse_modules(host.modules),
+        modprobe=read_modprobe_config((modprobe_dir,), modules_dir).resolve_all(MODULES),
+        unit_states={
+            unit: UnitState(unit_name(unit), state) for unit, state in host.unit_states.items()
+        },
+        root=root,
+    )
+
+SMALL_VM = FixtureHost(
+    name="small-vm",
+    description="Ubuntu 22.04 cloud image, single disk, stock configuration",
+    mountinfo="""\
+22 27 0:21 / /sys rw,nosuid,nodev,noexec,relatime shared:7 - sysfs sysfs rw
+23 27 0:22 / /proc rw,nosuid,nodev,noexec,relatime shared:13 - proc proc rw
+24 27 0:5 / /dev rw,nosuid,relatime shared:2 - devtmpfs udev rw,size=1967700k,nr_inodes=491925,mode=755
+25 24 0:23 / /dev/pts rw,nosuid,noexec,relatime shared:3 - devpts devpts rw,gid=5,mode=620,ptmxmode=000
+26 27 0:24 / /run rw,nosuid,nodev,noexec,relatime shared:5 - tmpfs tmpfs rw,size=400820k,mode=755
+27 1 252:1 / / rw,relatime shared:1 - ext4 /dev/vda1 rw,discard,errors=remount-ro
+28 24 0:25 / /dev/shm rw,nosuid,nodev shared:4 - tmpfs tmpfs rw
+29 26 0:26 / /run/lock rw,nosuid,nodev,noexec,relatime shared:6 - tmpfs tmpfs rw,size=5120k
+30 22 0:27 / /sys/fs/cgroup rw,nosuid,nodev,noexec,relatime shared:9 - cgroup2 cgroup2 rw
+61 27 252:15 / /boot/efi rw,relatime shared:31 - vfat /dev/vda15 rw,fmask=0077,dmask=0077
+""",
+    fstab="""\
+LABEL=cloudimg-rootfs\t/\text4\tdiscard,errors=remount-ro\t0 1
+LABEL=UEFI\t/boot/efi\tvfat\tumask=0077\t0 1
+""",
+    modules="""\
+vfat 20480 1 - Live 0x0000000000000000
+fat 86016 1 vfat, Live 0x0000000000000000
+virtio_net 61440 0 - Live 0x0000000000000000
+""",
+    available_modules=("cramfs", "freevxfs", "jffs2", "hfs", "hfsplus", "squashfs", "udf", "vfat", "usb-storage"),
+    unit_states={"tmp.mount": "static", "autofs": "not-found"},
+    trees={"/": Tree(60_000, fanout=12, world_writable=20_000), "/boot/efi": Tree(20)},
+)
+
+CONTAINER = FixtureHost(
+    name="container",
+    description="Docker container on an overlay root, no systemd and no module support",
+    mountinfo="""\
+612 541 0:52 / / rw,relatime master:290 - overlay overlay rw,lowerdir=/var/lib/docker/overlay2/l/A:/var/lib/docker/overlay2/l/B,upperdir=/var/lib/docker/overlay2/C/diff,workdir=/var/lib/docker/overlay2/C/work
+613 612 0:55 / /proc rw,nosuid,nodev,noexec,relatime - proc proc rw
+614 612 0:56 / /dev rw,nosuid - tmpfs tmpfs rw,size=65536k,mode=755
+615 614 0:57 / /dev/pts rw,nosuid,noexec,relatime - devpts devpts rw,gid=5,mode=620,ptmxmode=666
+616 612 0:58 / /sys ro,nosuid,nodev,noexec,relatime - sysfs sysfs ro
+617 614 0:54 / /dev/mqueue rw,nosuid,nodev,noexec,relatime - mqueue mqueue rw
+618 614 0:59 / /dev/shm rw,nosuid,nodev,noexec,relatime - tmpfs shm rw,size=65536k
+622 612 252:1 /srv/app-data /data rw,relatime - ext4 /dev/vda1 rw
+619 612 252:1 /var/lib/docker/containers/C/resolv.conf /etc/resolv.conf rw,relatime - ext4 /dev/vda1 rw
+620 612 252:1 /var/lib/docker/containers/C/hostname /etc/hostname rw,relatime - ext4 /dev/vda1 rw
+621 612 252:1 /var/lib/docker/containers/C/hosts /etc/hosts rw,relatime - ext4 /dev/vda1 rw
+""",
+    unit_states={"tmp.mount": "not-found", "autofs": "not-found"},
+    trees={"/": Tree(8_000, fanout=8, world_writable=4_000), "/data": Tree(2_000, fanout=8)},
+)
+
+FILE_SERVER = FixtureHost(
+    name="file-server",
+    description="Hardened NFS/Samba file server, separate partitions, 5M directories of shares",
+    mountinfo="""\
+22 28 0:21 / /sys rw,nosuid,nodev,noexec,relatime shared:7 - sysfs sysfs rw
+23 28 0:22 / /proc rw,nosuid,nodev,noexec,relatime shared:13 - proc proc rw
+24 28 0:5 / /dev rw,nosuid,relatime shared:2 - devtmpfs udev rw,size=32818456k,nr_inodes=8204614,mode=755
+25 24 0:23 / /dev/pts rw,nosuid,noexec,relatime shared:3 - devpts devpts rw,gid=5,mode=620,ptmxmode=000
+26 28 0:24 / /run rw,nosuid,nodev,noexec,relatime shared:5 - tmpfs tmpfs rw,size=6571648k,mode=755
+28 1 253:0 / / rw,relatime shared:1 - ext4 /dev/mapper/vg0-root rw
+29 24 0:25 / /dev/shm rw,nosuid,nodev,noexec shared:4 - tmpfs tmpfs rw
+30 28 253:1 / /tmp rw,nosuid,nodev,noexec,relatime shared:14 - ext4 /dev/mapper/vg0-tmp rw
+31 28 253:2 / /var rw,relatime shared:15 - ext4 /dev/mapper/vg0-var rw
+32 28 253:3 / /home rw,nodev,relatime shared:16 - ext4 /dev/mapper/vg0-home rw
+33 28 253:4 / /srv rw,nodev,nosuid,relatime shared:17 - xfs /dev/mapper/vg1-srv rw,attr2,inode64,logbufs=8,logbsize=32k,noquota
+34 33 253:4 /exports /export rw,nodev,nosuid,relatime shared:17 - xfs /dev/mapper/vg1-srv rw,attr2,inode64,noquota
+35 28 0:50 / /mnt/backup rw,relatime shared:18 - nfs4 backup:/volume1/fs rw,vers=4.2,rsize=1048576,wsize=1048576,hard,proto=tcp
+36 28 8:17 / /media/usb0 rw,nosuid,nodev,noexec,relatime shared:19 - vfat /dev/sdb1 rw,fmask=0022,dmask=0022
+""",
+    fstab="""\
+# <file system> <mount point> <type> <options> <dump> <pass>
+/dev/mapper/vg0-root\t/\text4\terrors=remount-ro\t0 1
+/dev/mapper/vg0-tmp\t/tmp\text4\tnodev,nosuid,noexec\t0 2
+/dev/mapper/vg0-var\t/var\text4\tdefaults\t0 2
+/dev/mapper/vg0-home\t/home\text4\tnodev\t0 2
+/dev/mapper/vg1-srv\t/srv\txfs\tnodev,nosuid\t0 2
+/srv/exports\t/export\tnone\tbind\t0 0
+backup:/volume1/fs\t/mnt/backup\tnfs4\t_netdev,vers=4.2\t0 0
+""",
+    modules="""\
+nfsd 557056 13 - Live 0x0000000000000000
+nfs_acl 16384 1 nfsd, Live 0x0000000000000000
+xfs 2002944 1 - Live 0x0000000000000000
+vfat 20480 1 - Live 0x0000000000000000
+fat 86016 1 vfat, Live 0x0000000000000000
+usb_storage 77824 1 uas, Live 0x0000000000000000
+""",
+    modprobe_conf="""\
+install cramfs /bin/true
+install freevxfs /bin/true
+install jffs2 /bin/true
+install hfs /bin/true
+install hfsplus /bin/true
+install squashfs /bin/true
+install udf /bin/true
+blacklist cramfs
+blacklist freevxfs
+""",
+    available_modules=("cramfs", "freevxfs", "jffs2", "hfs", "hfsplus", "squashfs", "udf", "vfat", "usb-storage"),
+    unit_states={"tmp.mount": "disabled", "autofs": "disabled"},
+    trees={
+        "/": Tree(40_000, fanout=12),
+        "/tmp": Tree(200, world_writable=50),
+        "/var": Tree(20_000, fanout=12, world_writable=5_000),
+        "/home": Tree(100_000, fanout=24),
+        "/srv": Tree(5_000_000, fanout=32, world_writable=250_000),
+        "/media/usb0": Tree(50),
+    },
+)
+
+HOSTS = {host.name: host for host in (SMALL_VM, CONTAINER, FILE_SERVER)}
@@ -0,0 +1,44 @@
+import argparse
+import json
+
+from utils import fleet
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Aggregate the CIS checklist results of many hosts")
+    parser.add_argument(
+        "paths", nargs="+", metavar="PATH",
+        help="per-host CSV or JSON Lines result files, or directories holding them"
+    )
+    parser.add_argument(
+        "-j", "--jobs", type=int, default=None,
+        help="number of worker processes for large batches (default: number of CPUs)"
+    )
+    parser.add_argument(
+        "--previous", metavar="PATH", default=None,
+        help="aggregate of a previous batch, saved with --save, to compute trends against"
+    )
+    parser.add_argument(
+        "--save", metavar="PATH", default=None,
+        help="save this aggregate to PATH for later trend comparisons"
+    )
+    parser.add_argument(
+        "--max-hosts", type=int, default=10,
+        help="failing hosts listed per section (default: 10)"
+    )
+    return parser.parse_args()
+
+if __name__ == '__main__':
+    args = parse_args()
+
+    aggregate = fleet.aggregate(args.paths, workers=args.jobs)
+
+    trends = None
+    if args.previous:
+        with open(args.previous) as f:
+            trends = aggregate.trends(json.load(f))
+
+    print(fleet.format_summary(aggregate, trends, max_hosts=args.max_hosts), end="")
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(aggregate.to_dict(), f, indent=2)
@@ -1,2 +1,43 @@
+import functools
+import importlib.util
+import sys
+
+from types import FunctionType, ModuleType
+
 from .pretty import pretty_print, pretty_underline
-from .unused_filesystems import *
\ No newline at end of file
+
+# The public names of the checks module are re-exported, as a star import
+# would. It is only imported when one of them is used, so that importing a
+# submodule (eg: `from utils import registry`) stays cheap.
+
+@functools.cache
+def _check_exports() -> frozenset[str]:
+    from . import unused_filesystems
+
+    siblings = [
+        module for module_name, module in list(sys.modules.items())
+        if module_name.startswith(f"{__name__}.") and module is not unused_filesystems
+    ]
+
+    def defined_there(name: str, value) -> bool:
+        if isinstance(value, ModuleType):
+            return False
+        if isinstance(value, (type, FunctionType)):
+            return value.__module__ == unused_filesystems.__name__
+        # Constants imported from a sibling (eg: COMPLIANT) belong to it
+        return not any(getattr(module, name, None) is value for module in siblings)
+
+    return frozenset(
+        name for name, value in vars(unused_filesystems).items()
+        if not name.startswith("_") and defined_there(name, value)
+    )
+
+def __getattr__(name: str):
+    if name == "__all__":
+        return ["pretty_print", "pretty_underline", *sorted(_check_exports())]
+    # `from utils import <submodule>` looks the submodule up here first
+    if not name.startswith("_") and importlib.util.find_spec(f"{__name__}.{name}") is None:
+        if name in _check_exports():
+            from . import unused_filesystems
+            return getattr(unused_filesystems, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
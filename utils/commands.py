@@ -0,0 +1,42 @@
+"""
+==============
+Command Limits
+==============
+
+Time limits of the run. The checks read the system natively and no longer
+spawn commands, so the limits bound the walk of the world-writable
+directory check: it stops at the per-operation timeout or at the global
+deadline of the run, whichever comes first, and its partial result is
+flagged as timed out.
+"""
+
+import time
+
+# The directory walk of a large file server can take hours, it is not
+# limited unless asked for
+DEFAULT_TIMEOUT = None
+
+_settings = {"timeout": DEFAULT_TIMEOUT, "deadline": None}
+
+def configure(timeout: float | None = DEFAULT_TIMEOUT, deadline: float | None = None):
+    """Set the default per-operation timeout and the global deadline of the run.
+
+    Args:
+        timeout (float | None): Seconds each operation (eg: the directory
+        walk) may run. None disables it.
+        deadline (float | None): Seconds from now after which every operation
+        still running is stopped. None disables it.
+    """
+    _settings["timeout"] = timeout
+    _settings["deadline"] = time.monotonic() + deadline if deadline is not None else None
+
+def effective_timeout(timeout: float | None) -> float | None:
+    """The seconds an operation started now may run, given the configured
+    per-operation timeout (used when `timeout` is None) and global deadline."""
+    if timeout is None:
+        timeout = _settings["timeout"]
+    deadline = _settings["deadline"]
+    if deadline is None:
+        return timeout
+    remaining = max(deadline - time.monotonic(), 0.0)
+    return remaining if timeout is None else min(timeout, remaining)
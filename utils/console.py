@@ -0,0 +1,84 @@
+"""
+=======
+Console
+=======
+
+Console output of a run. In the default text format the checks print their
+evidence as they run, which is what an operator at a terminal wants.
+
+In the quiet and JSON formats nobody reads that text. The executor drops
+the console output of the checks, the evidence only reaches the report
+sinks, and the banners of the run are not printed. The standard output of
+the process is left alone. What is still worth showing goes through a
+leveled logger, whose messages are only formatted when their level is
+enabled. The JSON format prints one record per check on stdout instead,
+without the evidence.
+"""
+
+import sys
+
+TEXT = "text"
+JSON = "json"
+FORMATS = (TEXT, JSON)
+
+# Same values as the logging levels, which are imported with the first message
+INFO = 20
+WARNING = 30
+ERROR = 40
+
+_settings = {"format": TEXT, "quiet": False, "stdout": None, "logger": None}
+
+def configure(output_format: str = TEXT, quiet: bool = False):
+    """Set the console output of the process.
+
+    Args:
+        output_format (str): "text" to print the evidence of every check,
+        "json" to print one JSON record per check.
+        quiet (bool): Only log the checks that are not compliant, and errors.
+    """
+    _settings["format"] = output_format
+    _settings["quiet"] = quiet
+    _settings["logger"] = None
+
+    # Before any run routes it, so that the records bypass the routing
+    if _settings["stdout"] is None:
+        _settings["stdout"] = sys.stdout
+
+def _logger():
+    logger = _settings["logger"]
+    if logger is None:
+        import logging
+
+        logger = _settings["logger"] = logging.getLogger("cis_benchmarking")
+        # JSON records own stdout, messages go to stderr so they cannot corrupt them
+        handler = logging.StreamHandler(stdout() if _settings["format"] == TEXT else sys.stderr)
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        logger.handlers[:] = [handler]
+        logger.propagate = False
+        logger.setLevel(INFO if rendering() else WARNING)
+    return logger
+
+def log(level: int, message: str, *args):
+    """Log `message`, %-formatted with `args` only if `level` is enabled."""
+    _logger().log(level, message, *args)
+
+def info(message: str, *args):
+    log(INFO, message, *args)
+
+def warning(message: str, *args):
+    log(WARNING, message, *args)
+
+def error(message: str, *args):
+    log(ERROR, message, *args)
+
+def rendering() -> bool:
+    """Whether the console output of the checks is shown."""
+    return _settings["format"] == TEXT and not _settings["quiet"]
+
+def json_output() -> bool:
+    """Whether a JSON record of every check is printed."""
+    return _settings["format"] == JSON
+
+def stdout():
+    """The actual standard output, for machine-readable output."""
+    return _settings["stdout"] or sys.stdout
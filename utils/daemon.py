@@ -0,0 +1,339 @@
+"""
+======
+Daemon
+======
+
+Serves the checks over a Unix domain socket from a long-running process, so
+that frequent callers (eg: config management runs) pay neither interpreter
+start-up nor fact collection on every call.
+
+The facts are collected once and kept warm. Facts the ChangeMonitor reports
+changed are collected again and the results of the checks declaring them
+are dropped. Once the facts are older than the TTL, everything is collected
+and evaluated again. A request only runs the checks whose results were
+dropped, the others are answered from memory.
+
+Requests and responses are JSON objects, one per line. A connection may
+carry several requests:
+
+    $ echo '{"sections": ["1.1.22"]}' | socat - UNIX-CONNECT:/run/cis-benchmark.sock
+    {"ok": true, "host": "vm", "facts_age": 12.4, "results": [{"section": "1.1.22", ...}]}
+
+Request fields, all optional:
+
+- command: "run" (default) or "status"
+- sections, level, profile: select the checks, as on the command line
+- evidence: whether the results carry the evidence (default: false)
+- refresh: collect every fact and run the checks again first (default: false)
+
+The results are the records of the JSON Lines report, `started` being when
+the check last ran. A failed request gets {"ok": false, "error": "..."}.
+Clients are served concurrently. Checks are evaluated for one request at a
+time and their results shared by all.
+"""
+
+import json
+import os
+import signal
+import socket
+import socketserver
+import stat
+import threading
+import time
+
+from dataclasses import replace
+from datetime import datetime, timezone
+
+# unused_filesystems registers the checks the daemon serves
+from . import console, unused_filesystems
+from .executor import buffered_output, routed_stdout, run_checks
+from .facts import collect_facts, refresh_facts
+from .monitor import ChangeMonitor, directory_watch_list
+from .probes import hostname
+from .registry import PROFILES, required_facts, select_checks
+from .report import check_record
+from .walker import local_mount_points
+
+# Seconds after which every fact is collected and every check runs again,
+# to catch what the change monitor cannot see
+TTL = 300
+
+# Longest request line accepted, in bytes
+MAX_REQUEST_SIZE = 65536
+
+COMMANDS = ("run", "status")
+
+class CheckCache:
+    """Warm facts and the latest result of every check evaluated against them.
+
+    It can be used from several threads.
+
+    Args:
+        jobs (int): Number of checks run at the same time.
+        ttl (float): Seconds after which the facts are collected again.
+    """
+    def __init__(self, jobs: int = 1, ttl: float = TTL):
+        self.jobs = jobs
+        self.ttl = ttl
+        self.needs = required_facts(select_checks())
+        self.facts = None
+        self.collected = 0.0
+        # Section -> (CheckRun, ISO 8601 time it ran)
+        self.results = {}
+        self._generation = 0
+        self._lock = threading.Lock()
+        # Concurrent requests for the same checks run them once, and the
+        # checks do not overwrite each other's output files
+        self._evaluating = threading.Lock()
+
+    def _expire(self):
+        if self.facts is not None and time.monotonic() - self.collected > self.ttl:
+            self.facts = None
+            self.results.clear()
+            self._generation += 1
+
+    def age(self) -> float | None:
+        """Seconds since the facts were collected, None before they are."""
+        with self._lock:
+            return time.monotonic() - self.collected if self.facts is not None else None
+
+    def invalidate(self, changed: set[str] = None):
+        """Collect the facts in `changed` again and drop the results of the
+        checks declaring them. None drops every fact and result."""
+        with self._lock:
+            self._generation += 1
+            if changed is None or self.facts is None:
+                self.facts = None
+                self.results.clear()
+                return
+            # Evaluations in progress keep the snapshot they started with
+            facts = replace(self.facts)
+            refresh_facts(facts, changed)
+            self.facts = facts
+            for section, (run, _) in list(self.results.items()):
+                if changed.intersection(run.check.facts):
+                    del self.results[section]
+
+    def _cached(self, checks: list) -> dict:
+        with self._lock:
+            self._expire()
+            return {c.section: self.results[c.section] for c in checks if c.section in self.results}
+
+    def _evaluate(self, checks: list) -> dict:
+        with self._lock:
+            self._expire()
+            if self.facts is None:
+                self.facts = collect_facts(needs=self.needs)
+                self.collected = time.monotonic()
+            facts, generation = self.facts, self._generation
+
+        started = datetime.now(timezone.utc).isoformat(timespec="seconds")
+        fresh = {}
+
+        def on_result(run):
+            fresh[run.check.section] = (run, started)
+
+        # Nobody reads the console output of the checks
+        with buffered_output():
+            run_checks(checks, facts, jobs=self.jobs, on_result=on_result)
+
+        with self._lock:
+            # Results against facts that changed meanwhile are answered, not kept
+            if generation == self._generation:
+                self.results.update(fresh)
+        return fresh
+
+    def run(self, sections: list[str] = None, level: int = None, profile: str = None,
+            refresh: bool = False) -> list[tuple]:
+        """The latest result of the selected checks, running those that have none.
+
+        Must be called within `routed_stdout`.
+
+        Args:
+            sections (list[str]): Only run these sections and their subsections.
+            level (int): Only run checks of this profile level (1 or 2).
+            profile (str): Only run checks of this profile (server or workstation).
+            refresh (bool): Collect every fact and run the checks again first.
+
+        Returns:
+            list[tuple[CheckRun, str]]: The result of every check and the ISO
+            8601 time it ran, in section order.
+        """
+        if refresh:
+            self.invalidate()
+        checks = select_checks(sections, level, profile)
+        results = self._cached(checks)
+        if len(results) < len(checks):
+            with self._evaluating:
+                # Another request may have run them while this one waited
+                results = self._cached(checks)
+                pending = [c for c in checks if c.section not in results]
+                if pending:
+                    results.update(self._evaluate(pending))
+        return [results[c.section] for c in checks]
+
+def _selection(request: dict) -> tuple:
+    sections = request.get("sections")
+    if sections is not None and (not isinstance(sections, list) or not all(isinstance(s, str) for s in sections)):
+        raise ValueError("sections must be a list of strings")
+    level = request.get("level")
+    if level is not None and level not in (1, 2):
+        raise ValueError("level must be 1 or 2")
+    profile = request.get("profile")
+    if profile is not None and profile not in PROFILES:
+        raise ValueError(f"profile must be one of {', '.join(PROFILES)}")
+    return sections, level, profile
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        while True:
+            line = self.rfile.readline(MAX_REQUEST_SIZE + 1)
+            if not line:
+                return
+            if len(line) > MAX_REQUEST_SIZE:
+                self._send({"ok": False, "error": f"requests are limited to {MAX_REQUEST_SIZE} bytes"})
+                return
+            if line.strip():
+                self._send(self.server.respond(line))
+
+    def _send(self, response: dict):
+        self.wfile.write(json.dumps(response).encode() + b"\n")
+        self.wfile.flush()
+
+class DaemonServer(socketserver.ThreadingUnixStreamServer):
+    """Answers the requests of every client on its own thread.
+
+    Args:
+        path (str): Path of the Unix socket to listen on.
+        cache (CheckCache): Facts and results shared by the clients.
+    """
+    daemon_threads = True
+
+    def __init__(self, path: str, cache: CheckCache):
+        self.cache = cache
+        self.host = hostname()
+        super().__init__(path, _Handler)
+
+    def respond(self, line: bytes) -> dict:
+        """Response to the request `line`."""
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise ValueError("a request is a JSON object")
+            command = request.get("command", "run")
+            if command not in COMMANDS:
+                raise ValueError(f"command must be one of {', '.join(COMMANDS)}")
+            if command == "status":
+                return {
+                    "ok": True, "host": self.host, "facts_age": self.cache.age(),
+                    "cached": len(self.cache.results), "ttl": self.cache.ttl,
+                }
+            sections, level, profile = _selection(request)
+            results = self.cache.run(sections, level, profile, refresh=bool(request.get("refresh")))
+        except ValueError as e:
+            return {"ok": False, "error": str(e)}
+        except Exception as e:
+            console.error("Request failed: %s", e)
+            return {"ok": False, "error": f"{type(e).__name__}: {e}"}
+
+        include_evidence = bool(request.get("evidence"))
+        return {
+            "ok": True,
+            "host": self.host,
+            "facts_age": self.cache.age(),
+            "results": [check_record(run, self.host, started, include_evidence) for run, started in results],
+        }
+
+def _remove_stale_socket(path: str):
+    # Left behind by a daemon that did not exit cleanly
+    try:
+        mode = os.lstat(path).st_mode
+    except FileNotFoundError:
+        return
+    if not stat.S_ISSOCK(mode):
+        raise FileExistsError(f"{path} exists and is not a socket")
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        try:
+            sock.connect(path)
+        except OSError:
+            os.unlink(path)
+            return
+    raise FileExistsError(f"A daemon is already listening on {path}")
+
+def _watch_changes(monitor: ChangeMonitor, cache: CheckCache, stop: threading.Event):
+    while not stop.is_set():
+        changed = monitor.wait(1.0)
+        if changed:
+            console.info("Changed: %s", ", ".join(sorted(changed)))
+            cache.invalidate(changed)
+
+def _on_signal(signum, frame):
+    # Unwind through serve so that the socket is removed
+    raise SystemExit(128 + signum)
+
+def serve(path: str, jobs: int = 1, ttl: float = TTL):
+    """Serve the registered checks on the Unix socket `path` until interrupted.
+
+    Every check runs once before the socket is created, so that the first
+    request is answered from memory. Only the owner of the process may
+    connect.
+
+    Args:
+        path (str): Path of the Unix socket to create.
+        jobs (int): Number of checks run at the same time.
+        ttl (float): Seconds after which every fact is collected again.
+
+    Raises:
+        FileExistsError: If `path` is not a socket, or another daemon listens on it.
+    """
+    # Answers go over the socket, the checks write no file to the working
+    # directory, which may not be writable
+    unused_filesystems.configure(world_writable_file=False)
+    cache = CheckCache(jobs=jobs, ttl=ttl)
+    stop = threading.Event()
+
+    with routed_stdout():
+        cache.run()
+        directories = []
+        if "directories" in cache.needs:
+            directories = directory_watch_list(local_mount_points(cache.facts.mounts))
+
+        _remove_stale_socket(path)
+        umask = os.umask(0o177)
+        try:
+            server = DaemonServer(path, cache)
+        finally:
+            os.umask(umask)
+
+        previous_handler = None
+        if threading.current_thread() is threading.main_thread():
+            previous_handler = signal.signal(signal.SIGTERM, _on_signal)
+
+        with server, ChangeMonitor(directories) as monitor:
+            watcher = threading.Thread(target=_watch_changes, args=(monitor, cache, stop), daemon=True)
+            watcher.start()
+            console.info("Serving %d checks on %s", len(cache.results), path)
+            try:
+                server.serve_forever()
+            finally:
+                stop.set()
+                watcher.join()
+                os.unlink(path)
+                if previous_handler is not None:
+                    signal.signal(signal.SIGTERM, previous_handler)
+
+def request(path: str, message: dict, timeout: float = None) -> dict:
+    """Send `message` to the daemon listening on the Unix socket `path`.
+
+    Returns:
+        dict: Its response.
+    """
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(timeout)
+        sock.connect(path)
+        sock.sendall(json.dumps(message).encode() + b"\n")
+        with sock.makefile("rb") as f:
+            line = f.readline()
+    if not line:
+        raise ConnectionError(f"No response from {path}")
+    return json.loads(line)
@@ -0,0 +1,215 @@
+"""
+==============
+Check Executor
+==============
+
+Runs the checks sequentially or on a worker pool. Each check writes its
+text report entry into a private buffer. When checks run in parallel their
+console output is buffered as well, and both are released in canonical
+section order, so the output looks exactly as it would after a sequential
+run. When the console output is not shown (quiet and JSON formats), it is
+dropped instead, without touching the standard output of the process.
+
+Several runs can share the process, each on its own thread with its own
+output directory and, optionally, its own console buffer.
+
+Every run records what the check cost: wall and CPU time, and how much the
+peak RSS of the process grew while it ran.
+"""
+
+import io
+import os
+import resource
+import sys
+import threading
+import time
+
+from contextlib import contextmanager, nullcontext
+from dataclasses import dataclass
+
+from . import console
+from .pretty import pretty_print
+
+_local = threading.local()
+
+class _Discard:
+    """Console output of a check that is not shown."""
+    def write(self, text: str) -> int:
+        return len(text)
+
+class _Capture:
+    """Text report entry and, in parallel runs or when it is not shown,
+    console output of a single check."""
+    def __init__(self, capture_stdout: bool, show_stdout: bool = True):
+        if not show_stdout:
+            self.stdout = _Discard()
+        else:
+            self.stdout = io.StringIO() if capture_stdout else None
+        self.evidence = io.StringIO()
+
+@dataclass
+class CheckRun:
+    """Outcome of running a single check.
+
+    Attributes:
+        check (Check): The check that ran.
+        status (str): Its status (eg: Compliant).
+        evidence (str): Its text report entry.
+        duration (float): Wall time of the check in seconds.
+        cpu_time (float): CPU time of the process, including the threads the
+        check starts, in seconds.
+        peak_rss_delta (int): Bytes by which the peak RSS of the process grew
+        while the check ran.
+
+    With parallel checks, the CPU time and peak RSS growth of checks running
+    at the same time are included.
+    """
+    check: object
+    status: str = ""
+    evidence: str = ""
+    duration: float = 0.0
+    cpu_time: float = 0.0
+    peak_rss_delta: int = 0
+
+class _ThreadStdout:
+    """Routes `print` of worker threads to the buffer of the check they run,
+    or of the run they belong to."""
+    def __init__(self, stdout):
+        self._stdout = stdout
+
+    def write(self, text: str) -> int:
+        capture = getattr(_local, "capture", None)
+        if capture is not None and capture.stdout is not None:
+            return capture.stdout.write(text)
+        buffer = getattr(_local, "stdout", None)
+        if buffer is not None:
+            return buffer.write(text)
+        return self._stdout.write(text)
+
+    def flush(self):
+        self._stdout.flush()
+
+    def __getattr__(self, name):
+        return getattr(self._stdout, name)
+
+@contextmanager
+def routed_stdout():
+    """Route `print` through the per-thread buffers while in the block."""
+    if isinstance(sys.stdout, _ThreadStdout):
+        yield
+        return
+    stdout = sys.stdout
+    sys.stdout = _ThreadStdout(stdout)
+    try:
+        yield
+    finally:
+        sys.stdout = stdout
+
+@contextmanager
+def buffered_output():
+    """Buffer the console output of this thread, within `routed_stdout`.
+
+    Yields:
+        io.StringIO: The buffer.
+    """
+    previous = getattr(_local, "stdout", None)
+    _local.stdout = io.StringIO()
+    try:
+        yield _local.stdout
+    finally:
+        _local.stdout = previous
+
+@contextmanager
+def output_directory(path: str | None):
+    """Make `output_file` resolve into `path` on this thread, and in the
+    checks it runs. None keeps the current directory."""
+    previous = getattr(_local, "output_dir", None)
+    _local.output_dir = path
+    try:
+        yield
+    finally:
+        _local.output_dir = previous
+
+def output_file(name: str) -> str:
+    """Path of the output file `name` of the run on this thread."""
+    directory = getattr(_local, "output_dir", None)
+    return os.path.join(directory, name) if directory else name
+
+@contextmanager
+def evidence():
+    """Buffer for the text report entry of the check running on this thread.
+
+    Outside of `run_checks` the text is discarded.
+    """
+    capture = getattr(_local, "capture", None)
+    yield capture.evidence if capture is not None else io.StringIO()
+
+def _peak_rss() -> int:
+    # ru_maxrss is in KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+def _run_check(check, facts, capture_stdout: bool, on_complete, output_dir: str = None,
+               show_stdout: bool = True) -> tuple[CheckRun, _Capture]:
+    capture = _Capture(capture_stdout, show_stdout)
+    _local.capture = capture
+    _local.output_dir = output_dir
+    peak_rss = _peak_rss()
+    cpu_start = time.process_time()
+    start = time.perf_counter()
+    try:
+        pretty_print(check.heading)
+        print()
+        status = check(facts)
+    finally:
+        _local.capture = None
+
+    run = CheckRun(
+        check=check,
+        status=status,
+        evidence=capture.evidence.getvalue(),
+        duration=time.perf_counter() - start,
+        cpu_time=time.process_time() - cpu_start,
+        peak_rss_delta=_peak_rss() - peak_rss,
+    )
+    if on_complete is not None:
+        on_complete(run)
+    return run, capture
+
+def run_checks(checks: list, facts, jobs: int = 1, on_result=None, on_complete=None):
+    """Run every check against `facts`.
+
+    Args:
+        checks (list[Check]): Checks in canonical section order.
+        facts (Facts): Snapshot of the system handed to every check.
+        jobs (int): Number of checks run at the same time. 1 runs them in order
+        on the calling thread.
+        on_result (Callable): Called with the CheckRun of every check, in the
+        same order as `checks`.
+        on_complete (Callable): Called with the CheckRun of every check as soon
+        as it completes, possibly from a worker thread.
+    """
+    output_dir = getattr(_local, "output_dir", None)
+    shown = console.rendering()
+    if jobs <= 1:
+        # Console output that is not shown still has to be routed to be dropped
+        try:
+            with routed_stdout() if not shown else nullcontext():
+                for check in checks:
+                    run, _ = _run_check(check, facts, False, on_complete, output_dir, shown)
+                    if on_result is not None:
+                        on_result(run)
+        finally:
+            _local.output_dir = output_dir
+        return
+
+    from concurrent.futures import ThreadPoolExecutor
+
+    with routed_stdout(), ThreadPoolExecutor(max_workers=jobs) as pool:
+        futures = [pool.submit(_run_check, check, facts, shown, on_complete, output_dir, shown) for check in checks]
+        # Report in submission order so the output keeps the section order
+        for future in futures:
+            run, capture = future.result()
+            if shown:
+                print(capture.stdout.getvalue(), end="")
+            if on_result is not None:
+                on_result(run)
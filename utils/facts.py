@@ -0,0 +1,128 @@
+"""
+============
+System Facts
+============
+
+Collects the host state inspected by the checks (mount table, fstab,
+loaded modules and unit states) once per run so that every check works
+against the same snapshot instead of spawning its own shell pipeline.
+
+The facts can also be collected from a system that is not running, found
+under a root directory (eg: a mounted disk image or an unpacked container
+rootfs). Its mount table is then the one its fstab sets up at boot and no
+module is loaded.
+"""
+
+import os
+
+from dataclasses import dataclass, field, fields
+
+from .modprobe import ModuleResolution, read_modprobe_config
+from .modules import normalize_module_name, read_loaded_modules
+from .fstab import FSTAB_FILE, Fstab, FstabEntry, mount_table_from_fstab, read_fstab
+from .mountinfo import MountEntry, MountTable, read_mountinfo
+from .systemd import UnitState, read_unit_states
+
+UNITS = ("tmp.mount", "autofs")
+
+MODULES = ("cramfs", "freevxfs", "jffs2", "hfs", "hfsplus", "squashfs", "udf", "vfat", "usb-storage")
+
+@dataclass
+class Facts:
+    """Snapshot of the system state shared by all checks in a run.
+
+    Attributes:
+        mounts (MountTable): Parsed /proc/self/mountinfo.
+        fstab (Fstab): Parsed /etc/fstab.
+        loaded_modules (dict[str, str]): /proc/modules lines keyed by normalized module name.
+        modprobe (dict[str, ModuleResolution]): What modprobe would do for every
+        module of interest.
+        unit_states (dict[str, UnitState]): Enablement state of every unit of interest.
+        root (str): Directory the inspected system is found at, `/` for the
+        running host. Mount points are relative to it.
+    """
+    mounts: MountTable = field(default_factory=MountTable)
+    fstab: Fstab = field(default_factory=Fstab)
+    loaded_modules: dict[str, str] = field(default_factory=dict)
+    modprobe: dict[str, ModuleResolution] = field(default_factory=dict)
+    unit_states: dict[str, UnitState] = field(default_factory=dict)
+    root: str = "/"
+
+    def host_path(self, path: str) -> str:
+        """Where `path` of the inspected system is found on this host."""
+        return os.path.join(self.root, path.lstrip("/")) if self.root != "/" else path
+
+    def system_path(self, host_path: str) -> str:
+        """The path of the inspected system found at `host_path` on this host."""
+        if self.root == "/":
+            return host_path
+        return os.path.normpath(os.path.join("/", os.path.relpath(host_path, self.root)))
+
+    def mounts_on(self, mount_point: str) -> list[MountEntry]:
+        """The mount visible at exactly `mount_point`, if any."""
+        entry = self.mounts.get(mount_point)
+        return [entry] if entry else []
+
+    def fstab_entries(self, mount_point: str) -> list[FstabEntry]:
+        """Fstab entries whose mount point is exactly `mount_point`."""
+        return self.fstab.entries_for(mount_point)
+
+    def loaded_module(self, name: str) -> str:
+        """The /proc/modules line of module `name`, or an empty string if it is not loaded."""
+        return self.loaded_modules.get(normalize_module_name(name), "")
+
+    def modprobe_resolution(self, name: str) -> ModuleResolution:
+        """What `modprobe -n -v <name>` would do."""
+        if name not in self.modprobe:
+            self.modprobe[name] = read_modprobe_config(root=self.root).resolve(name)
+        return self.modprobe[name]
+
+def collect_facts(units: tuple[str, ...] = UNITS, modules: tuple[str, ...] = MODULES, needs: set[str] = None,
+                  root: str = "/") -> Facts:
+    """Gather the system facts needed by the checks.
+
+    Args:
+        units (tuple[str, ...]): systemd units whose enablement state is queried.
+        modules (tuple[str, ...]): Kernel modules whose modprobe resolution is needed.
+        needs (set[str]): Names of the Facts fields to gather. Defaults to all of them.
+        root (str): Directory the system to check is found at, `/` for the running host.
+
+    Returns:
+        Facts: The snapshot to hand to every check.
+    """
+    facts = Facts(root=root)
+    offline = root != "/"
+
+    fstab = Fstab()
+    if needs is None or "fstab" in needs or (offline and "mounts" in needs):
+        fstab = read_fstab(facts.host_path(FSTAB_FILE))
+
+    if needs is None or "mounts" in needs:
+        facts.mounts = mount_table_from_fstab(fstab) if offline else read_mountinfo()
+
+    if needs is None or "fstab" in needs:
+        facts.fstab = fstab
+
+    # Nothing is loaded on a system that is not running
+    if (needs is None or "loaded_modules" in needs) and not offline:
+        facts.loaded_modules = read_loaded_modules()
+
+    if needs is None or "modprobe" in needs:
+        facts.modprobe = read_modprobe_config(root=root).resolve_all(modules)
+
+    if needs is None or "unit_states" in needs:
+        facts.unit_states = read_unit_states(units, root=root)
+
+    return facts
+
+def refresh_facts(facts: Facts, names: set[str], units: tuple[str, ...] = UNITS, modules: tuple[str, ...] = MODULES):
+    """Gather the Facts fields in `names` again, in place.
+
+    Names that are not Facts fields are ignored.
+    """
+    names = {f.name for f in fields(Facts) if f.name != "root"} & set(names)
+    if not names:
+        return
+    fresh = collect_facts(units, modules, needs=names)
+    for name in names:
+        setattr(facts, name, getattr(fresh, name))
@@ -0,0 +1,271 @@
+"""
+=================
+Fleet Aggregation
+=================
+
+Merges the results of many hosts into per-section compliance counts,
+failing-host lists and trends against a previous aggregate.
+
+The per-host CSV or JSON Lines files are streamed row by row. Only
+columnar counters are kept, one array per status with one slot per section,
+plus the failing hosts of every section as indices into a table of host
+names. Large batches are split across worker processes whose partial
+aggregates are merged.
+"""
+
+import csv
+import json
+import os
+
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+
+from .registry import COMPLIANT, NOT_COMPLIANT, TIMED_OUT
+
+STATUSES = (COMPLIANT, NOT_COMPLIANT, TIMED_OUT)
+
+# Result files a worker process aggregates at a time
+CHUNK_SIZE = 256
+
+# Default name of the CSV report, whose host is the directory it was collected into
+_DEFAULT_CSV = "unused_filesystems_output.csv"
+
+def _csv_host(path: str) -> str:
+    if os.path.basename(path) == _DEFAULT_CSV:
+        return os.path.basename(os.path.dirname(os.path.abspath(path)))
+    return os.path.splitext(os.path.basename(path))[0]
+
+def read_results(path: str):
+    """Yield (host, section, title, status) for every result in the file.
+
+    CSV reports carry no host name, it is taken from the file name, or from
+    the directory name if the report kept its default name. JSON Lines
+    records carry their host. Unreadable lines are skipped.
+    """
+    if path.endswith(".jsonl"):
+        with open(path) as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                    yield record["host"], record["section"], record["title"], record["status"]
+                except (ValueError, KeyError, TypeError):
+                    continue
+        return
+
+    host = _csv_host(path)
+    with open(path, newline='') as f:
+        for row in csv.DictReader(f):
+            try:
+                yield host, row["Section"], row["Section Name"], row["Checklist"]
+            except KeyError:
+                continue
+
+def result_files(paths: list[str]) -> list[str]:
+    """The CSV and JSON Lines files in `paths`, directories searched recursively.
+
+    A host directory holding JSON Lines results as well as the default CSV
+    report has the same results twice, under two host names. Its JSON Lines
+    files are read and the CSV report is left out.
+    """
+    files = []
+    for path in paths:
+        if not os.path.isdir(path):
+            files.append(path)
+            continue
+        for directory, _, names in os.walk(path):
+            has_jsonl = any(name.endswith(".jsonl") for name in names)
+            files.extend(
+                os.path.join(directory, name) for name in sorted(names)
+                if name.endswith(".jsonl") or (name.endswith(".csv") and not (has_jsonl and name == _DEFAULT_CSV))
+            )
+    return files
+
+def _section_key(section: str) -> tuple[int, ...]:
+    return tuple(int(part) for part in section.split(".") if part.isdigit())
+
+class FleetAggregate:
+    """Compliance counters of a fleet.
+
+    Attributes:
+        sections (list[str]): Sections seen, in slot order.
+        titles (list[str]): Title of each section.
+        counts (dict[str, array]): For each status, the number of hosts per
+        section slot. Unknown statuses are counted under "Other".
+        hosts (list[str]): Names of the hosts seen.
+        failing (list[array]): For each section slot, the indices in `hosts`
+        of the hosts not compliant with it.
+    """
+    def __init__(self):
+        self.sections = []
+        self.titles = []
+        self.counts = {status: array("L") for status in (*STATUSES, "Other")}
+        self.hosts = []
+        self.failing = []
+        self._slots = {}
+        self._host_ids = {}
+
+    def _slot(self, section: str, title: str) -> int:
+        slot = self._slots.get(section)
+        if slot is None:
+            slot = self._slots[section] = len(self.sections)
+            self.sections.append(section)
+            self.titles.append(title)
+            for column in self.counts.values():
+                column.append(0)
+            self.failing.append(array("L"))
+        return slot
+
+    def _host_id(self, host: str) -> int:
+        host_id = self._host_ids.get(host)
+        if host_id is None:
+            host_id = self._host_ids[host] = len(self.hosts)
+            self.hosts.append(host)
+        return host_id
+
+    def add(self, host: str, section: str, title: str, status: str):
+        """Count the result of one check on one host."""
+        slot = self._slot(section, title)
+        host_id = self._host_id(host)
+        self.counts[status if status in STATUSES else "Other"][slot] += 1
+        if status != COMPLIANT:
+            self.failing[slot].append(host_id)
+
+    def add_file(self, path: str):
+        """Stream the results of a per-host file into the counters."""
+        for result in read_results(path):
+            self.add(*result)
+
+    def merge(self, other: "FleetAggregate"):
+        """Add the counters of `other` to these."""
+        host_ids = [self._host_id(host) for host in other.hosts]
+        for other_slot, section in enumerate(other.sections):
+            slot = self._slot(section, other.titles[other_slot])
+            for status, column in self.counts.items():
+                column[slot] += other.counts[status][other_slot]
+            self.failing[slot].extend(host_ids[host_id] for host_id in other.failing[other_slot])
+
+    def total(self, slot: int) -> int:
+        return sum(column[slot] for column in self.counts.values())
+
+    def compliance_rate(self, slot: int) -> float:
+        total = self.total(slot)
+        return self.counts[COMPLIANT][slot] / total if total else 0.0
+
+    def failing_hosts(self, section: str) -> list[str]:
+        """Names of the hosts not compliant with `section`."""
+        slot = self._slots.get(section)
+        if slot is None:
+            return []
+        return sorted({self.hosts[host_id] for host_id in self.failing[slot]})
+
+    def ordered_slots(self) -> list[int]:
+        return sorted(range(len(self.sections)), key=lambda slot: _section_key(self.sections[slot]))
+
+    def to_dict(self) -> dict:
+        """Plain representation, to save as the previous aggregate of the next batch."""
+        return {
+            "hosts": len(self.hosts),
+            "sections": {
+                self.sections[slot]: {
+                    "title": self.titles[slot],
+                    "counts": {status: column[slot] for status, column in self.counts.items()},
+                    "failing": self.failing_hosts(self.sections[slot]),
+                }
+                for slot in self.ordered_slots()
+            },
+        }
+
+    def trends(self, previous: dict) -> dict[str, dict]:
+        """Change of every section since the `previous` aggregate (as saved
+        by `to_dict`).
+
+        Returns:
+            dict[str, dict]: By section, the change of the compliance rate,
+            the hosts failing now but not before, and the hosts that failed
+            before and are compliant now. Hosts absent from either batch
+            are left out of both lists.
+        """
+        current_hosts = set(self.hosts)
+        trends = {}
+        for slot in self.ordered_slots():
+            section = self.sections[slot]
+            before = previous.get("sections", {}).get(section)
+            if before is None:
+                continue
+            before_total = sum(before["counts"].values())
+            before_rate = before["counts"].get(COMPLIANT, 0) / before_total if before_total else 0.0
+            failing_before = set(before["failing"])
+            failing_now = set(self.failing_hosts(section))
+            trends[section] = {
+                "rate_delta": self.compliance_rate(slot) - before_rate,
+                "newly_failing": sorted(failing_now - failing_before),
+                "fixed": sorted((failing_before - failing_now) & current_hosts),
+            }
+        return trends
+
+def _aggregate_chunk(paths: list[str]) -> FleetAggregate:
+    aggregate = FleetAggregate()
+    for path in paths:
+        aggregate.add_file(path)
+    return aggregate
+
+def aggregate(paths: list[str], workers: int = None) -> FleetAggregate:
+    """Aggregate the per-host result files in `paths`.
+
+    Args:
+        paths (list[str]): Result files, or directories searched for them.
+        workers (int): Worker processes. Defaults to the number of CPUs.
+        Batches of up to CHUNK_SIZE files are aggregated in this process.
+
+    Returns:
+        FleetAggregate: The merged counters.
+    """
+    files = result_files(paths)
+    if len(files) <= CHUNK_SIZE or workers == 1:
+        return _aggregate_chunk(files)
+
+    chunks = [files[i:i + CHUNK_SIZE] for i in range(0, len(files), CHUNK_SIZE)]
+    merged = FleetAggregate()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for partial in pool.map(_aggregate_chunk, chunks):
+            merged.merge(partial)
+    return merged
+
+def format_summary(fleet: FleetAggregate, trends: dict[str, dict] = None, max_hosts: int = 10) -> str:
+    """Per-section compliance table, followed by the failing hosts of every
+    section and, with `trends`, the rate change and host changes."""
+    lines = [f"Hosts: {len(fleet.hosts)}", ""]
+    header = f"{'Section':<10}{'Compliant':>11}{'Not Compliant':>15}{'Timed Out':>11}{'Other':>7}{'Rate':>9}"
+    if trends is not None:
+        header += f"{'Change':>9}"
+    lines.append(header)
+    for slot in fleet.ordered_slots():
+        section = fleet.sections[slot]
+        line = (
+            f"{section:<10}{fleet.counts[COMPLIANT][slot]:>11}{fleet.counts[NOT_COMPLIANT][slot]:>15}"
+            f"{fleet.counts[TIMED_OUT][slot]:>11}{fleet.counts['Other'][slot]:>7}"
+            f"{fleet.compliance_rate(slot):>9.1%}"
+        )
+        if trends is not None:
+            trend = trends.get(section)
+            line += f"{trend['rate_delta']:>+9.1%}" if trend else f"{'new':>9}"
+        lines.append(line)
+
+    for slot in fleet.ordered_slots():
+        section = fleet.sections[slot]
+        failing = fleet.failing_hosts(section)
+        trend = (trends or {}).get(section, {})
+        if not failing and not trend.get("fixed"):
+            continue
+        lines.append("")
+        lines.append(f"[{section}] {fleet.titles[slot]}")
+        if failing:
+            shown = ", ".join(failing[:max_hosts])
+            more = f" and {len(failing) - max_hosts} more" if len(failing) > max_hosts else ""
+            lines.append(f"  Failing ({len(failing)}): {shown}{more}")
+        for key, label in (("newly_failing", "Newly failing"), ("fixed", "Fixed")):
+            hosts = trend.get(key)
+            if hosts:
+                more = f" and {len(hosts) - max_hosts} more" if len(hosts) > max_hosts else ""
+                lines.append(f"  {label} ({len(hosts)}): {', '.join(hosts[:max_hosts])}{more}")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,172 @@
+"""
+=====
+Fstab
+=====
+
+Pure-Python parser for /etc/fstab. It produces structured entries indexed
+by mount point so that checks can look up how a filesystem is set up at
+boot without grepping the file, whatever whitespace separates the fields.
+
+See fstab(5) for the format of each line:
+
+    UUID=5c3e-41f0  /boot/efi  vfat  umask=0077  0  1
+"""
+
+from dataclasses import dataclass, field
+
+from .mountinfo import MountEntry, MountTable, decode_octal_escapes
+from .probes import read_text
+
+FSTAB_FILE = "/etc/fstab"
+
+# Source prefixes naming a filesystem by a property instead of a device
+SOURCE_TAGS = ("UUID", "LABEL", "PARTUUID", "PARTLABEL", "ID")
+
+@dataclass(frozen=True)
+class FstabEntry:
+    """A single line of /etc/fstab.
+
+    Attributes:
+        source (str): Device or tag of the filesystem (eg: /dev/sda1, UUID=5c3e-41f0, tmpfs).
+        mount_point (str): Where it is mounted, `none` for swap.
+        fstype (str): Filesystem type (eg: ext4, tmpfs, swap).
+        mount_options (tuple[str, ...]): Mount options (eg: nodev, nosuid).
+        dump (int): Whether dump(8) backs the filesystem up.
+        passno (int): Order in which fsck(8) checks the filesystem, 0 to skip it.
+        line_number (int): Line of the file the entry comes from.
+    """
+    source: str
+    mount_point: str
+    fstype: str
+    mount_options: tuple[str, ...] = ("defaults",)
+    dump: int = 0
+    passno: int = 0
+    line_number: int = 0
+    options: frozenset[str] = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        names = frozenset(option.split("=", 1)[0] for option in self.mount_options)
+        object.__setattr__(self, "options", names)
+
+    @property
+    def tag(self) -> tuple[str, str] | None:
+        """(tag, value) for sources like UUID=... or LABEL=..., None for a device."""
+        name, sep, value = self.source.partition("=")
+        if not sep or name not in SOURCE_TAGS:
+            return None
+        return name, value.strip('"')
+
+    def has_option(self, option: str) -> bool:
+        """Whether `option` is set on the entry."""
+        return option in self.options
+
+    def __str__(self) -> str:
+        # One tab between fields, whatever the file uses
+        return "\t".join((
+            self.source, self.mount_point, self.fstype, ",".join(self.mount_options),
+            str(self.dump), str(self.passno),
+        ))
+
+def parse_fstab_line(line: str, line_number: int = 0) -> FstabEntry | None:
+    """Parse one fstab line.
+
+    Returns:
+        FstabEntry | None: The entry, None for blank and comment lines.
+
+    Raises:
+        ValueError: If the line does not follow the fstab format.
+    """
+    fields = line.split()
+    if not fields or fields[0].startswith("#"):
+        return None
+    if len(fields) < 3:
+        raise ValueError(f"Malformed fstab line: {line!r}")
+    try:
+        dump = int(fields[4]) if len(fields) > 4 else 0
+        passno = int(fields[5]) if len(fields) > 5 else 0
+    except ValueError:
+        raise ValueError(f"Malformed fstab line: {line!r}") from None
+
+    return FstabEntry(
+        source=decode_octal_escapes(fields[0]),
+        mount_point=decode_octal_escapes(fields[1]),
+        fstype=decode_octal_escapes(fields[2]),
+        mount_options=tuple(decode_octal_escapes(fields[3]).split(",")) if len(fields) > 3 else ("defaults",),
+        dump=dump,
+        passno=passno,
+        line_number=line_number,
+    )
+
+class Fstab:
+    """Parsed fstab with constant time lookups by mount point.
+
+    When a mount point has several entries, they are mounted in file order
+    and `get` returns the last one, which ends up visible.
+    """
+    def __init__(self, entries: list[FstabEntry] = None):
+        self.entries = list(entries or [])
+        self._by_mount_point = {}
+        for entry in self.entries:
+            self._by_mount_point.setdefault(entry.mount_point, []).append(entry)
+
+    def get(self, mount_point: str) -> FstabEntry | None:
+        entries = self._by_mount_point.get(mount_point)
+        return entries[-1] if entries else None
+
+    def entries_for(self, mount_point: str) -> list[FstabEntry]:
+        """Every entry for `mount_point`, in file order."""
+        return list(self._by_mount_point.get(mount_point, ()))
+
+    def __contains__(self, mount_point: str) -> bool:
+        return mount_point in self._by_mount_point
+
+    def __iter__(self):
+        return iter(self.entries)
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+def parse_fstab(text: str) -> Fstab:
+    """Parse the full content of an fstab file, skipping malformed lines."""
+    entries = []
+    for line_number, line in enumerate(text.splitlines(), start=1):
+        try:
+            entry = parse_fstab_line(line, line_number)
+        except ValueError:
+            continue
+        if entry is not None:
+            entries.append(entry)
+    return Fstab(entries)
+
+def read_fstab(path: str = FSTAB_FILE) -> Fstab:
+    """Read and parse an fstab file. A missing file yields an empty fstab."""
+    text = read_text(path)
+    return parse_fstab(text) if text is not None else Fstab()
+
+def mount_table_from_fstab(fstab: Fstab) -> MountTable:
+    """The mounts `fstab` sets up at boot, for a system that is not running
+    (eg: a disk image). Entries without a mount point (eg: swap) are
+    skipped, and a root mount is assumed if the fstab has none (eg: a
+    container rootfs).
+
+    Every entry gets its own `fstab:N` device, as the actual devices are not known.
+    """
+    entries = []
+    for fstab_entry in fstab:
+        if not fstab_entry.mount_point.startswith("/"):
+            continue
+        entries.append(MountEntry(
+            mount_id=len(entries) + 1,
+            parent_id=0,
+            device=f"fstab:{len(entries) + 1}",
+            root="/",
+            mount_point=fstab_entry.mount_point,
+            mount_options=fstab_entry.mount_options,
+            optional_fields=(),
+            fstype=fstab_entry.fstype,
+            source=fstab_entry.source,
+            super_options=(),
+        ))
+    if not any(entry.mount_point == "/" for entry in entries):
+        entries.insert(0, MountEntry(0, 0, "fstab:0", "/", "/", ("defaults",), (), "rootfs", "rootfs", ()))
+    return MountTable(entries)
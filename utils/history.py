@@ -0,0 +1,236 @@
+"""
+==============
+Result History
+==============
+
+Keeps the results of every run in a local SQLite database, so that past
+runs can be queried instead of grepping archived reports.
+
+Each run is one row of `runs` and one row of `results` per check. The host
+and start time of the run are repeated in `results`, which is indexed on
+them and on the section, so that questions like "when did 1.1.21 first
+fail on this host" are index lookups:
+
+    SELECT MIN(started) FROM results
+    WHERE host = 'web-01' AND section = '1.1.21' AND status != 'Compliant';
+
+Evidence is stored once per distinct content, compressed, keyed by its
+SHA-256 hash, which `results` refers to. A run is written in a single
+transaction when it ends.
+
+Before that, the run can be compared with the previous run of the host:
+checks whose status and evidence hash are unchanged are skipped without
+reading any evidence, the others report their status change and the
+evidence lines the previous run did not have.
+"""
+
+import hashlib
+import sqlite3
+import threading
+import zlib
+
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+
+from .probes import hostname
+from .registry import COMPLIANT
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    host TEXT NOT NULL,
+    started TEXT NOT NULL,
+    checks INTEGER NOT NULL,
+    compliant INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS results (
+    run_id INTEGER NOT NULL REFERENCES runs (id),
+    host TEXT NOT NULL,
+    started TEXT NOT NULL,
+    section TEXT NOT NULL,
+    title TEXT NOT NULL,
+    scored INTEGER NOT NULL,
+    status TEXT NOT NULL,
+    duration REAL NOT NULL,
+    evidence_hash TEXT NOT NULL REFERENCES evidence (hash)
+);
+CREATE TABLE IF NOT EXISTS evidence (
+    hash TEXT PRIMARY KEY,
+    content BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS runs_host_started ON runs (host, started);
+CREATE INDEX IF NOT EXISTS results_host_section_started ON results (host, section, started);
+CREATE INDEX IF NOT EXISTS results_section_started ON results (section, started);
+CREATE INDEX IF NOT EXISTS results_started ON results (started);
+"""
+
+def evidence_hash(evidence: str) -> str:
+    """Content hash under which `evidence` is stored."""
+    return hashlib.sha256(evidence.encode()).hexdigest()
+
+@dataclass
+class Change:
+    """Difference of a check with the previous run of the host.
+
+    Attributes:
+        section (str): Section of the check.
+        title (str): Title of the check.
+        before (str | None): Previous status, None if the check did not run then.
+        after (str): Current status.
+        new_evidence (list[str]): Evidence lines absent from the previous run.
+    """
+    section: str
+    title: str
+    before: str | None
+    after: str
+    new_evidence: list[str] = field(default_factory=list)
+
+def connect(path: str) -> sqlite3.Connection:
+    """Open the history database at `path`, creating the schema if needed."""
+    connection = sqlite3.connect(path)
+    connection.executescript(SCHEMA)
+    return connection
+
+class HistorySink:
+    """Stores the results of a run in the history database.
+
+    Use it as a context manager: the run is written in one transaction on
+    exit, including when the run is aborted.
+
+    Args:
+        path (str): Path of the SQLite database.
+        host (str): Name the run is stored under. Defaults to the checked host.
+    """
+    def __init__(self, path: str, host: str = None):
+        self.path = path
+        self.host = host or hostname()
+        self.started = datetime.now(timezone.utc).isoformat(timespec="seconds")
+        self.runs = []
+        self._lock = threading.Lock()
+
+    def add(self, run):
+        """Record the outcome of a check.
+
+        Args:
+            run (CheckRun): The outcome of the check.
+        """
+        with self._lock:
+            self.runs.append(run)
+
+    def flush(self):
+        """Write the run, in a single transaction. Runs without results are not stored."""
+        with self._lock:
+            runs, self.runs = self.runs, []
+        if not runs:
+            return
+
+        connection = connect(self.path)
+        try:
+            with connection:
+                cursor = connection.execute(
+                    "INSERT INTO runs (host, started, checks, compliant) VALUES (?, ?, ?, ?)",
+                    (self.host, self.started, len(runs), sum(run.status == COMPLIANT for run in runs)),
+                )
+                run_id = cursor.lastrowid
+                hashes = [evidence_hash(run.evidence) for run in runs]
+                connection.executemany(
+                    "INSERT OR IGNORE INTO evidence (hash, content) VALUES (?, ?)",
+                    [(digest, zlib.compress(run.evidence.encode())) for digest, run in zip(hashes, runs)],
+                )
+                connection.executemany(
+                    "INSERT INTO results VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    [
+                        (
+                            run_id, self.host, self.started, run.check.section, run.check.title,
+                            int(run.check.scored), run.status, run.duration, digest,
+                        )
+                        for digest, run in zip(hashes, runs)
+                    ],
+                )
+        finally:
+            connection.close()
+
+    def changes(self) -> list[Change] | None:
+        """Compare the results added so far with the last stored run of the host.
+
+        Returns:
+            list[Change] | None: The checks whose status changed or whose
+            evidence has new lines, in the order they were added. None if
+            the host has no stored run.
+        """
+        with self._lock:
+            runs = list(self.runs)
+
+        connection = connect(self.path)
+        try:
+            row = connection.execute(
+                "SELECT id FROM runs WHERE host = ? ORDER BY started DESC, id DESC LIMIT 1", (self.host,)
+            ).fetchone()
+            if row is None:
+                return None
+            previous = {
+                section: (status, digest)
+                for section, status, digest in connection.execute(
+                    "SELECT section, status, evidence_hash FROM results WHERE run_id = ?", row
+                )
+            }
+
+            changes = []
+            for run in runs:
+                before = previous.get(run.check.section)
+                if before is None:
+                    changes.append(Change(run.check.section, run.check.title, None, run.status))
+                    continue
+                status, digest = before
+                if digest == evidence_hash(run.evidence):
+                    if status != run.status:
+                        changes.append(Change(run.check.section, run.check.title, status, run.status))
+                    continue
+                seen = set(stored_evidence(connection, digest).splitlines())
+                new_evidence = [line for line in run.evidence.splitlines() if line.strip() and line not in seen]
+                if status != run.status or new_evidence:
+                    changes.append(Change(run.check.section, run.check.title, status, run.status, new_evidence))
+            return changes
+        finally:
+            connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.flush()
+
+def first_failure(connection: sqlite3.Connection, host: str, section: str) -> str | None:
+    """Start time of the first run in which `section` was not compliant on `host`."""
+    row = connection.execute(
+        "SELECT MIN(started) FROM results WHERE host = ? AND section = ? AND status != ?",
+        (host, section, COMPLIANT),
+    ).fetchone()
+    return row[0]
+
+def status_history(connection: sqlite3.Connection, host: str, section: str) -> list[tuple[str, str]]:
+    """(start time, status) of `section` in every run on `host`, oldest first."""
+    return connection.execute(
+        "SELECT started, status FROM results WHERE host = ? AND section = ? ORDER BY started",
+        (host, section),
+    ).fetchall()
+
+def stored_evidence(connection: sqlite3.Connection, digest: str) -> str | None:
+    """The evidence stored under `digest`."""
+    row = connection.execute("SELECT content FROM evidence WHERE hash = ?", (digest,)).fetchone()
+    return zlib.decompress(row[0]).decode() if row else None
+
+def format_changes(changes: list[Change]) -> str:
+    """One line per changed check, followed by its new evidence lines."""
+    if not changes:
+        return "No changes since the previous run.\n"
+    lines = []
+    for change in changes:
+        if change.before is None:
+            lines.append(f"[{change.section}] {change.title}: {change.after} (not checked before)")
+        elif change.before != change.after:
+            lines.append(f"[{change.section}] {change.title}: {change.before} -> {change.after}")
+        else:
+            lines.append(f"[{change.section}] {change.title}: still {change.after}")
+        lines.extend(f"  + {line}" for line in change.new_evidence)
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,228 @@
+"""
+===================
+Modprobe Resolution
+===================
+
+Resolves what `modprobe -n -v <module>` would do by parsing the modprobe
+configuration directories and the module index of the running kernel once,
+instead of forking modprobe for every module of interest.
+
+See modprobe.d(5) and modules.dep(5) for the file formats.
+"""
+
+import fnmatch
+import os
+import re
+
+from dataclasses import dataclass, field
+
+from .modules import normalize_module_name
+from .probes import kernel_release, list_dir, read_text
+
+# Listed from highest to lowest priority; a file name in an earlier
+# directory shadows the same file name in a later one.
+CONFIG_DIRS = ("/etc/modprobe.d", "/run/modprobe.d", "/usr/local/lib/modprobe.d", "/lib/modprobe.d", "/usr/lib/modprobe.d")
+
+MODULES_DIR = "/lib/modules"
+
+DISABLING_COMMANDS = ("true", "false")
+
+_MODULE_SUFFIXES = (".ko", ".ko.gz", ".ko.xz", ".ko.zst")
+
+def _module_name_from_path(path: str) -> str:
+    name = os.path.basename(path)
+    for suffix in _MODULE_SUFFIXES:
+        if name.endswith(suffix):
+            name = name[:-len(suffix)]
+            break
+    return normalize_module_name(name)
+
+def _logical_lines(text: str):
+    """Yield configuration lines with comments stripped and `\\` continuations joined."""
+    pending = ""
+    for line in text.splitlines():
+        if line.endswith("\\"):
+            pending += line[:-1] + " "
+            continue
+        line = pending + line
+        pending = ""
+        line = line.strip()
+        if line and not line.startswith("#"):
+            yield line
+    if pending.strip() and not pending.lstrip().startswith("#"):
+        yield pending.strip()
+
+@dataclass(frozen=True)
+class ModuleResolution:
+    """What modprobe would do when asked to load a module.
+
+    Attributes:
+        name (str): Normalized name of the requested module.
+        install_command (str): Command from an `install` directive, if any.
+        blacklisted (bool): Whether a `blacklist` directive names the module.
+        builtin (bool): Whether the module is built into the kernel.
+        load_paths (tuple[str, ...]): Module files insmod'ed in order, dependencies first.
+    """
+    name: str
+    install_command: str = ""
+    blacklisted: bool = False
+    builtin: bool = False
+    load_paths: tuple[str, ...] = ()
+
+    @property
+    def disabled(self) -> bool:
+        """Whether loading the module is prevented.
+
+        An `install` directive that runs /bin/true or /bin/false disables the
+        module, as does a module that is neither built in nor installed.
+        """
+        if self.install_command:
+            argv = self.install_command.split()
+            return os.path.basename(argv[0]) in DISABLING_COMMANDS
+        return not self.builtin and not self.load_paths
+
+    def describe(self) -> str:
+        """The equivalent of the `modprobe -n -v` output."""
+        lines = []
+        if self.blacklisted:
+            lines.append(f"blacklist {self.name}")
+        if self.install_command:
+            lines.append(f"install {self.install_command}")
+        elif self.builtin:
+            lines.append(f"builtin {self.name}")
+        else:
+            lines.extend(f"insmod {path}" for path in self.load_paths)
+        return "\n".join(lines)
+
+@dataclass
+class ModprobeConfig:
+    """Parsed modprobe configuration and module index of one kernel.
+
+    Attributes:
+        install (dict[str, str]): `install` commands keyed by module name.
+        blacklist (set[str]): Blacklisted module names.
+        aliases (list[tuple[str, str]]): `alias` wildcards from modprobe.d and modules.alias.
+        dependencies (dict[str, tuple[str, ...]]): Module name mapped to its file and its
+        dependency files, as listed in modules.dep.
+        builtin (set[str]): Modules built into the kernel.
+        modules_dir (str): Directory of the kernel modules (eg: /lib/modules/6.5.0-35-generic).
+    """
+    install: dict[str, str] = field(default_factory=dict)
+    blacklist: set[str] = field(default_factory=set)
+    aliases: list[tuple[str, str]] = field(default_factory=list)
+    dependencies: dict[str, tuple[str, ...]] = field(default_factory=dict)
+    builtin: set[str] = field(default_factory=set)
+    modules_dir: str = ""
+
+    def _load_paths(self, name: str) -> tuple[str, ...]:
+        if name not in self.dependencies:
+            return ()
+        module_path, *deps = self.dependencies[name]
+        # modprobe loads the dependencies deepest first, then the module itself
+        paths = [os.path.join(self.modules_dir, dep) for dep in reversed(deps)]
+        paths.append(os.path.join(self.modules_dir, module_path))
+        return tuple(paths)
+
+    def _resolve_alias(self, name: str) -> str:
+        for pattern, target in self.aliases:
+            if fnmatch.fnmatchcase(name, pattern):
+                return normalize_module_name(target)
+        return name
+
+    def resolve(self, module: str) -> ModuleResolution:
+        """Work out what `modprobe -n -v <module>` would do."""
+        name = normalize_module_name(module)
+        if name not in self.install and name not in self.dependencies and name not in self.builtin:
+            name = self._resolve_alias(name)
+
+        return ModuleResolution(
+            name=name,
+            install_command=self.install.get(name, ""),
+            blacklisted=name in self.blacklist,
+            builtin=name in self.builtin,
+            load_paths=self._load_paths(name),
+        )
+
+    def resolve_all(self, modules) -> dict[str, ModuleResolution]:
+        """Resolve every module in `modules`, keyed by the requested name."""
+        return {module: self.resolve(module) for module in modules}
+
+def _config_files(config_dirs: tuple[str, ...]) -> list[str]:
+    files = {}
+    for directory in config_dirs:
+        for name in list_dir(directory) or ():
+            if name.endswith(".conf") and name not in files:
+                files[name] = os.path.join(directory, name)
+    # modprobe reads the files in lexical order of their names
+    return [files[name] for name in sorted(files)]
+
+def _read(path: str) -> str:
+    return read_text(path) or ""
+
+def _installed_kernel(modules_root: str) -> str:
+    # A system that is not running has no current kernel, take the newest one
+    releases = list_dir(modules_root) or []
+    return max(releases, key=_version_key, default="")
+
+def _version_key(release: str) -> list[tuple[int, int, str]]:
+    # Numeric parts compare as numbers, so that 5.15.0-100 is newer than 5.15.0-91
+    return [(1, int(part), "") if part.isdigit() else (0, 0, part) for part in re.split(r"[.-]", release)]
+
+def read_modprobe_config(config_dirs: tuple[str, ...] = CONFIG_DIRS, modules_dir: str = None, root: str = "/") -> ModprobeConfig:
+    """Parse the modprobe configuration and the module index in one pass.
+
+    Args:
+        config_dirs (tuple[str, ...]): modprobe.d directories, highest priority first.
+        modules_dir (str): Module directory of the kernel to resolve against.
+        Defaults to the one of the kernel of the checked host.
+        root (str): Directory the checked system is found at. Unless it is
+        `/`, the directories are taken under it and the kernel defaults to
+        the newest one installed there.
+
+    Returns:
+        ModprobeConfig: The resolver for every module of that kernel.
+    """
+    if root != "/":
+        config_dirs = tuple(os.path.join(root, directory.lstrip("/")) for directory in config_dirs)
+        if modules_dir is None:
+            modules_root = os.path.join(root, MODULES_DIR.lstrip("/"))
+            modules_dir = os.path.join(modules_root, _installed_kernel(modules_root))
+        else:
+            modules_dir = os.path.join(root, modules_dir.lstrip("/"))
+    elif modules_dir is None:
+        modules_dir = os.path.join(MODULES_DIR, kernel_release())
+
+    config = ModprobeConfig(modules_dir=modules_dir)
+
+    for path in _config_files(config_dirs):
+        for line in _logical_lines(_read(path)):
+            # Fields are separated by any whitespace, see modprobe.d(5)
+            directive, rest = (line.split(None, 1) + [""])[:2]
+            rest = rest.strip()
+            if directive == "install" and rest:
+                module, command = (rest.split(None, 1) + [""])[:2]
+                # The first matching install directive wins
+                config.install.setdefault(normalize_module_name(module), command.strip())
+            elif directive == "blacklist" and rest:
+                config.blacklist.add(normalize_module_name(rest.split()[0]))
+            elif directive == "alias" and rest:
+                fields = rest.split()
+                if len(fields) >= 2:
+                    config.aliases.append((normalize_module_name(fields[0]), fields[1]))
+
+    for line in _read(os.path.join(modules_dir, "modules.dep")).splitlines():
+        module_path, sep, deps = line.partition(":")
+        if sep:
+            name = _module_name_from_path(module_path)
+            config.dependencies[name] = (module_path.strip(), *deps.split())
+
+    for line in _read(os.path.join(modules_dir, "modules.builtin")).splitlines():
+        if line.strip():
+            config.builtin.add(_module_name_from_path(line.strip()))
+
+    for line in _logical_lines(_read(os.path.join(modules_dir, "modules.alias"))):
+        fields = line.split()
+        if len(fields) >= 3 and fields[0] == "alias":
+            config.aliases.append((normalize_module_name(fields[1]), fields[2]))
+
+    return config
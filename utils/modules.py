@@ -0,0 +1,36 @@
+"""
+==============
+Kernel Modules
+==============
+
+Helpers for inspecting kernel modules without shelling out to `lsmod`.
+"""
+
+from .probes import read_text
+
+MODULES_FILE = "/proc/modules"
+
+def normalize_module_name(name: str) -> str:
+    """The kernel treats `-` and `_` in module names as the same character."""
+    return name.replace("-", "_")
+
+def parse_modules(text: str) -> dict[str, str]:
+    """Index the content of /proc/modules by normalized module name.
+
+    Args:
+        text (str): Content of /proc/modules.
+
+    Returns:
+        dict[str, str]: Normalized module name mapped to its /proc/modules line.
+    """
+    modules = {}
+    for line in text.splitlines():
+        fields = line.split(maxsplit=1)
+        if fields:
+            modules[normalize_module_name(fields[0])] = line
+    return modules
+
+def read_loaded_modules(path: str = MODULES_FILE) -> dict[str, str]:
+    """Read /proc/modules. A missing file (eg: no module support) yields no modules."""
+    text = read_text(path)
+    return parse_modules(text) if text is not None else {}
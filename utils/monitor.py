@@ -0,0 +1,254 @@
+"""
+==============
+Change Monitor
+==============
+
+Waits for changes to the system state the checks inspect and reports which
+facts they affect, so that watch mode only re-evaluates the checks that
+depend on them:
+
+- mount table changes, through poll(2) on /proc/self/mountinfo
+- /etc/fstab, modprobe.d and systemd unit edits, through inotify(7)
+- chmod and new directories under the watched directories, through inotify(7)
+- loaded kernel modules, by comparing /proc/modules on every wake up
+
+Without inotify (eg: the libc does not provide it) the files and directories
+are polled for mtime and ctime changes instead.
+"""
+
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import time
+
+from .modprobe import CONFIG_DIRS
+from .modules import MODULES_FILE
+from .mountinfo import MOUNTINFO_FILE
+from .systemd import UNIT_DIRS, WANTS_SUFFIXES
+
+# Upper bound on inotify watches placed on directories for the sticky-bit
+# check, well below the usual fs.inotify.max_user_watches
+MAX_DIRECTORY_WATCHES = 4096
+
+# Seconds to keep collecting events after the first one, so that a burst of
+# edits triggers a single re-evaluation
+SETTLE_TIME = 0.5
+
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_ISDIR = 0x40000000
+
+_FILE_EVENTS = IN_CLOSE_WRITE | IN_MOVED_TO | IN_MOVED_FROM | IN_CREATE | IN_DELETE | IN_ATTRIB | IN_DELETE_SELF
+_DIRECTORY_EVENTS = IN_ATTRIB | IN_CREATE | IN_MOVED_TO | IN_DELETE_SELF
+
+_EVENT_HEADER = struct.Struct("iIII")
+
+class _Inotify:
+    """Minimal ctypes binding of inotify(7)."""
+    def __init__(self):
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self._add_watch = libc.inotify_add_watch
+        self._add_watch.argtypes = (ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32)
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+
+    def add_watch(self, path: str, mask: int) -> int:
+        wd = self._add_watch(self.fd, os.fsencode(path), mask)
+        if wd < 0:
+            raise OSError(ctypes.get_errno(), f"inotify_add_watch failed for {path}")
+        return wd
+
+    def read_events(self):
+        """Yield (wd, mask, name) of the queued events."""
+        while True:
+            try:
+                data = os.read(self.fd, 65536)
+            except BlockingIOError:
+                return
+            offset = 0
+            while offset < len(data):
+                wd, mask, _, length = _EVENT_HEADER.unpack_from(data, offset)
+                offset += _EVENT_HEADER.size
+                name = data[offset:offset + length].rstrip(b"\0").decode(errors="replace")
+                offset += length
+                yield wd, mask, name
+
+    def close(self):
+        os.close(self.fd)
+
+def directory_watch_list(roots: list[str], limit: int = MAX_DIRECTORY_WATCHES) -> list[str]:
+    """Directories to watch for the sticky-bit check, breadth first from
+    `roots` and without leaving their devices, at most `limit` of them."""
+    directories, queue = [], []
+    for root in roots:
+        try:
+            queue.append((root, os.lstat(root).st_dev))
+        except OSError:
+            continue
+    while queue and len(directories) < limit:
+        path, device = queue.pop(0)
+        directories.append(path)
+        try:
+            with os.scandir(path) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir(follow_symlinks=False) and entry.stat(follow_symlinks=False).st_dev == device:
+                            queue.append((entry.path, device))
+                    except OSError:
+                        continue
+        except OSError:
+            continue
+    return directories
+
+class ChangeMonitor:
+    """Reports which facts changed since the previous wake up.
+
+    The fact names are the Facts fields, plus `directories` for the
+    directories watched for the sticky-bit check. Use it as a context manager
+    to release the file descriptors.
+
+    Args:
+        directories (list[str]): Directories to watch for chmod and new subdirectories.
+    """
+    def __init__(self, directories: list[str] = ()):
+        self._watches = {}
+        self._polled = {}
+        self._directory_watches = 0
+
+        self._mountinfo = open(MOUNTINFO_FILE)
+        self._mountinfo.read()
+        self._poller = select.poll()
+        self._poller.register(self._mountinfo, select.POLLPRI | select.POLLERR)
+
+        try:
+            self._inotify = _Inotify()
+            self._poller.register(self._inotify.fd, select.POLLIN)
+        except (OSError, AttributeError):
+            self._inotify = None
+
+        self._watch("/etc", "fstab", _FILE_EVENTS, only="fstab")
+        for directory in CONFIG_DIRS:
+            self._watch(directory, "modprobe", _FILE_EVENTS)
+        for directory in UNIT_DIRS:
+            self._watch(directory, "unit_states", _FILE_EVENTS)
+            for name in self._subdirectories(directory):
+                if name.endswith(WANTS_SUFFIXES):
+                    self._watch(os.path.join(directory, name), "unit_states", _FILE_EVENTS)
+        for directory in directories:
+            self._watch_directory(directory)
+
+        self._modules = self._read_modules()
+
+    @staticmethod
+    def _subdirectories(path: str) -> list[str]:
+        try:
+            return [entry.name for entry in os.scandir(path) if entry.is_dir(follow_symlinks=False)]
+        except OSError:
+            return []
+
+    @staticmethod
+    def _read_modules() -> str:
+        try:
+            with open(MODULES_FILE) as f:
+                # Drop the reference counts, only the set of modules matters
+                return "\n".join(sorted(line.split()[0] for line in f if line.strip()))
+        except OSError:
+            return ""
+
+    @staticmethod
+    def _signature(path: str):
+        try:
+            st = os.stat(path)
+            return st.st_mtime_ns, st.st_ctime_ns, st.st_mode
+        except OSError:
+            return None
+
+    def _watch(self, path: str, fact: str, mask: int, only: str = None):
+        if not os.path.isdir(path):
+            return
+        if self._inotify is None:
+            polled = os.path.join(path, only) if only else path
+            self._polled[polled] = (fact, self._signature(polled))
+            return
+        try:
+            wd = self._inotify.add_watch(path, mask)
+        except OSError:
+            return
+        self._watches[wd] = (fact, only, path)
+
+    def _watch_directory(self, path: str):
+        if self._directory_watches >= MAX_DIRECTORY_WATCHES:
+            return
+        self._directory_watches += 1
+        self._watch(path, "directories", _DIRECTORY_EVENTS)
+
+    def _drain(self) -> set[str]:
+        changed = set()
+        for fd, _ in self._poller.poll(0):
+            if fd == self._mountinfo.fileno():
+                self._mountinfo.seek(0)
+                self._mountinfo.read()
+                changed.add("mounts")
+        if self._inotify is not None:
+            for wd, mask, name in self._inotify.read_events():
+                if wd not in self._watches:
+                    continue
+                fact, only, path = self._watches[wd]
+                if only is not None and name != only:
+                    continue
+                # Only the mode of directories matters, ignore files coming
+                # and going (eg: the reports themselves)
+                if fact == "directories" and name and not mask & IN_ISDIR:
+                    continue
+                changed.add(fact)
+                # New subdirectories are watched too, within the budget
+                if fact == "directories" and mask & IN_ISDIR and mask & (IN_CREATE | IN_MOVED_TO):
+                    self._watch_directory(os.path.join(path, name))
+        for path, (fact, signature) in self._polled.items():
+            current = self._signature(path)
+            if current != signature:
+                self._polled[path] = (fact, current)
+                changed.add(fact)
+        modules = self._read_modules()
+        if modules != self._modules:
+            self._modules = modules
+            changed.add("loaded_modules")
+        return changed
+
+    def wait(self, timeout: float | None) -> set[str] | None:
+        """Block until something changes or `timeout` seconds pass.
+
+        Returns:
+            set[str] | None: Names of the changed facts, None if the timeout expired.
+        """
+        end = time.monotonic() + timeout if timeout is not None else None
+        while True:
+            remaining = end - time.monotonic() if end is not None else None
+            if remaining is not None and remaining <= 0:
+                return None
+            # /proc/modules cannot be polled, and without inotify neither can
+            # the files, so wake up every second to compare them
+            self._poller.poll(min(remaining, 1.0) * 1000 if remaining is not None else 1000)
+            changed = self._drain()
+            if changed:
+                time.sleep(SETTLE_TIME)
+                return changed | self._drain()
+
+    def close(self):
+        self._mountinfo.close()
+        if self._inotify is not None:
+            self._inotify.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
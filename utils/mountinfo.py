@@ -0,0 +1,138 @@
+"""
+==========
+Mountinfo
+==========
+
+Pure-Python parser for /proc/self/mountinfo. It produces structured mount
+records so that checks can look up a mount point and its options without
+shelling out to `mount | grep`.
+
+See proc(5) for the format of each line:
+
+    36 35 98:0 /mnt1 /mnt2 rw,noatime master:1 - ext3 /dev/root rw,errors=continue
+"""
+
+import re
+
+from dataclasses import dataclass, field
+
+from .probes import read_text
+
+MOUNTINFO_FILE = "/proc/self/mountinfo"
+
+_OCTAL_ESCAPE = re.compile(r"\\([0-7]{3})")
+
+def decode_octal_escapes(value: str) -> str:
+    """Decode the `\\040` style escapes the kernel uses for spaces, tabs,
+    newlines and backslashes in mount fields."""
+    return _OCTAL_ESCAPE.sub(lambda m: chr(int(m.group(1), 8)), value)
+
+def _option_names(options: tuple[str, ...]) -> frozenset[str]:
+    return frozenset(option.split("=", 1)[0] for option in options)
+
+@dataclass(frozen=True)
+class MountEntry:
+    """A single line of /proc/self/mountinfo.
+
+    Attributes:
+        mount_id (int): Unique identifier of the mount.
+        parent_id (int): Identifier of the parent mount.
+        device (str): `major:minor` of the backing device.
+        root (str): Root of the mount within the filesystem.
+        mount_point (str): Mount point relative to the process root.
+        mount_options (tuple[str, ...]): Per-mount options (eg: nodev, nosuid).
+        optional_fields (tuple[str, ...]): Propagation fields (eg: shared:1).
+        fstype (str): Filesystem type (eg: ext4, tmpfs).
+        source (str): Mount source (eg: /dev/sda1, tmpfs).
+        super_options (tuple[str, ...]): Per-superblock options.
+    """
+    mount_id: int
+    parent_id: int
+    device: str
+    root: str
+    mount_point: str
+    mount_options: tuple[str, ...]
+    optional_fields: tuple[str, ...]
+    fstype: str
+    source: str
+    super_options: tuple[str, ...]
+    options: frozenset[str] = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        names = _option_names(self.mount_options) | _option_names(self.super_options)
+        object.__setattr__(self, "options", names)
+
+    def has_option(self, option: str) -> bool:
+        """Whether `option` is set on the mount or its superblock."""
+        return option in self.options
+
+    def __str__(self) -> str:
+        # Same layout as the `mount` command so evidence stays familiar
+        return f"{self.source} on {self.mount_point} type {self.fstype} ({','.join(self.mount_options)})"
+
+def parse_mountinfo_line(line: str) -> MountEntry:
+    """Parse one mountinfo line.
+
+    Raises:
+        ValueError: If the line does not follow the mountinfo format.
+    """
+    fields = line.split()
+    try:
+        separator = fields.index("-", 6)
+    except ValueError:
+        raise ValueError(f"Malformed mountinfo line: {line!r}") from None
+
+    if len(fields) < separator + 3:
+        raise ValueError(f"Malformed mountinfo line: {line!r}")
+
+    return MountEntry(
+        mount_id=int(fields[0]),
+        parent_id=int(fields[1]),
+        device=fields[2],
+        root=decode_octal_escapes(fields[3]),
+        mount_point=decode_octal_escapes(fields[4]),
+        mount_options=tuple(fields[5].split(",")),
+        optional_fields=tuple(fields[6:separator]),
+        fstype=decode_octal_escapes(fields[separator + 1]),
+        source=decode_octal_escapes(fields[separator + 2]),
+        super_options=tuple(fields[separator + 3].split(",")) if len(fields) > separator + 3 else (),
+    )
+
+class MountTable:
+    """Parsed mount table with constant time lookups by mount point.
+
+    When a mount point is stacked, lookups return the topmost (last) mount,
+    which is the one visible to processes.
+    """
+    def __init__(self, entries: list[MountEntry] = None):
+        self.entries = list(entries or [])
+        self._by_mount_point = {entry.mount_point: entry for entry in self.entries}
+
+    def get(self, mount_point: str) -> MountEntry | None:
+        return self._by_mount_point.get(mount_point)
+
+    def __contains__(self, mount_point: str) -> bool:
+        return mount_point in self._by_mount_point
+
+    def __iter__(self):
+        return iter(self.entries)
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+def parse_mountinfo(text: str) -> MountTable:
+    """Parse the full content of a mountinfo file, skipping malformed lines."""
+    entries = []
+    for line in text.splitlines():
+        if not line.strip():
+            continue
+        try:
+            entries.append(parse_mountinfo_line(line))
+        except ValueError:
+            continue
+    return MountTable(entries)
+
+def read_mountinfo(path: str = MOUNTINFO_FILE) -> MountTable:
+    """Read and parse a mountinfo file. A missing file yields an empty table."""
+    text = read_text(path)
+    return parse_mountinfo(text) if text is not None else MountTable()
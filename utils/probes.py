@@ -0,0 +1,179 @@
+"""
+=============
+Probe Archive
+=============
+
+Everything the checks learn about a host goes through a probe: a file
+read, a directory listing, a symlink read or the world-writable directory
+walk. When recording, every probe and its outcome is added to an archive
+that is saved as gzip-compressed JSON. When replaying, the probes are
+answered from the archive without touching the local filesystem, so a
+captured host can be scored again anywhere, in milliseconds, and always
+with the same input.
+
+A probe missing from the archive fails the way a missing file would: it
+cannot be read.
+"""
+
+import os
+
+# gzip, json and datetime are only imported when recording or replaying,
+# which most runs do not
+
+ARCHIVE_VERSION = 3
+
+_settings = {"archive": None, "replay": False}
+
+class ProbeArchive:
+    """Outcome of every probe run against a host.
+
+    Attributes:
+        meta (dict): Host, kernel release, recording time, OS and root of the
+        recorded host.
+        files (dict[str, str | None]): Content of every file read, None if
+        it could not be read.
+        directories (dict[str, list[str] | None]): Entries of every directory
+        listed, None if it could not be listed.
+        links (dict[str, str | None]): Target of every symlink read, None if
+        the path is not a symlink.
+        walks (dict[str, dict]): Paths found, errors and timeout flag of every
+        world-writable directory walk, keyed by its roots.
+    """
+    def __init__(self, meta: dict = None):
+        self.meta = meta or {}
+        self.files = {}
+        self.directories = {}
+        self.links = {}
+        self.walks = {}
+
+    def save(self, path: str):
+        import gzip
+        import json
+
+        data = {
+            "version": ARCHIVE_VERSION,
+            "meta": self.meta,
+            "files": self.files,
+            "directories": self.directories,
+            "links": self.links,
+            "walks": self.walks,
+        }
+        with gzip.open(path, "wt") as f:
+            json.dump(data, f, separators=(",", ":"))
+
+    @classmethod
+    def load(cls, path: str) -> "ProbeArchive":
+        """Read an archive saved by `save`.
+
+        Raises:
+            ValueError: If the file is not a probe archive of this version.
+        """
+        import gzip
+        import json
+
+        with gzip.open(path, "rt") as f:
+            data = json.load(f)
+        if data.get("version") != ARCHIVE_VERSION:
+            raise ValueError(f"{path} is not a version {ARCHIVE_VERSION} probe archive")
+        archive = cls(data["meta"])
+        archive.files = data["files"]
+        archive.directories = data["directories"]
+        archive.links = data["links"]
+        archive.walks = data["walks"]
+        return archive
+
+def record(meta: dict = None) -> ProbeArchive:
+    """Start recording the probes into a new archive.
+
+    Args:
+        meta (dict): Extra metadata to store (eg: the OS information).
+
+    Returns:
+        ProbeArchive: The archive, to `save` once the run is done.
+    """
+    from datetime import datetime, timezone
+
+    archive = ProbeArchive({
+        "host": os.uname().nodename,
+        "kernel": os.uname().release,
+        "recorded": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        **(meta or {}),
+    })
+    _settings["archive"] = archive
+    _settings["replay"] = False
+    return archive
+
+def replay(archive: ProbeArchive):
+    """Answer the probes from `archive` from now on."""
+    _settings["archive"] = archive
+    _settings["replay"] = True
+
+def stop():
+    """Run the probes against the host again, without recording."""
+    _settings["archive"] = None
+    _settings["replay"] = False
+
+def recording() -> ProbeArchive | None:
+    """The archive being recorded, if any."""
+    return _settings["archive"] if not _settings["replay"] else None
+
+def replaying() -> ProbeArchive | None:
+    """The archive being replayed, if any."""
+    return _settings["archive"] if _settings["replay"] else None
+
+def hostname() -> str:
+    """Name of the host being checked."""
+    archive = replaying()
+    if archive is not None:
+        return archive.meta.get("host", "")
+    return os.uname().nodename
+
+def kernel_release() -> str:
+    """Kernel release of the host being checked (eg: 5.15.0-91-generic)."""
+    archive = replaying()
+    if archive is not None:
+        return archive.meta.get("kernel", "")
+    return os.uname().release
+
+def read_text(path: str) -> str | None:
+    """Content of the file at `path`, None if it cannot be read."""
+    archive = replaying()
+    if archive is not None:
+        return archive.files.get(path)
+    try:
+        with open(path) as f:
+            content = f.read()
+    except OSError:
+        content = None
+    archive = recording()
+    if archive is not None:
+        archive.files[path] = content
+    return content
+
+def list_dir(path: str) -> list[str] | None:
+    """Entries of the directory at `path`, None if it cannot be listed."""
+    archive = replaying()
+    if archive is not None:
+        return archive.directories.get(path)
+    try:
+        names = os.listdir(path)
+    except OSError:
+        names = None
+    archive = recording()
+    if archive is not None:
+        archive.directories[path] = names
+    return names
+
+def read_link(path: str) -> str | None:
+    """Target of the symlink at `path`, None if it is not a symlink."""
+    archive = replaying()
+    if archive is not None:
+        return archive.links.get(path)
+    try:
+        target = os.readlink(path)
+    except OSError:
+        target = None
+    archive = recording()
+    if archive is not None:
+        archive.links[path] = target
+    return target
@@ -0,0 +1,115 @@
+"""
+==============
+Check Registry
+==============
+
+Checks declare their section, title, scoring, profile applicability and the
+facts they need with the `check` decorator. The runner selects, orders and
+schedules them from these declarations.
+"""
+
+from dataclasses import dataclass
+from collections.abc import Callable
+
+COMPLIANT = "Compliant"
+NOT_COMPLIANT = "Not Compliant"
+TIMED_OUT = "Timed Out"
+
+PROFILES = ("server", "workstation")
+
+def status(is_compliant: bool, timed_out: bool = False) -> str:
+    """The result a check reports in the Checklist column."""
+    if timed_out:
+        return TIMED_OUT
+    return COMPLIANT if is_compliant else NOT_COMPLIANT
+
+@dataclass(frozen=True)
+class Check:
+    """A registered check.
+
+    Attributes:
+        func (Callable): Function taking the Facts and returning the check status.
+        section (str): CIS section number (eg: 1.1.1.1).
+        title (str): CIS recommendation title.
+        scored (bool): Whether the recommendation is scored.
+        levels (tuple[str, ...]): Profile applicability (eg: Level 1 - Server).
+        facts (tuple[str, ...]): Names of the Facts fields the check reads, and
+        `directories` if it walks the directory tree. Watch mode re-evaluates
+        the check when one of them changes.
+    """
+    func: Callable
+    section: str
+    title: str
+    scored: bool = True
+    levels: tuple[str, ...] = ()
+    facts: tuple[str, ...] = ()
+
+    @property
+    def name(self) -> str:
+        return self.func.__name__
+
+    @property
+    def sort_key(self) -> tuple[int, ...]:
+        return tuple(int(part) for part in self.section.split("."))
+
+    @property
+    def heading(self) -> str:
+        scored = "Scored" if self.scored else "Not Scored"
+        return f"[{self.section}] {self.title} ({scored})"
+
+    def in_sections(self, sections: list[str]) -> bool:
+        """Whether the check is one of `sections` or nested under one of them."""
+        return any(self.section == s or self.section.startswith(f"{s}.") for s in sections)
+
+    def applies_to(self, level: int, profile: str = None) -> bool:
+        """Whether the check is part of the given profile level.
+
+        A level 2 profile includes the level 1 recommendations.
+        """
+        for applicability in self.levels:
+            check_level, _, check_profile = applicability.partition(" - ")
+            if int(check_level.split()[-1]) > level:
+                continue
+            if profile is None or check_profile.lower() == profile.lower():
+                return True
+        return False
+
+    def __call__(self, facts) -> str:
+        return self.func(facts)
+
+_checks: dict[str, Check] = {}
+
+def check(section: str, title: str, scored: bool = True, levels: tuple[str, ...] = (), facts: tuple[str, ...] = ()):
+    """Register the decorated function as the check of `section`.
+
+    Raises:
+        ValueError: If another check is already registered for `section`.
+    """
+    def decorator(func: Callable) -> Callable:
+        if section in _checks:
+            raise ValueError(f"Section {section} is already registered by {_checks[section].name}")
+        _checks[section] = Check(func, section, title, scored, tuple(levels), tuple(facts))
+        return func
+    return decorator
+
+def select_checks(sections: list[str] = None, level: int = None, profile: str = None) -> list[Check]:
+    """Registered checks in section order, optionally filtered.
+
+    Args:
+        sections (list[str]): Only keep these sections and their subsections.
+        level (int): Only keep checks of this profile level (1 or 2).
+        profile (str): Only keep checks of this profile (server or workstation).
+
+    Returns:
+        list[Check]: The selected checks.
+    """
+    checks = sorted(_checks.values(), key=lambda c: c.sort_key)
+    if sections:
+        checks = [c for c in checks if c.in_sections(sections)]
+    if level is not None or profile is not None:
+        checks = [c for c in checks if c.applies_to(level or 2, profile)]
+    return checks
+
+def required_facts(checks: list[Check]) -> set[str]:
+    """Union of the facts needed by `checks`."""
+    return {name for c in checks for name in c.facts}
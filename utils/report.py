@@ -0,0 +1,268 @@
+"""
+===========
+Report Sink
+===========
+
+Collects the text evidence and CSV rows of a run in memory and writes both
+report files once, atomically, when the run ends or is interrupted by a
+signal. A report identical to the one on disk is left untouched, so the
+reports hold no timestamp and the cost of the checks, which differs on every
+run, goes to a file of its own. Merely importing a module that defines
+checks no longer touches the report files.
+
+Alongside, the JSON Lines stream emits one structured record per check as
+soon as the check completes, so results can be tailed and ingested while
+the run is still going.
+
+`summary_table` formats the cost of every check of a run.
+"""
+
+import csv
+import io
+import json
+import os
+import signal
+import stat
+import tempfile
+import threading
+
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+from . import console
+from .probes import hostname
+
+def _unchanged(path: str, content: str) -> bool:
+    # Compare sizes first so that only likely-identical files are read back
+    data = content.encode()
+    try:
+        if os.stat(path).st_size != len(data):
+            return False
+        with open(path, "rb") as f:
+            return f.read() == data
+    except OSError:
+        return False
+
+def _umask() -> int:
+    # Read without setting it, which would race with threads creating files
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("Umask:"):
+                    return int(line.split()[1], 8)
+    except (OSError, ValueError):
+        pass
+    umask = os.umask(0o022)
+    os.umask(umask)
+    return umask
+
+@contextmanager
+def atomic_file(path: str):
+    """Text file that replaces `path` once the block completes.
+
+    Readers see either the previous file or the complete new one, never a
+    partial one. The file is discarded if the block raises.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    # mkstemp creates the file 0600, the report keeps the mode it had, or
+    # gets the one `open` would give it
+    try:
+        mode = stat.S_IMODE(os.stat(path).st_mode)
+    except OSError:
+        mode = 0o666 & ~_umask()
+
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(path)}.")
+    try:
+        with os.fdopen(fd, "w", newline='') as f:
+            os.fchmod(f.fileno(), mode)
+            yield f
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+def _atomic_write(path: str, content: str):
+    if _unchanged(path, content):
+        return
+    with atomic_file(path) as f:
+        f.write(content)
+
+def _format_bytes(size: int) -> str:
+    for unit in ("B", "KiB", "MiB"):
+        if size < 1024:
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GiB"
+
+def summary_table(runs: list) -> str:
+    """Table of the wall time, CPU time and peak RSS growth of every check,
+    with the totals in the last row.
+
+    Args:
+        runs (list[CheckRun]): The checks of the run, in report order.
+    """
+    headers = ("Section", "Wall (s)", "CPU (s)", "Peak RSS +")
+    rows = [
+        (run.check.section, f"{run.duration:.3f}", f"{run.cpu_time:.3f}", _format_bytes(run.peak_rss_delta))
+        for run in runs
+    ]
+    rows.append((
+        "Total",
+        f"{sum(run.duration for run in runs):.3f}",
+        f"{sum(run.cpu_time for run in runs):.3f}",
+        _format_bytes(sum(run.peak_rss_delta for run in runs)),
+    ))
+    widths = [max(len(row[i]) for row in (headers, *rows)) for i in range(len(headers))]
+
+    def line(row):
+        # Section left aligned, figures right aligned
+        cells = [row[0].ljust(widths[0])] + [cell.rjust(width) for cell, width in zip(row[1:], widths[1:])]
+        return "  ".join(cells)
+
+    separator = "  ".join("-" * width for width in widths)
+    return "\n".join([line(headers), separator, *map(line, rows[:-1]), separator, line(rows[-1])]) + "\n"
+
+class ReportSink:
+    """Buffered text and CSV report of a run.
+
+    Use it as a context manager: the reports are flushed on exit, including
+    when the run is aborted by an exception, SIGINT or SIGTERM.
+
+    Args:
+        text_path (str): Path of the text report.
+        csv_path (str): Path of the CSV report.
+        csv_headers (list[str]): Header row of the CSV report.
+        costs_path (str): Path of the cost table of the run, not written when None.
+    """
+    def __init__(self, text_path: str, csv_path: str, csv_headers: list[str], costs_path: str = None):
+        self.text_path = text_path
+        self.csv_path = csv_path
+        self.csv_headers = csv_headers
+        self.costs_path = costs_path
+        self.rows = []
+        self.costs = None
+        self._text = io.StringIO()
+        self._lock = threading.Lock()
+        self._flushed = False
+        self._previous_handler = None
+
+    def write(self, text: str):
+        """Append free-form text to the text report."""
+        with self._lock:
+            self._text.write(text)
+
+    def add(self, run):
+        """Record the outcome of a check.
+
+        Args:
+            run (CheckRun): The check, its status and its text report entry.
+        """
+        check = run.check
+        scored = "Scored" if check.scored else "Not Scored"
+        with self._lock:
+            self._text.write(run.evidence)
+            self.rows.append([check.section, check.title, scored, run.status])
+
+    def set_costs(self, table: str):
+        """Set the cost table of the run, see `summary_table`."""
+        with self._lock:
+            self.costs = table
+
+    def flush(self):
+        """Write the reports. Later calls are no-ops."""
+        with self._lock:
+            if self._flushed:
+                return
+            self._flushed = True
+
+            _atomic_write(self.text_path, self._text.getvalue())
+
+            rows = io.StringIO()
+            csvwriter = csv.writer(rows)
+            csvwriter.writerow(self.csv_headers)
+            csvwriter.writerows(self.rows)
+            _atomic_write(self.csv_path, rows.getvalue())
+
+            if self.costs_path is not None and self.costs is not None:
+                _atomic_write(self.costs_path, self.costs)
+
+    def _on_signal(self, signum, frame):
+        # Unwind through __exit__ so the reports are flushed once
+        raise SystemExit(128 + signum)
+
+    def __enter__(self):
+        if threading.current_thread() is threading.main_thread():
+            self._previous_handler = signal.signal(signal.SIGTERM, self._on_signal)
+        return self
+
+    def __exit__(self, *exc_info):
+        if self._previous_handler is not None:
+            signal.signal(signal.SIGTERM, self._previous_handler)
+            self._previous_handler = None
+        self.flush()
+
+def check_record(run, host: str, started: str, include_evidence: bool = True) -> dict:
+    """JSON-serializable record of a completed check.
+
+    Args:
+        run (CheckRun): The outcome of the check.
+        host (str): Host the check ran on.
+        started (str): ISO 8601 start time of the run.
+        include_evidence (bool): Whether the record carries the evidence.
+    """
+    check = run.check
+    record = {
+        "host": host,
+        "started": started,
+        "section": check.section,
+        "title": check.title,
+        "scored": check.scored,
+        "status": run.status,
+        "duration": round(run.duration, 6),
+        "cpu_time": round(run.cpu_time, 6),
+        "peak_rss_delta": run.peak_rss_delta,
+    }
+    if include_evidence:
+        record["evidence"] = run.evidence
+    return record
+
+class JsonLinesSink:
+    """Streams one JSON record per completed check to a file.
+
+    Each line holds the host, the start time of the run, the section, title,
+    scored flag, status, duration, CPU time and peak RSS growth of the check,
+    and its evidence. Lines are flushed as they are written.
+
+    Args:
+        path (str): Path of the JSON Lines file, truncated when the sink
+        opens. "-" writes to the standard output.
+        include_evidence (bool): Whether records carry the evidence.
+        host (str): Host the records are about. Defaults to the checked host.
+    """
+    def __init__(self, path: str, include_evidence: bool = True, host: str = None):
+        self.path = path
+        self.include_evidence = include_evidence
+        self.host = host or hostname()
+        self.started = datetime.now(timezone.utc).isoformat(timespec="seconds")
+        self._file = None
+        self._lock = threading.Lock()
+
+    def add(self, run):
+        """Write the record of a completed check.
+
+        Args:
+            run (CheckRun): The outcome of the check.
+        """
+        line = json.dumps(check_record(run, self.host, self.started, self.include_evidence)) + "\n"
+        with self._lock:
+            self._file.write(line)
+            self._file.flush()
+
+    def __enter__(self):
+        self._file = console.stdout() if self.path == "-" else open(self.path, "w")
+        return self
+
+    def __exit__(self, *exc_info):
+        if self.path != "-":
+            self._file.close()
+        self._file = None
@@ -0,0 +1,225 @@
+"""
+===================
+systemd Unit States
+===================
+
+Works out what `systemctl is-enabled <unit>` would answer by reading the
+unit search path directly: the unit files, their drop-in directories and
+the `.wants/`, `.requires/` and `.upholds/` symlinks under /etc/systemd and
+/run/systemd. Every directory is listed once for all the units of interest,
+no process is forked and no bus is needed, so it works the same in minimal
+containers and against a system that is not running.
+
+See systemd.unit(5) and systemctl(1) for the search path and the states.
+"""
+
+import os
+
+from dataclasses import dataclass
+
+from .probes import list_dir, read_link, read_text
+
+CONFIG_DIR = "/etc/systemd/system"
+RUNTIME_DIR = "/run/systemd/system"
+TRANSIENT_DIR = "/run/systemd/transient"
+GENERATOR_DIRS = ("/run/systemd/generator.early", "/run/systemd/generator", "/run/systemd/generator.late")
+
+# Listed from highest to lowest priority; a unit file in an earlier
+# directory shadows the same unit file in a later one.
+UNIT_DIRS = (
+    TRANSIENT_DIR,
+    "/run/systemd/generator.early",
+    CONFIG_DIR,
+    RUNTIME_DIR,
+    "/run/systemd/generator",
+    "/usr/local/lib/systemd/system",
+    "/lib/systemd/system",
+    "/usr/lib/systemd/system",
+    "/run/systemd/generator.late",
+)
+
+# Directories whose symlinks pull a unit in, made by `systemctl enable`
+WANTS_SUFFIXES = (".wants", ".requires", ".upholds")
+
+NOT_FOUND = "not-found"
+
+MASKED_STATES = ("masked", "masked-runtime")
+
+@dataclass(frozen=True)
+class UnitState:
+    """Enablement state of a unit.
+
+    Attributes:
+        name (str): Full name of the unit (eg: autofs.service).
+        state (str): What `systemctl is-enabled` would print, or "not-found"
+        if no unit file exists.
+        path (str): Unit file the state was worked out from.
+        drop_ins (tuple[str, ...]): Drop-in files extending the unit, in the
+        order systemd applies them.
+    """
+    name: str
+    state: str
+    path: str = ""
+    drop_ins: tuple[str, ...] = ()
+
+    @property
+    def found(self) -> bool:
+        return self.state != NOT_FOUND
+
+    @property
+    def enabled(self) -> bool:
+        """Whether the unit is pulled in at boot by an `enable` symlink."""
+        return self.state in ("enabled", "enabled-runtime")
+
+    @property
+    def masked(self) -> bool:
+        return self.state in MASKED_STATES
+
+    def describe(self) -> str:
+        """The state, followed by the files it was worked out from."""
+        if not self.found:
+            return f"Failed to get unit file state for {self.name}: No such file or directory"
+        lines = [self.state]
+        if self.path:
+            lines.append(f"Loaded: {self.path}")
+        lines.extend(f"Drop-In: {path}" for path in self.drop_ins)
+        return "\n".join(lines)
+
+def unit_name(unit: str) -> str:
+    """Full name of `unit`, services may be named without their suffix (eg: autofs)."""
+    return unit if "." in unit else f"{unit}.service"
+
+def _template_name(name: str) -> str | None:
+    # getty@tty1.service -> getty@.service
+    prefix, at, rest = name.partition("@")
+    if not at or rest.startswith("."):
+        return None
+    return f"{prefix}@.{rest.rpartition('.')[2]}"
+
+def _install_section(text: str) -> dict[str, list[str]]:
+    install = {}
+    in_install = False
+    for line in text.splitlines():
+        line = line.strip()
+        if not line or line.startswith(("#", ";")):
+            continue
+        if line.startswith("["):
+            in_install = line == "[Install]"
+            continue
+        if in_install:
+            key, sep, value = line.partition("=")
+            if sep:
+                install.setdefault(key.strip(), []).extend(value.split())
+    return install
+
+class UnitResolver:
+    """Unit search path of a system, listed once.
+
+    Args:
+        root (str): Directory the system is found at, `/` for the running host.
+    """
+    def __init__(self, root: str = "/"):
+        self.root = root
+        self.listings = {directory: set(list_dir(self._host(directory)) or ()) for directory in UNIT_DIRS}
+        self.wanted = {CONFIG_DIR: set(), RUNTIME_DIR: set()}
+        for directory, wanted in self.wanted.items():
+            for name in self.listings[directory]:
+                if name.endswith(WANTS_SUFFIXES):
+                    wanted.update(list_dir(self._host(os.path.join(directory, name))) or ())
+
+    def _host(self, path: str) -> str:
+        return os.path.join(self.root, path.lstrip("/")) if self.root != "/" else path
+
+    def _fragment(self, name: str) -> tuple[str, str] | None:
+        for candidate in (name, _template_name(name)):
+            if candidate is None:
+                continue
+            for directory in UNIT_DIRS:
+                if candidate in self.listings[directory]:
+                    return directory, os.path.join(directory, candidate)
+        return None
+
+    def _drop_ins(self, name: str) -> tuple[str, ...]:
+        files = {}
+        for directory in UNIT_DIRS:
+            if f"{name}.d" not in self.listings[directory]:
+                continue
+            drop_in_dir = os.path.join(directory, f"{name}.d")
+            for conf in list_dir(self._host(drop_in_dir)) or ():
+                if conf.endswith(".conf") and conf not in files:
+                    files[conf] = os.path.join(drop_in_dir, conf)
+        # Drop-ins are applied in lexical order of their names
+        return tuple(files[conf] for conf in sorted(files))
+
+    def _enabled_state(self, name: str, aliases: list[str]) -> str | None:
+        # A template counts as enabled as soon as one of its instances is
+        prefix, at, suffix = name.partition("@.")
+        for directory, state in ((CONFIG_DIR, "enabled"), (RUNTIME_DIR, "enabled-runtime")):
+            wanted = self.wanted[directory]
+            if name in wanted or any(alias in self.listings[directory] for alias in aliases):
+                return state
+            if at and any(unit.startswith(f"{prefix}@") and unit.endswith(f".{suffix}") for unit in wanted):
+                return state
+        return None
+
+    def resolve(self, unit: str) -> UnitState:
+        """Work out what `systemctl is-enabled <unit>` would print."""
+        name = unit_name(unit)
+        fragment = self._fragment(name)
+        if fragment is None:
+            return UnitState(name, NOT_FOUND)
+        directory, path = fragment
+        drop_ins = self._drop_ins(name)
+
+        target = read_link(self._host(path))
+        if target is not None and not os.path.isabs(target):
+            target = os.path.normpath(os.path.join(directory, target))
+
+        if target == "/dev/null":
+            state = "masked-runtime" if directory.startswith("/run/") else "masked"
+            return UnitState(name, state, path, drop_ins)
+        if directory == TRANSIENT_DIR:
+            return UnitState(name, "transient", path, drop_ins)
+        if directory in GENERATOR_DIRS:
+            return UnitState(name, "generated", path, drop_ins)
+
+        linked = False
+        if target is not None:
+            if os.path.dirname(target) in UNIT_DIRS and os.path.basename(target) != os.path.basename(path):
+                return UnitState(name, "alias", path, drop_ins)
+            # A unit file outside the search path, made available by `systemctl link`
+            linked = os.path.dirname(target) not in UNIT_DIRS
+            path = target
+
+        text = read_text(self._host(path))
+        if text is None:
+            return UnitState(name, "bad", path, drop_ins)
+        install = _install_section(text)
+
+        state = self._enabled_state(name, install.get("Alias", []))
+        if state is None and linked:
+            state = "linked-runtime" if directory.startswith("/run/") else "linked"
+        if state is None:
+            if any(install.get(key) for key in ("WantedBy", "RequiredBy", "UpheldBy", "Alias")):
+                state = "disabled"
+            elif install.get("Also"):
+                state = "indirect"
+            else:
+                state = "static"
+        return UnitState(name, state, path, drop_ins)
+
+    def resolve_all(self, units) -> dict[str, UnitState]:
+        """Resolve every unit in `units`, keyed by the requested name."""
+        return {unit: self.resolve(unit) for unit in units}
+
+def read_unit_states(units, root: str = "/") -> dict[str, UnitState]:
+    """The enablement state of every unit in `units`, in one pass over the search path.
+
+    Args:
+        units (Iterable[str]): Units of interest, services may omit their suffix.
+        root (str): Directory the system is found at, `/` for the running host.
+
+    Returns:
+        dict[str, UnitState]: The states, keyed by the requested name.
+    """
+    return UnitResolver(root).resolve_all(units)
@@ -8,27 +8,57 @@ in accordance with the public CIS Distribution Indpendent
 Linux Benchmark v2.0.0
 """
 
-import subprocess
-import inspect
-import csv
+import os
 
+from . import console
+from .commands import effective_timeout
+from .executor import CheckRun, buffered_output, evidence, output_directory, output_file, routed_stdout, run_checks
+from .facts import Facts, collect_facts, refresh_facts
 from .pretty import pretty_print, pretty_underline
-from datetime import datetime
+from .registry import COMPLIANT, check, required_facts, select_checks, status
+from .report import JsonLinesSink, ReportSink, atomic_file, summary_table
+from .walker import WorldWritableScan, local_mount_points, scan_cache
+from contextlib import nullcontext
 
 OUTPUT_FILE = "unused_filesystems_output.txt"
 CSV_FILE = "unused_filesystems_output.csv"
+COSTS_FILE = "unused_filesystems_costs.txt"
+JSONL_FILE = "unused_filesystems_output.jsonl"
+WORLD_WRITABLE_FILE = "unused_filesystems_world_writable.txt"
+
+# Seconds between two full re-evaluations in watch mode, to catch what the
+# change monitor cannot see (eg: directories beyond the watch budget)
+WATCH_INTERVAL = 3600
+
+# World-writable directories listed in the report, the complete list goes
+# to WORLD_WRITABLE_FILE
+MAX_REPORTED_PATHS = 1000
 
 CSV_HEADERS = ["Section", "Section Name", "Scored", "Checklist"]
 
-with open(CSV_FILE, "w", newline='') as csvfile:
-    csvwriter = csv.writer(csvfile)
+_settings = {"world_writable_file": True}
 
-    csvwriter.writerow(CSV_HEADERS)
+def configure(world_writable_file: bool = True):
+    """Set how the checks write their side files.
+
+    Args:
+        world_writable_file (bool): Whether 1.1.21 writes the complete list of
+            world-writable directories to WORLD_WRITABLE_FILE. Callers for
+            which it is not a report (eg: the daemon) turn it off.
+    """
+    _settings["world_writable_file"] = world_writable_file
 
 # 1.1.1 Disable unused filesystems
 
 # 1.1.1.1 Ensure mounting of cramfs filesystems is disabled (Scored)
-def ensure_cramfs_disabled():
+@check(
+    section="1.1.1.1",
+    title="Ensure mounting of cramfs filesystems is disabled",
+    scored=True,
+    levels=("Level 1 - Server", "Level 1 - Workstation"),
+    facts=("modprobe", "loaded_modules"),
+)
+def ensure_cramfs_disabled(facts: Facts):
     """
     Profile Applicability:
     ----------------------
@@ -46,44 +76,26 @@ def ensure_cramfs_disabled():
     Removing support for unneeded filesystem types reduces the local attack surface of the
     server. If this filesystem type is not needed, disable it.
     """
-    section = "1.1.1.1"
-    section_name = "Ensure mounting of cramfs filesystems is disabled"
-    is_scored = True
     is_compliant = False
-
-    pretty_print("[1.1.1.1] Ensure mounting of cramfs filesystems is disabled (Scored)")
-    print()
     
     filesystem = 'cramfs'
 
-    modprobe_command = f'modprobe -n -v {filesystem}'
-    lsmod_command = f'lsmod | grep {filesystem}'
-
-    print(f"Running command: {modprobe_command}")
-    modprobe_result = subprocess.run(modprobe_command, shell=True, capture_output=True, text=True)
-    print(modprobe_result.stdout)
-    if modprobe_result.stderr:
-        print("Error:")
-        print(modprobe_result.stderr.strip())
-        pretty_underline(modprobe_result.stderr, "-")
-
-    print(f"Running command: {lsmod_command}")
-    lsmod_result = subprocess.run(lsmod_command, shell=True, capture_output=True, text=True)
-    print(lsmod_result.stdout)
-    if lsmod_result.stderr:
-        print("Error:")
-        print(lsmod_result.stderr.strip())
-        pretty_underline(lsmod_result.stderr, "-")
-
-    expected_output_modprobe = "insmod /lib/modules/6.5.0-35-generic/kernel/fs/cramfs/cramfs.ko"
-    
-    # insmod /lib/modules/6.5.O-35-generic/kernel/drivers/mtd/mtd.ko
-    # insmod /lib/modules/6.5.O-35-generic/kernel/fs/cramfs/cramfs.ko
+    modprobe_query = f'modprobe resolution of {filesystem}'
+    loaded_query = f'{filesystem} in /proc/modules'
+
+    print(f"Checking: {modprobe_query}")
+    modprobe_resolution = facts.modprobe_resolution(filesystem)
+    modprobe_output = modprobe_resolution.describe()
+    print(modprobe_output)
+
+    print(f"Checking: {loaded_query}")
+    loaded_output = facts.loaded_module(filesystem)
+    print(loaded_output)
 
-    modprobe_disabled = expected_output_modprobe in modprobe_result.stdout or not modprobe_result.stdout.strip()
-    lsmod_disabled = not lsmod_result.stdout.strip()
+    modprobe_disabled = modprobe_resolution.disabled
+    module_unloaded = not loaded_output.strip()
 
-    if modprobe_disabled and lsmod_disabled:
+    if modprobe_disabled and module_unloaded:
         print(f"{filesystem} filesystem mounting is disabled")
         is_compliant = True
     else:
@@ -91,33 +103,27 @@ def ensure_cramfs_disabled():
     print()
 
     # Output to .txt file
-    with open(OUTPUT_FILE, "a") as f:
+    with evidence() as f:
         f.write(f"Filesystem: {filesystem}\n")
         
-        f.write(f"Command Run: {modprobe_command}\n")
-        if modprobe_result.stderr:
-            f.write(f"Error:\n{modprobe_result.stderr}\n")
-        else:
-            f.write(f"{modprobe_result.stdout}\n")
+        f.write(f"Checked: {modprobe_query}\n")
+        f.write(f"{modprobe_output}\n")
 
-        f.write(f"Command Run: {lsmod_command}\n")
-        if lsmod_result.stderr:
-            f.write(f"Error:\n{lsmod_result.stderr}\n")
-        else:
-            f.write(f"{lsmod_result.stdout}\n")
+        f.write(f"Checked: {loaded_query}\n")
+        f.write(f"{loaded_output}\n")
         
         f.write("===============================\n\n")
 
-    # Output to .csv file
-    with open(CSV_FILE, "a", newline='') as csvfile:
-        csvwriter = csv.writer(csvfile)
-        scored = "Scored" if is_scored else "Not Scored"
-        compliant = "Compliant" if is_compliant else "Not Compliant"
-        row = [section, section_name, scored, compliant]
-
-        csvwriter.writerow(row)
+    return status(is_compliant)
 
-def ensure_freevxfs_disabled():
+@check(
+    section="1.1.1.2",
+    title="Ensure mounting of freevxfs filesystems is disabled",
+    scored=True,
+    levels=("Level 1 - Server", "Level 1 - Workstation"),
+    facts=("modprobe", "loaded_modules"),
+)
+def ensure_freevxfs_disabled(facts: Facts):
     """
     Profile Applicability:
     ----------------------
@@ -134,43 +140,27 @@ def ensure_freevxfs_disabled():
     Removing support for unneeded filesystem types reduces the local attack surface of the
     system. If this filesystem type is not needed, disable it.
     """
-    section = "1.1.1.2"
-    section_name = "Ensure mounting of freevxfs filesystems is disabled"
-    is_scored = True
     is_compliant = False
-
-    pretty_print("[1.1.1.2] Ensure mounting of freevxfs filesystems is disabled (Scored)")
-    print()
     
     filesystem = 'freevxfs'
 
-    modprobe_command = f'modprobe -n -v {filesystem}'
-    lsmod_command = f'lsmod | grep {filesystem}'
-
-    print(f"Running command: {modprobe_command}")
-    modprobe_result = subprocess.run(modprobe_command, shell=True, capture_output=True, text=True)
-    print(modprobe_result.stdout)
-    if modprobe_result.stderr:
-        print("Error:")
-        print(modprobe_result.stderr.strip())
-        pretty_underline(modprobe_result.stderr, "-")
-
-    print(f"Running command: {lsmod_command}")
-    lsmod_result = subprocess.run(lsmod_command, shell=True, capture_output=True, text=True)
-    print(lsmod_result.stdout)
-    if lsmod_result.stderr:
-        print("Error:")
-        print(lsmod_result.stderr.strip())
-        pretty_underline(lsmod_result.stderr, "-")
-    else:
-        pretty_underline(lsmod_result.stdout, "-")
+    modprobe_query = f'modprobe resolution of {filesystem}'
+    loaded_query = f'{filesystem} in /proc/modules'
+
+    print(f"Checking: {modprobe_query}")
+    modprobe_resolution = facts.modprobe_resolution(filesystem)
+    modprobe_output = modprobe_resolution.describe()
+    print(modprobe_output)
 
-    expected_output_modprobe = "insmod /lib/modules/6.5.0-35-generic/kernel/fs/freevxfs/freevxfs.ko"
+    print(f"Checking: {loaded_query}")
+    loaded_output = facts.loaded_module(filesystem)
+    print(loaded_output)
+    pretty_underline(loaded_output, "-")
 
-    modprobe_disabled = expected_output_modprobe in modprobe_result.stdout or not modprobe_result.stdout.strip()
-    lsmod_disabled = not lsmod_result.stdout.strip()
+    modprobe_disabled = modprobe_resolution.disabled
+    module_unloaded = not loaded_output.strip()
 
-    if modprobe_disabled and lsmod_disabled:
+    if modprobe_disabled and module_unloaded:
         print(f"{filesystem} filesystem mounting is disabled")
         is_compliant = True
     else:
@@ -178,33 +168,27 @@ def ensure_freevxfs_disabled():
     print()
 
     # Output to .txt file
-    with open(OUTPUT_FILE, "a") as f:
+    with evidence() as f:
         f.write(f"Filesystem: {filesystem}\n")
         
-        f.write(f"Command Run: {modprobe_command}\n")
-        if modprobe_result.stderr:
-            f.write(f"Error:\n{modprobe_result.stderr}\n")
-        else:
-            f.write(f"{modprobe_result.stdout}\n")
+        f.write(f"Checked: {modprobe_query}\n")
+        f.write(f"{modprobe_output}\n")
 
-        f.write(f"Command Run: {lsmod_command}\n")
-        if lsmod_result.stderr:
-            f.write(f"Error:\n{lsmod_result.stderr}\n")
-        else:
-            f.write(f"{lsmod_result.stdout}\n")
+        f.write(f"Checked: {loaded_query}\n")
+        f.write(f"{loaded_output}\n")
         
         f.write("===============================\n\n")
 
-    # Output to .csv file
-    with open(CSV_FILE, "a", newline='') as csvfile:
-        csvwriter = csv.writer(csvfile)
-        scored = "Scored" if is_scored else "Not Scored"
-        compliant = "Compliant" if is_compliant else "Not Compliant"
-        row = [section, section_name, scored, compliant]
+    return status(is_compliant)
 
-        csvwriter.writerow(row)
-
-def ensure_jffs2_disabled():
+@check(
+    section="1.1.1.3",
+    title="Ensure mounting of jffs2 filesystems is disabled",
+    scored=True,
+    levels=("Level 1 - Server", "Level 1 - Workstation"),
+    facts=("modprobe", "loaded_modules"),
+)
+def ensure_jffs2_disabled(facts: Facts):
     """
     Profile Applicability:
     ----------------------
@@ -221,43 +205,27 @@ def ensure_jffs2_disabled():
     Removing support for unneeded filesystem types reduces the local attack surface of the
     system. If this filesystem type is not needed, disable it.
     """
-    section = "1.1.1.3"
-    section_name = "Ensure mounting of jffs2 filesystems is disabled"
-    is_scored = True
     is_compliant = False
-
-    pretty_print("[1.1.1.3] Ensure mounting of jffs2 filesystems is disabled (Scored)")
-    print()
     
     filesystem = 'jffs2'
 
-    modprobe_command = f'modprobe -n -v {filesystem}'
-    lsmod_command = f'lsmod | grep {filesystem}'
-
-    print(f"Running command: {modprobe_command}")
-    modprobe_result = subprocess.run(modprobe_command, shell=True, capture_output=True, text=True)
-    print(modprobe_result.stdout)
-    if modprobe_result.stderr:
-        print("Error:")
-        print(modprobe_result.stderr.strip())
-        pretty_underline(modprobe_result.stderr, "-")
-
-    print(f"Running command: {lsmod_command}")
-    lsmod_result = subprocess.run(lsmod_command, shell=True, capture_output=True, text=True)
-    print(lsmod_result.stdout)
-    if lsmod_result.stderr:
-        print("Error:")
-        print(lsmod_result.stderr.strip())
-        pretty_underline(lsmod_result.stderr, "-")
-    else:
-        pretty_underline(lsmod_result.stdout, "-")
+    modprobe_query = f'modprobe resolution of {filesystem}'
+    loaded_query = f'{filesystem} in /proc/modules'
+
+    print(f"Checking: {modprobe_query}")
+    modprobe_resolution = facts.modprobe_resolution(filesystem)
+    modprobe_output = modprobe_resolution.describe()
+    print(modprobe_output)
 
-    expected_output_modprobe = "insmod /lib/modules/6.5.0-35-generic/kernel/fs/jffs2/jffs2.ko"
+    print(f"Checking: {loaded_query}")
+    loaded_output = facts.loaded_module(filesystem)
+    print(loaded_output)
+    pretty_underline(loaded_output, "-")
 
-    modprobe_disabled = expected_output_modprobe in modprobe_result.stdout or not modprobe_result.stdout.strip()
-    lsmod_disabled = not lsmod_result.stdout.strip()
+    modprobe_disabled = modprobe_resolution.disabled
+    module_unloaded = not loaded_output.strip()
 
-    if modprobe_disabled and lsmod_disabled:
+    if modprobe_disabled and module_unloaded:
         print(f"{filesystem} filesystem mounting is disabled")
         is_compliant = True
     else:
@@ -265,33 +233,27 @@ def ensure_jffs2_disabled():
     print()
 
     # Output to .txt file
-    with open(OUTPUT_FILE, "a") as f:
+    with evidence() as f:
         f.write(f"Filesystem: {filesystem}\n")
         
-        f.write(f"Command Run: {modprobe_command}\n")
-        if modprobe_result.stderr:
-            f.write(f"Error:\n{modprobe_result.stderr}\n")
-        else:
-            f.write(f"{modprobe_result.stdout}\n")
+        f.write(f"Checked: {modprobe_query}\n")
+        f.write(f"{modprobe_output}\n")
 
-        f.write(f"Command Run: {lsmod_command}\n")
-        if lsmod_result.stderr:
-            f.write(f"Error:\n{lsmod_result.stderr}\n")
-        else:
-            f.write(f"{lsmod_result.stdout}\n")
+        f.write(f"Checked: {loaded_query}\n")
+        f.write(f"{loaded_output}\n")
         
         f.write("===============================\n\n")
 
-    # Output to .csv file
-    with open(CSV_FILE, "a", newline='') as csvfile:
-        csvwriter = csv.writer(csvfile)
-        scored = "Scored" if is_scored else "Not Scored"
-        compliant = "Compliant" if is_compliant else "Not Compliant"
-        row = [section, section_name, scored, compliant]
+    return status(is_compliant)
 
-        csvwriter.writerow(row)
-
-def ensure_hfs_disabled():
+@check(
+    section="1.1.1.4",
+    title="Ensure mounting of hfs filesystems is disabled",
+    scored=True,
+    levels=("Level 1 - Server", "Level 1 - Workstation"),
+    facts=("modprobe", "loaded_modules"),
+)
+def ensure_hfs_disabled(facts: Facts):
     """
     Profile Applicability:
     ----------------------
@@ -308,76 +270,54 @@ def ensure_hfs_disabled():
     Removing support for unneeded filesystem types reduces the local attack surface of the
     system. If this filesystem type is not needed, disable it.
     """
-    section = "1.1.1.4"
-    section_name = "Ensure mounting of hfs filesystems is disabled"
-    is_scored = True
     is_compliant = False
-
-    pretty_print("[1.1.1.4] Ensure mounting of hfs filesystems is disabled (Scored)")
-    print()
     
     filesystem = 'hfs'
 
-    modprobe_command = f'modprobe -n -v {filesystem}'
-    lsmod_command = f'lsmod | grep {filesystem}'
-
-    print(f"Running command: {modprobe_command}")
-    modprobe_result = subprocess.run(modprobe_command, shell=True, capture_output=True, text=True)
-    print(modprobe_result.stdout)
-    if modprobe_result.stderr:
-        print("Error:")
-        print(modprobe_result.stderr.strip())
-        pretty_underline(modprobe_result.stderr, "-")
-
-    print(f"Running command: {lsmod_command}")
-    lsmod_result = subprocess.run(lsmod_command, shell=True, capture_output=True, text=True)
-    print(lsmod_result.stdout)
-    if lsmod_result.stderr:
-        print("Error:")
-        print(lsmod_result.stderr.strip())
-        pretty_underline(lsmod_result.stderr, "-")
-    else:
-        pretty_underline(lsmod_result.stdout, "-")
+    modprobe_query = f'modprobe resolution of {filesystem}'
+    loaded_query = f'{filesystem} in /proc/modules'
+
+    print(f"Checking: {modprobe_query}")
+    modprobe_resolution = facts.modprobe_resolution(filesystem)
+    modprobe_output = modprobe_resolution.describe()
+    print(modprobe_output)
 
-    expected_output_modprobe = "insmod /lib/modules/6.5.0-35-generic/kernel/fs/hfs/hfs.ko"
+    print(f"Checking: {loaded_query}")
+    loaded_output = facts.loaded_module(filesystem)
+    print(loaded_output)
+    pretty_underline(loaded_output, "-")
 
-    modprobe_disabled = expected_output_modprobe in modprobe_result.stdout or not modprobe_result.stdout.strip()
-    lsmod_disabled = not lsmod_result.stdout.strip()
+    modprobe_disabled = modprobe_resolution.disabled
+    module_unloaded = not loaded_output.strip()
 
-    if modprobe_disabled and lsmod_disabled:
+    if modprobe_disabled and module_unloaded:
         print(f"{filesystem} filesystem mounting is disabled")
         is_compliant = True
     else:
         print(f"{filesystem} filesystem mounting is not properly disabled.")
     print()
 
-    with open(OUTPUT_FILE, "a") as f:
+    with evidence() as f:
         f.write(f"Filesystem: {filesystem}\n")
         
-        f.write(f"Command Run: {modprobe_command}\n")
-        if modprobe_result.stderr:
-            f.write(f"Error:\n{modprobe_result.stderr}\n")
-        else:
-            f.write(f"{modprobe_result.stdout}\n")
+        f.write(f"Checked: {modprobe_query}\n")
+        f.write(f"{modprobe_output}\n")
 
-        f.write(f"Command Run: {lsmod_command}\n")
-        if lsmod_result.stderr:
-            f.write(f"Error:\n{lsmod_result.stderr}\n")
-        else:
-            f.write(f"{lsmod_result.stdout}\n")
+        f.write(f"Checked: {loaded_query}\n")
+        f.write(f"{loaded_output}\n")
         
         f.write("===============================\n\n")
 
-    # Output to .csv file
-    with open(CSV_FILE, "a", newline='') as csvfile:
-        csvwriter = csv.writer(csvfile)
-        scored = "Scored" if is_scored else "Not Scored"
-        compliant = "Compliant" if is_compliant else "Not Compliant"
-        row = [section, section_name, scored, compliant]
+    return status(is_compliant)
 
-        csvwriter.writerow(row)
-
-def ensure_hfsplus_disabled():
+@check(
+    section="1.1.1.5",
+    title="Ensure mounting of hfsplus filesystems is disabled",
+    scored=True,
+    levels=("Level 1 - Server", "Level 1 - Workstation"),
+    facts=("modprobe", "loaded_modules"),
+)
+def ensure_hfsplus_disabled(facts: Facts):
     """
     Profile Applicability:
     ----------------------
@@ -394,75 +334,53 @@ def ensure_hfsplus_disabled():
     Removing support for unneeded filesystem types reduces the local attack surface of the
     system. If this filesystem type is not needed, disable it.
     """
-    section = "1.1.1.5"
-    section_name = "Ensure mounting of hfsplus filesystems is disabled"
-    is_scored = True
-    is_compliant = False
-    pretty_print("[1.1.1.5] Ensure mounting of hfsplus filesystems is disabled (Scored)")
-    print()
-    
+    is_compliant = False    
     filesystem = 'hfsplus'
 
-    modprobe_command = f'modprobe -n -v {filesystem}'
-    lsmod_command = f'lsmod | grep {filesystem}'
-
-    print(f"Running command: {modprobe_command}")
-    modprobe_result = subprocess.run(modprobe_command, shell=True, capture_output=True, text=True)
-    print(modprobe_result.stdout)
-    if modprobe_result.stderr:
-        print("Error:")
-        print(modprobe_result.stderr.strip())
-        pretty_underline(modprobe_result.stderr, "-")
-
-    print(f"Running command: {lsmod_command}")
-    lsmod_result = subprocess.run(lsmod_command, shell=True, capture_output=True, text=True)
-    print(lsmod_result.stdout)
-    if lsmod_result.stderr:
-        print("Error:")
-        print(lsmod_result.stderr.strip())
-        pretty_underline(lsmod_result.stderr, "-")
-    else:
-        pretty_underline(lsmod_result.stdout, "-")
+    modprobe_query = f'modprobe resolution of {filesystem}'
+    loaded_query = f'{filesystem} in /proc/modules'
+
+    print(f"Checking: {modprobe_query}")
+    modprobe_resolution = facts.modprobe_resolution(filesystem)
+    modprobe_output = modprobe_resolution.describe()
+    print(modprobe_output)
 
-    expected_output_modprobe = "insmod /lib/modules/6.5.0-35-generic/kernel/fs/hfsplus/hfsplus.ko"
+    print(f"Checking: {loaded_query}")
+    loaded_output = facts.loaded_module(filesystem)
+    print(loaded_output)
+    pretty_underline(loaded_output, "-")
 
-    modprobe_disabled = expected_output_modprobe in modprobe_result.stdout or not modprobe_result.stdout.strip()
-    lsmod_disabled = not lsmod_result.stdout.strip()
+    modprobe_disabled = modprobe_resolution.disabled
+    module_unloaded = not loaded_output.strip()
 
-    if modprobe_disabled and lsmod_disabled:
+    if modprobe_disabled and module_unloaded:
         print(f"{filesystem} filesystem mounting is disabled")
         is_compliant = True
     else:
         print(f"{filesystem} filesystem mounting is not properly disabled.")
     print()
 
-    with open(OUTPUT_FILE, "a") as f:
+    with evidence() as f:
         f.write(f"Filesystem: {filesystem}\n")
         
-        f.write(f"Command Run: {modprobe_command}\n")
-        if modprobe_result.stderr:
-            f.write(f"Error:\n{modprobe_result.stderr}\n")
-        else:
-            f.write(f"{modprobe_result.stdout}\n")
+        f.write(f"Checked: {modprobe_query}\n")
+        f.write(f"{modprobe_output}\n")
 
-        f.write(f"Command Run: {lsmod_command}\n")
-        if lsmod_result.stderr:
-            f.write(f"Error:\n{lsmod_result.stderr}\n")
-        else:
-            f.write(f"{lsmod_result.stdout}\n")
+        f.write(f"Checked: {loaded_query}\n")
+        f.write(f"{loaded_output}\n")
         
         f.write("===============================\n\n")
 
-    # Output to .csv file
-    with open(CSV_FILE, "a", newline='') as csvfile:
-        csvwriter = csv.writer(csvfile)
-        scored = "Scored" if is_scored else "Not Scored"
-        compliant = "Compliant" if is_compliant else "Not Compliant"
-        row = [section, section_name, scored, compliant]
-
-        csvwriter.writerow(row)
+    return status(is_compliant)
 
-def ensure_squashfs_disabled():
+@check(
+    section="1.1.1.6",
+    title="Ensure mounting of squashfs filesystems is disabled",
+    scored=True,
+    levels=("Level 1 - Server", "Level 1 - Workstation"),
+    facts=("modprobe", "loaded_modules"),
+)
+def ensure_squashfs_disabled(facts: Facts):
     """
     Profile Applicability:
     ----------------------
@@ -480,75 +398,53 @@ def ensure_squashfs_disabled():
     Removing support for unneeded filesystem types reduces the local attack surface of the
     system. If this filesystem type is not needed, disable it.
     """
-    section = "1.1.1.6"
-    section_name = "Ensure mounting of squashfs filesystems is disabled"
-    is_scored = True
-    is_compliant = False
-    pretty_print("[1.1.1.6] Ensure mounting of squashfs filesystems is disabled (Scored)")
-    print()
-    
+    is_compliant = False    
     filesystem = 'squashfs'
 
-    modprobe_command = f'modprobe -n -v {filesystem}'
-    lsmod_command = f'lsmod | grep {filesystem}'
-
-    print(f"Running command: {modprobe_command}")
-    modprobe_result = subprocess.run(modprobe_command, shell=True, capture_output=True, text=True)
-    print(modprobe_result.stdout)
-    if modprobe_result.stderr:
-        print("Error:")
-        print(modprobe_result.stderr.strip())
-        pretty_underline(modprobe_result.stderr, "-")
-
-    print(f"Running command: {lsmod_command}")
-    lsmod_result = subprocess.run(lsmod_command, shell=True, capture_output=True, text=True)
-    print(lsmod_result.stdout)
-    if lsmod_result.stderr:
-        print("Error:")
-        print(lsmod_result.stderr.strip())
-        pretty_underline(lsmod_result.stderr, "-")
-    else:
-        pretty_underline(lsmod_result.stdout, "-")
+    modprobe_query = f'modprobe resolution of {filesystem}'
+    loaded_query = f'{filesystem} in /proc/modules'
 
-    expected_output_modprobe = "insmod /lib/modules/6.5.0-35-generic/kernel/fs/squashfs/squashfs.ko"
+    print(f"Checking: {modprobe_query}")
+    modprobe_resolution = facts.modprobe_resolution(filesystem)
+    modprobe_output = modprobe_resolution.describe()
+    print(modprobe_output)
 
-    modprobe_disabled = expected_output_modprobe in modprobe_result.stdout or not modprobe_result.stdout.strip()
-    lsmod_disabled = not lsmod_result.stdout.strip()
+    print(f"Checking: {loaded_query}")
+    loaded_output = facts.loaded_module(filesystem)
+    print(loaded_output)
+    pretty_underline(loaded_output, "-")
 
-    if modprobe_disabled and lsmod_disabled:
+    modprobe_disabled = modprobe_resolution.disabled
+    module_unloaded = not loaded_output.strip()
+
+    if modprobe_disabled and module_unloaded:
         print(f"{filesystem} filesystem mounting is disabled")
         is_compliant = True
     else:
         print(f"{filesystem} filesystem mounting is not properly disabled.")
     print()
 
-    with open(OUTPUT_FILE, "a") as f:
+    with evidence() as f:
         f.write(f"Filesystem: {filesystem}\n")
         
-        f.write(f"Command Run: {modprobe_command}\n")
-        if modprobe_result.stderr:
-            f.write(f"Error:\n{modprobe_result.stderr}\n")
-        else:
-            f.write(f"{modprobe_result.stdout}\n")
+        f.write(f"Checked: {modprobe_query}\n")
+        f.write(f"{modprobe_output}\n")
 
-        f.write(f"Command Run: {lsmod_command}\n")
-        if lsmod_result.stderr:
-            f.write(f"Error:\n{lsmod_result.stderr}\n")
-        else:
-            f.write(f"{lsmod_result.stdout}\n")
+        f.write(f"Checked: {loaded_query}\n")
+        f.write(f"{loaded_output}\n")
         
         f.write("===============================\n\n")
 
-    # Output to .csv file
-    with open(CSV_FILE, "a", newline='') as csvfile:
-        csvwriter = csv.writer(csvfile)
-        scored = "Scored" if is_scored else "Not Scored"
-        compliant = "Compliant" if is_compliant else "Not Compliant"
-        row = [section, section_name, scored, compliant]
+    return status(is_compliant)
 
-        csvwriter.writerow(row)
-
-def ensure_udf_disabled():
+@check(
+    section="1.1.1.7",
+    title="Ensure mounting of udf filesystems is disabled",
+    scored=True,
+    levels=("Level 1 - Server", "Level 1 - Workstation"),
+    facts=("modprobe", "loaded_modules"),
+)
+def ensure_udf_disabled(facts: Facts):
     """
     Profile Applicability:
     ----------------------
@@ -567,76 +463,54 @@ def ensure_udf_disabled():
     Removing support for unneeded filesystem types reduces the local attack surface of the
     system. If this filesystem type is not needed, disable it.
     """
-    section = "1.1.1.7"
-    section_name = "Ensure mounting of udf filesystems is disabled"
-    is_scored = True
-    is_compliant = False
-    pretty_print("[1.1.1.7] Ensure mounting of udf filesystems is disabled (Scored)")
-    print()
-    
+    is_compliant = False    
     filesystem = 'udf'
 
-    modprobe_command = f'modprobe -n -v {filesystem}'
-    lsmod_command = f'lsmod | grep {filesystem}'
-
-    print(f"Running command: {modprobe_command}")
-    modprobe_result = subprocess.run(modprobe_command, shell=True, capture_output=True, text=True)
-    print(modprobe_result.stdout)
-    if modprobe_result.stderr:
-        print("Error:")
-        print(modprobe_result.stderr.strip())
-        pretty_underline(modprobe_result.stderr, "-")
-
-    print(f"Running command: {lsmod_command}")
-    lsmod_result = subprocess.run(lsmod_command, shell=True, capture_output=True, text=True)
-    print(lsmod_result.stdout)
-    if lsmod_result.stderr:
-        print("Error:")
-        print(lsmod_result.stderr.strip())
-        pretty_underline(lsmod_result.stderr, "-")
-    else:
-        pretty_underline(lsmod_result.stdout, "-")
+    modprobe_query = f'modprobe resolution of {filesystem}'
+    loaded_query = f'{filesystem} in /proc/modules'
+
+    print(f"Checking: {modprobe_query}")
+    modprobe_resolution = facts.modprobe_resolution(filesystem)
+    modprobe_output = modprobe_resolution.describe()
+    print(modprobe_output)
 
-    expected_output_modprobe = "insmod /lib/modules/6.5.0-35-generic/kernel/fs/udf/udf.ko"
+    print(f"Checking: {loaded_query}")
+    loaded_output = facts.loaded_module(filesystem)
+    print(loaded_output)
+    pretty_underline(loaded_output, "-")
 
-    modprobe_disabled = expected_output_modprobe in modprobe_result.stdout or not modprobe_result.stdout.strip()
-    lsmod_disabled = not lsmod_result.stdout.strip()
+    modprobe_disabled = modprobe_resolution.disabled
+    module_unloaded = not loaded_output.strip()
 
-    if modprobe_disabled and lsmod_disabled:
+    if modprobe_disabled and module_unloaded:
         print(f"{filesystem} filesystem mounting is disabled")
         is_compliant = True
     else:
         print(f"{filesystem} filesystem mounting is not properly disabled.")
     print()
 
-    with open(OUTPUT_FILE, "a") as f:
+    with evidence() as f:
         f.write(f"Filesystem: {filesystem}\n")
         
-        f.write(f"Command Run: {modprobe_command}\n")
-        if modprobe_result.stderr:
-            f.write(f"Error:\n{modprobe_result.stderr}\n")
-        else:
-            f.write(f"{modprobe_result.stdout}\n")
+        f.write(f"Checked: {modprobe_query}\n")
+        f.write(f"{modprobe_output}\n")
 
-        f.write(f"Command Run: {lsmod_command}\n")
-        if lsmod_result.stderr:
-            f.write(f"Error:\n{lsmod_result.stderr}\n")
-        else:
-            f.write(f"{lsmod_result.stdout}\n")
+        f.write(f"Checked: {loaded_query}\n")
+        f.write(f"{loaded_output}\n")
         
         f.write("===============================\n\n")
 
-    # Output to .csv file
-    with open(CSV_FILE, "a", newline='') as csvfile:
-        csvwriter = csv.writer(csvfile)
-        scored = "Scored" if is_scored else "Not Scored"
-        compliant = "Compliant" if is_compliant else "Not Compliant"
-        row = [section, section_name, scored, compliant]
-
-        csvwriter.writerow(row)
+    return status(is_compliant)
 
 #TODO: Add check for UEFI
-def ensure_vfat_disabled():
+@check(
+    section="1.1.1.8",
+    title="Ensure mounting of vfat filesystems is disabled",
+    scored=True,
+    levels=("Level 1 - Server", "Level 1 - Workstation"),
+    facts=("modprobe", "loaded_modules"),
+)
+def ensure_vfat_disabled(facts: Facts):
     """
     Profile Applicability:
     ----------------------
@@ -654,76 +528,54 @@ def ensure_vfat_disabled():
     Removing support for unneeded filesystem types reduces the local attack surface of the
     system. If this filesystem type is not needed, disable it.
     """
-    section = "1.1.1.8"
-    section_name = "Ensure mounting of udf filesystems is disabled"
-    is_scored = True
-    is_compliant = False
-    pretty_print("[1.1.1.8] Ensure mounting of vfat filesystems is disabled (Scored)")
-    print()
-    
+    is_compliant = False    
     filesystem = 'vfat'
 
-    modprobe_command = f'modprobe -n -v {filesystem}'
-    lsmod_command = f'lsmod | grep {filesystem}'
-
-    print(f"Running command: {modprobe_command}")
-    modprobe_result = subprocess.run(modprobe_command, shell=True, capture_output=True, text=True)
-    print(modprobe_result.stdout)
-    if modprobe_result.stderr:
-        print("Error:")
-        print(modprobe_result.stderr.strip())
-        pretty_underline(modprobe_result.stderr, "-")
-
-    print(f"Running command: {lsmod_command}")
-    lsmod_result = subprocess.run(lsmod_command, shell=True, capture_output=True, text=True)
-    print(lsmod_result.stdout)
-    if lsmod_result.stderr:
-        print("Error:")
-        print(lsmod_result.stderr.strip())
-        pretty_underline(lsmod_result.stderr, "-")
-    else:
-        pretty_underline(lsmod_result.stdout, "-")
+    modprobe_query = f'modprobe resolution of {filesystem}'
+    loaded_query = f'{filesystem} in /proc/modules'
 
-    expected_output_modprobe = "insmod /lib/modules/6.5.0-35-generic/kernel/fs/vfat/vfat.ko"
+    print(f"Checking: {modprobe_query}")
+    modprobe_resolution = facts.modprobe_resolution(filesystem)
+    modprobe_output = modprobe_resolution.describe()
+    print(modprobe_output)
 
-    modprobe_disabled = expected_output_modprobe in modprobe_result.stdout or not modprobe_result.stdout.strip()
-    lsmod_disabled = not lsmod_result.stdout.strip()
+    print(f"Checking: {loaded_query}")
+    loaded_output = facts.loaded_module(filesystem)
+    print(loaded_output)
+    pretty_underline(loaded_output, "-")
 
-    if modprobe_disabled and lsmod_disabled:
+    modprobe_disabled = modprobe_resolution.disabled
+    module_unloaded = not loaded_output.strip()
+
+    if modprobe_disabled and module_unloaded:
         print(f"{filesystem} filesystem mounting is disabled")
         is_compliant = True
     else:
         print(f"{filesystem} filesystem mounting is not properly disabled.")
     print()
 
-    with open(OUTPUT_FILE, "a") as f:
+    with evidence() as f:
         f.write(f"Filesystem: {filesystem}\n")
         
-        f.write(f"Command Run: {modprobe_command}\n")
-        if modprobe_result.stderr:
-            f.write(f"Error:\n{modprobe_result.stderr}\n")
-        else:
-            f.write(f"{modprobe_result.stdout}\n")
+        f.write(f"Checked: {modprobe_query}\n")
+        f.write(f"{modprobe_output}\n")
 
-        f.write(f"Command Run: {lsmod_command}\n")
-        if lsmod_result.stderr:
-            f.write(f"Error:\n{lsmod_result.stderr}\n")
-        else:
-            f.write(f"{lsmod_result.stdout}\n")
+        f.write(f"Checked: {loaded_query}\n")
+        f.write(f"{loaded_output}\n")
         
         f.write("===============================\n\n")
     print()
 
-    # Output to .csv file
-    with open(CSV_FILE, "a", newline='') as csvfile:
-        csvwriter = csv.writer(csvfile)
-        scored = "Scored" if is_scored else "Not Scored"
-        compliant = "Compliant" if is_compliant else "Not Compliant"
-        row = [section, section_name, scored, compliant]
-
-        csvwriter.writerow(row)
+    return status(is_compliant)
 
-def ensure_tmp_configured():
+@check(
+    section="1.1.2",
+    title="Ensure /tmp is configured",
+    scored=True,
+    levels=("Level 1 - Server", "Level 1 - Workstation"),
+    facts=("mounts", "fstab", "unit_states"),
+)
+def ensure_tmp_configured(facts: Facts):
     """
     Profile Applicability:
     ----------------------
@@ -746,45 +598,34 @@ def ensure_tmp_configured():
     This can be accomplished by either mounting tmpfs to /tmp, or creating a separate
     partition for /tmp.
     """
-    section = "1.1.2"
-    section_name = "Ensure /tmp is configured"
-    is_scored = True
     is_compliant = False
 
-    configured = False
-
-    pretty_print("[1.1.2] Ensure /tmp is configured (Scored)")
-    print()    
-
-    with open(OUTPUT_FILE, "a") as f:
+    with evidence() as f:
         f.write(f"[1.1.2] Ensure /tmp is configured\n")
-        commands = [
-            "mount | grep -E '\s/tmp\s'",
-            "grep -E '\s/tmp\s' /etc/fstab | grep -E -v '^\s*#'",
-            "systemctl is-enabled tmp.mount"
-        ]
-
-        expected_outputs = [
-            "tmpfs on /tmp type tmpfs",
-            "tmpfs	/tmp	tmpfs",
-            "enabled"
-        ]
-        
-        for cmd in commands:
-            output = subprocess.run(cmd, shell=True, capture_output=True, text=True)
-            print(f"Command Run: {cmd}")
-            f.write(f"Command Run: {cmd}\n")
-
-            print(output.stdout)
-            f.write(f"{output.stdout}\n")
-            if output.stderr:
-                print(f"Error:\n{output.stderr}")
-                pretty_underline(output.stderr, "-")
-                f.write(f"Error:\n{output.stderr}\n")
-
-            for op in expected_outputs:
-                configured = configured or op in output.stdout
-        
+        tmp_mounts = facts.mounts_on("/tmp")
+        tmp_fstab_entries = facts.fstab_entries("/tmp")
+        tmp_mount_unit = facts.unit_states["tmp.mount"]
+        queries = {
+            "mounts on /tmp": "\n".join(str(mount) for mount in tmp_mounts),
+            "fstab entries for /tmp": "\n".join(str(entry) for entry in tmp_fstab_entries),
+            "unit state of tmp.mount": tmp_mount_unit.describe(),
+        }
+
+        for query, output in queries.items():
+            print(f"Checked: {query}")
+            f.write(f"Checked: {query}\n")
+
+            print(output)
+            f.write(f"{output}\n")
+
+        # Compare the parsed fields and the state itself rather than the text,
+        # "enabled" is a substring of "disabled"
+        configured = (
+            any(mount.fstype == "tmpfs" for mount in tmp_mounts)
+            or any(entry.fstype == "tmpfs" for entry in tmp_fstab_entries)
+            or tmp_mount_unit.enabled
+        )
+
         if configured:
             is_compliant = True
             print("/tmp is configured.")
@@ -796,17 +637,16 @@ def ensure_tmp_configured():
         f.write("===============================\n\n")
     print()
 
+    return status(is_compliant)
 
-    # Output to .csv file
-    with open(CSV_FILE, "a", newline='') as csvfile:
-        csvwriter = csv.writer(csvfile)
-        scored = "Scored" if is_scored else "Not Scored"
-        compliant = "Compliant" if is_compliant else "Not Compliant"
-        row = [section, section_name, scored, compliant]
-
-        csvwriter.writerow(row)
-
-def ensure_nodev_on_tmp():
+@check(
+    section="1.1.3",
+    title="Ensure nodev option set on /tmp partition",
+    scored=True,
+    levels=("Level 1 - Server", "Level 1 - Workstation"),
+    facts=("mounts",),
+)
+def ensure_nodev_on_tmp(facts: Facts):
     """
     Profile Applicability:
     ----------------------
@@ -822,32 +662,22 @@ def ensure_nodev_on_tmp():
     Since the `/tmp` filesystem is not intended to support devices, set this option to ensure that
     users cannot attempt to create block or character special devices in `/tmp`.
     """
-    section = "1.1.3"
-    section_name = "Ensure nodev option set on /tmp partition"
-    is_scored = True
     is_compliant = False
 
-    pretty_print("[1.1.3] Ensure nodev option set on /tmp partition (Scored)")
-    print()
-
-    cmd = "mount | grep -E '\s/tmp\s' | grep -v nodev"
+    query = "mounts on /tmp without nodev"
 
-    with open(OUTPUT_FILE, "a") as f:
+    with evidence() as f:
         f.write(f"[1.1.3] Ensure nodev option set on /tmp partition (Scored)\n")
 
-        output = subprocess.run(cmd, shell=True, capture_output=True, text=True)
-
-        print(f"Command Run: {cmd}")
-        f.write(f"Command Run: {cmd}\n")
+        output = "\n".join(str(mount) for mount in facts.mounts_on("/tmp") if not mount.has_option("nodev"))
 
-        print(output.stdout)
-        f.write(f"{output.stdout}\n")
+        print(f"Checked: {query}")
+        f.write(f"Checked: {query}\n")
 
-        if output.stderr:
-            print(f"Error:\n{output.stderr}")
-            f.write(f"Error:\n{output.stderr}\n")
+        print(output)
+        f.write(f"{output}\n")
 
-        if not output.stdout.strip():
+        if not output.strip():
             print("nodev option is set on /tmp partition.")
             f.write("nodev option is set on /tmp partition.\n")
             is_compliant = True
@@ -858,16 +688,16 @@ def ensure_nodev_on_tmp():
         f.write("===============================\n\n")
     print()
 
-    # Output to .csv file
-    with open(CSV_FILE, "a", newline='') as csvfile:
-        csvwriter = csv.writer(csvfile)
-        scored = "Scored" if is_scored else "Not Scored"
-        compliant = "Compliant" if is_compliant else "Not Compliant"
-        row = [section, section_name, scored, compliant]
+    return status(is_compliant)
 
-        csvwriter.writerow(row)
-
-def ensure_nosuid_on_tmp():
+@check(
+    section="1.1.4",
+    title="Ensure nosuid option set on /tmp partition",
+    scored=True,
+    levels=("Level 1 - Server", "Level 1 - Workstation"),
+    facts=("mounts",),
+)
+def ensure_nosuid_on_tmp(facts: Facts):
     """
     Profile Applicability:
     ----------------------
@@ -883,32 +713,22 @@ def ensure_nosuid_on_tmp():
     Since the `/tmp` filesystem is only intended for temporary file storage, set this option to
     ensure that users cannot create `setuid` files in `/tmp`.
     """
-    section = "1.1.4"
-    section_name = "Ensure nosuid option set on /tmp partition"
-    is_scored = True
     is_compliant = False
 
-    pretty_print("[1.1.4] Ensure nosuid option set on /tmp partition (Scored)")
-    print()
+    query = "mounts on /tmp without nosuid"
 
-    cmd = "mount | grep -E '\s/tmp\s' | grep -v nosuid"
-
-    with open(OUTPUT_FILE, "a") as f:
+    with evidence() as f:
         f.write(f"[1.1.4] Ensure nosuid option set on /tmp partition (Scored)\n")
 
-        output = subprocess.run(cmd, shell=True, capture_output=True, text=True)
-
-        print(f"Command Run: {cmd}")
-        f.write(f"Command Run: {cmd}\n")
+        output = "\n".join(str(mount) for mount in facts.mounts_on("/tmp") if not mount.has_option("nosuid"))
 
-        print(output.stdout)
-        f.write(f"{output.stdout}\n")
+        print(f"Checked: {query}")
+        f.write(f"Checked: {query}\n")
 
-        if output.stderr:
-            print(f"Error:\n{output.stderr}")
-            f.write(f"Error:\n{output.stderr}\n")
+        print(output)
+        f.write(f"{output}\n")
 
-        if not output.stdout.strip():
+        if not output.strip():
             is_compliant = True
             print("nosuid option is set on /tmp partition.")
             f.write("nosuid option is set on /tmp partition.\n")
@@ -919,15 +739,16 @@ def ensure_nosuid_on_tmp():
         f.write("===============================\n\n")
     print()
 
-    with open(CSV_FILE, "a", newline='') as csvfile:
-        csvwriter = csv.writer(csvfile)
-        scored = "Scored" if is_scored else "Not Scored"
-        compliant = "Compliant" if is_compliant else "Not Compliant"
-        row = [section, section_name, scored, compliant]
+    return status(is_compliant)
 
-        csvwriter.writerow(row)
-
-def ensure_noexec_on_tmp():
+@check(
+    section="1.1.5",
+    title="Ensure noexec option set on /tmp partition",
+    scored=True,
+    levels=("Level 1 - Server", "Level 1 - Workstation"),
+    facts=("mounts",),
+)
+def ensure_noexec_on_tmp(facts: Facts):
     """
     Profile Applicability:
     ----------------------
@@ -943,31 +764,22 @@ def ensure_noexec_on_tmp():
     Since the `/tmp` filesystem is only intended for temporary file storage, set this option to
     ensure that users cannot run executable binaries from `/tmp`.
     """
-    section = "1.1.5"
-    section_name = "Ensure noexec option set on /tmp partition"
-    is_scored = True
     is_compliant = False
-    pretty_print("[1.1.5] Ensure noexec option set on /tmp partition (Scored)")
-    print()
 
-    cmd = "mount | grep -E '\s/tmp\s' | grep -v noexec"
+    query = "mounts on /tmp without noexec"
 
-    with open(OUTPUT_FILE, "a") as f:
+    with evidence() as f:
         f.write(f"[1.1.5] Ensure noexec option set on /tmp partition (Scored)\n")
 
-        output = subprocess.run(cmd, shell=True, capture_output=True, text=True)
+        output = "\n".join(str(mount) for mount in facts.mounts_on("/tmp") if not mount.has_option("noexec"))
 
-        print(f"Command Run: {cmd}")
-        f.write(f"Command Run: {cmd}\n")
+        print(f"Checked: {query}")
+        f.write(f"Checked: {query}\n")
 
-        print(output.stdout)
-        f.write(f"{output.stdout}\n")
+        print(output)
+        f.write(f"{output}\n")
 
-        if output.stderr:
-            print(f"Error:\n{output.stderr}")
-            f.write(f"Error:\n{output.stderr}\n")
-
-        if not output.stdout.strip():
+        if not output.strip():
             is_compliant = True
             print("noexec option is set on /tmp partition.")
             f.write("noexec option is set on /tmp partition.\n")
@@ -978,15 +790,16 @@ def ensure_noexec_on_tmp():
         f.write("===============================\n\n")
     print()
 
-    with open(CSV_FILE, "a", newline='') as csvfile:
-        csvwriter = csv.writer(csvfile)
-        scored = "Scored" if is_scored else "Not Scored"
-        compliant = "Compliant" if is_compliant else "Not Compliant"
-        row = [section, section_name, scored, compliant]
-
-        csvwriter.writerow(row)
+    return status(is_compliant)
 
-def ensure_var_configured():
+@check(
+    section="1.1.6",
+    title="Ensure separate partition exists for /var",
+    scored=True,
+    levels=("Level 2 - Server", "Level 2 - Workstation"),
+    facts=("mounts",),
+)
+def ensure_var_configured(facts: Facts):
     """
     Profile Applicability:
     ----------------------
@@ -1003,33 +816,22 @@ def ensure_var_configured():
     Since the `/var` directory may contain world-writable files and directories, there is a risk of
     resource exhaustion if it is not bound to a separate partition.
     """
-    section = "1.1.6"
-    section_name = "Ensure separate partition exists for /var"
-    is_scored = True
     is_compliant = False
-    pretty_print("[1.1.6] Ensure separate partition exists for /var (Scored)")
-    print()
 
-    cmd = "mount | grep -E '\s/var\s'"
+    query = "mounts on /var"
 
-    expected_output = "/dev/xvdg1 on /var type ext4"
-
-    with open(OUTPUT_FILE, "a") as f:
+    with evidence() as f:
         f.write(f"[1.1.6] Ensure separate partition exists for /var (Scored)\n")
 
-        output = subprocess.run(cmd, shell=True, capture_output=True, text=True)
-
-        print(f"Command Run: {cmd}")
-        f.write(f"Command Run: {cmd}\n")
+        output = "\n".join(str(mount) for mount in facts.mounts_on("/var"))
 
-        print(output.stdout)
-        f.write(f"{output.stdout}\n")
+        print(f"Checked: {query}")
+        f.write(f"Checked: {query}\n")
 
-        if output.stderr:
-            print(f"Error:\n{output.stderr}")
-            f.write(f"Error:\n{output.stderr}\n")
+        print(output)
+        f.write(f"{output}\n")
 
-        if output.stdout.strip() in expected_output:
+        if output.strip():
             is_compliant = True
             print("/var is configured.")
             f.write("/var is configured.\n")
@@ -1040,17 +842,18 @@ def ensure_var_configured():
         f.write("===============================\n\n")
     print()
 
-    with open(CSV_FILE, "a", newline='') as csvfile:
-        csvwriter = csv.writer(csvfile)
-        scored = "Scored" if is_scored else "Not Scored"
-        compliant = "Compliant" if is_compliant else "Not Compliant"
-        row = [section, section_name, scored, compliant]
-
-        csvwriter.writerow(row)
+    return status(is_compliant)
 
 #TODO: Add 1.1.7 - 1.1.12
 
-def ensure_home_configured():
+@check(
+    section="1.1.13",
+    title="Ensure separate partition exists for /home",
+    scored=True,
+    levels=("Level 2 - Server", "Level 2 - Workstation"),
+    facts=("mounts",),
+)
+def ensure_home_configured(facts: Facts):
     """
     Profile Applicability:
     ----------------------
@@ -1067,33 +870,22 @@ def ensure_home_configured():
     directory to protect against resource exhaustion and restrict the type of files that can be
     stored under `/home`.
     """
-    section = "1.1.13"
-    section_name = "Ensure separate partition exists for /home"
-    is_scored = True
     is_compliant = False
-    pretty_print("[1.1.13] Ensure separate partition exists for /home (Scored)")
-    print()
 
-    cmd = "mount | grep /home"
+    query = "mounts on /home"
 
-    expected_output = "/dev/xvdf1 on /home type ext4"
-
-    with open(OUTPUT_FILE, "a") as f:
+    with evidence() as f:
         f.write(f"[1.1.13] Ensure separate partition exists for /home (Scored)\n")
 
-        output = subprocess.run(cmd, shell=True, capture_output=True, text=True)
-
-        print(f"Command Run: {cmd}")
-        f.write(f"Command Run: {cmd}\n")
+        output = "\n".join(str(mount) for mount in facts.mounts_on("/home"))
 
-        print(output.stdout)
-        f.write(f"{output.stdout}\n")
+        print(f"Checked: {query}")
+        f.write(f"Checked: {query}\n")
 
-        if output.stderr:
-            print(f"Error:\n{output.stderr}")
-            f.write(f"Error:\n{output.stderr}\n")
+        print(output)
+        f.write(f"{output}\n")
 
-        if output.stdout.strip() in expected_output:
+        if output.strip():
             is_compliant = True
             print("/home is configured.")
             f.write("/home is configured.\n")
@@ -1104,16 +896,16 @@ def ensure_home_configured():
         f.write("===============================\n\n")
     print()
 
+    return status(is_compliant)
 
-    with open(CSV_FILE, "a", newline='') as csvfile:
-        csvwriter = csv.writer(csvfile)
-        scored = "Scored" if is_scored else "Not Scored"
-        compliant = "Compliant" if is_compliant else "Not Compliant"
-        row = [section, section_name, scored, compliant]
-
-        csvwriter.writerow(row)
-
-def ensure_nodev_on_home():
+@check(
+    section="1.1.14",
+    title="Ensure nodev option set on /home partition",
+    scored=True,
+    levels=("Level 1 - Server", "Level 1 - Workstation"),
+    facts=("mounts",),
+)
+def ensure_nodev_on_home(facts: Facts):
     """
     Profile Applicability:
     ----------------------
@@ -1129,31 +921,22 @@ def ensure_nodev_on_home():
     Since the user partitions are not intended to support devices, set this option to ensure that
     users cannot attempt to create block or character special devices.
     """
-    section = "1.1.14"
-    section_name = "Ensure nodev option set on /home partition"
-    is_scored = True 
     is_compliant = False
-    pretty_print("[1.1.14] Ensure nodev option set on /home partition (Scored)")
-    print()
 
-    cmd = "mount | grep -E '\s/home\s' | grep -v nodev"
+    query = "mounts on /home without nodev"
 
-    with open(OUTPUT_FILE, "a") as f:
+    with evidence() as f:
         f.write(f"[1.1.14] Ensure nodev option set on /home partition (Scored)\n")
 
-        output = subprocess.run(cmd, shell=True, capture_output=True, text=True)
+        output = "\n".join(str(mount) for mount in facts.mounts_on("/home") if not mount.has_option("nodev"))
 
-        print(f"Command Run: {cmd}")
-        f.write(f"Command Run: {cmd}\n")
+        print(f"Checked: {query}")
+        f.write(f"Checked: {query}\n")
 
-        print(output.stdout)
-        f.write(f"{output.stdout}\n")
+        print(output)
+        f.write(f"{output}\n")
 
-        if output.stderr:
-            print(f"Error:\n{output.stderr}")
-            f.write(f"Error:\n{output.stderr}\n")
-
-        if not output.stdout.strip():
+        if not output.strip():
             is_compliant = True
             print("nodev option is set on /home partition.")
             f.write("nodev option is set on /home partition.\n")
@@ -1164,15 +947,16 @@ def ensure_nodev_on_home():
         f.write("===============================\n\n")
     print()
 
-    with open(CSV_FILE, "a", newline='') as csvfile:
-        csvwriter = csv.writer(csvfile)
-        scored = "Scored" if is_scored else "Not Scored"
-        compliant = "Compliant" if is_compliant else "Not Compliant"
-        row = [section, section_name, scored, compliant]
-
-        csvwriter.writerow(row)
+    return status(is_compliant)
 
-def ensure_nodev_on_dev_shm():
+@check(
+    section="1.1.15",
+    title="Ensure nodev option set on /dev/shm partition",
+    scored=True,
+    levels=("Level 1 - Server", "Level 1 - Workstation"),
+    facts=("mounts",),
+)
+def ensure_nodev_on_dev_shm(facts: Facts):
     """
     Profile Applicability:
     ----------------------
@@ -1188,32 +972,22 @@ def ensure_nodev_on_dev_shm():
     Since the `/dev/shm` filesystem is not intended to support devices, set this option to ensure
     that users cannot attempt to create special devices in `/dev/shm` partitions.
     """
-    section = "1.1.15"
-    section_name = "Ensure nodev option set on /dev/shm partition"
-    is_scored = True
     is_compliant = False
 
-    pretty_print("[1.1.15] Ensure nodev option set on /dev/shm partition (Scored)")
-    print()
-
-    cmd = "mount | grep -E '\s/dev/shm\s' | grep -v nodev"
+    query = "mounts on /dev/shm without nodev"
 
-    with open(OUTPUT_FILE, "a") as f:
+    with evidence() as f:
         f.write(f"[1.1.15] Ensure nodev option set on /dev/shm partition (Scored)\n")
 
-        output = subprocess.run(cmd, shell=True, capture_output=True, text=True)
+        output = "\n".join(str(mount) for mount in facts.mounts_on("/dev/shm") if not mount.has_option("nodev"))
 
-        print(f"Command Run: {cmd}")
-        f.write(f"Command Run: {cmd}\n")
+        print(f"Checked: {query}")
+        f.write(f"Checked: {query}\n")
 
-        print(output.stdout)
-        f.write(f"{output.stdout}\n")
+        print(output)
+        f.write(f"{output}\n")
 
-        if output.stderr:
-            print(f"Error:\n{output.stderr}")
-            f.write(f"Error:\n{output.stderr}\n")
-
-        if not output.stdout.strip():
+        if not output.strip():
             is_compliant = True
             print("nodev option is set on /dev/shm partition.")
             f.write("nodev option is set on /dev/shm partition.\n")
@@ -1224,15 +998,17 @@ def ensure_nodev_on_dev_shm():
         f.write("===============================\n\n")
     print()
     
-    with open(CSV_FILE, "a", newline='') as csvfile:
-        csvwriter = csv.writer(csvfile)
-        scored = "Scored" if is_scored else "Not Scored"
-        compliant = "Compliant" if is_compliant else "Not Compliant"
-        row = [section, section_name, scored, compliant]
 
-        csvwriter.writerow(row)
+    return status(is_compliant)
 
-def ensure_nosuid_on_dev_shm():
+@check(
+    section="1.1.16",
+    title="Ensure nosuid option set on /dev/shm partition",
+    scored=True,
+    levels=("Level 1 - Server", "Level 1 - Workstation"),
+    facts=("mounts",),
+)
+def ensure_nosuid_on_dev_shm(facts: Facts):
     """
     Profile Applicability:
     ----------------------
@@ -1248,31 +1024,22 @@ def ensure_nosuid_on_dev_shm():
     Setting this option on a file system prevents users from introducing privileged programs
     onto the system and allowing non-root users to execute them
     """
-    section = "1.1.16"
-    section_name = "Ensure nosuid option set on /dev/shm partition"
-    is_scored = True
     is_compliant = False
-    pretty_print("[1.1.16] Ensure nosuid option set on /dev/shm partition (Scored)")
-    print()
 
-    cmd = "mount | grep -E '\s/dev/shm\s' | grep -v nosuid"
+    query = "mounts on /dev/shm without nosuid"
 
-    with open(OUTPUT_FILE, "a") as f:
+    with evidence() as f:
         f.write(f"[1.1.16] Ensure nosuid option set on /dev/shm partition (Scored)\n")
 
-        output = subprocess.run(cmd, shell=True, capture_output=True, text=True)
+        output = "\n".join(str(mount) for mount in facts.mounts_on("/dev/shm") if not mount.has_option("nosuid"))
 
-        print(f"Command Run: {cmd}")
-        f.write(f"Command Run: {cmd}\n")
+        print(f"Checked: {query}")
+        f.write(f"Checked: {query}\n")
 
-        print(output.stdout)
-        f.write(f"{output.stdout}\n")
+        print(output)
+        f.write(f"{output}\n")
 
-        if output.stderr:
-            print(f"Error:\n{output.stderr}")
-            f.write(f"Error:\n{output.stderr}\n")
-
-        if not output.stdout.strip():
+        if not output.strip():
             is_compliant = True
             print("nosuid option is set on /dev/shm partition.")
             f.write("nosuid option is set on /dev/shm partition.\n")
@@ -1283,15 +1050,16 @@ def ensure_nosuid_on_dev_shm():
         f.write("===============================\n\n")
     print()
 
-    with open(CSV_FILE, "a", newline='') as csvfile:
-        csvwriter = csv.writer(csvfile)
-        scored = "Scored" if is_scored else "Not Scored"
-        compliant = "Compliant" if is_compliant else "Not Compliant"
-        row = [section, section_name, scored, compliant]
-
-        csvwriter.writerow(row)
+    return status(is_compliant)
 
-def ensure_noexec_on_dev_shm():
+@check(
+    section="1.1.17",
+    title="Ensure noexec option set on /dev/shm partition",
+    scored=True,
+    levels=("Level 1 - Server", "Level 1 - Workstation"),
+    facts=("mounts",),
+)
+def ensure_noexec_on_dev_shm(facts: Facts):
     """
     Profile Applicability:
     ----------------------
@@ -1307,32 +1075,22 @@ def ensure_noexec_on_dev_shm():
     Setting this option on a file system prevents users from executing programs from shared
     memory. This deters users from introducing potentially malicious software on the system.
     """
-    section = "1.1.17"
-    section_name = "Ensure noexec option set on /dev/shm partition"
-    is_scored = True
     is_compliant = False
 
-    pretty_print("[1.1.17] Ensure noexec option set on /dev/shm partition (Scored)")
-    print()
+    query = "mounts on /dev/shm without noexec"
 
-    cmd = "mount | grep -E '\s/dev/shm\s' | grep -v noexec"
-
-    with open(OUTPUT_FILE, "a") as f:
+    with evidence() as f:
         f.write(f"[1.1.17] Ensure noexec option set on /dev/shm partition (Scored)\n")
 
-        output = subprocess.run(cmd, shell=True, capture_output=True, text=True)
-
-        print(f"Command Run: {cmd}")
-        f.write(f"Command Run: {cmd}\n")
+        output = "\n".join(str(mount) for mount in facts.mounts_on("/dev/shm") if not mount.has_option("noexec"))
 
-        print(output.stdout)
-        f.write(f"{output.stdout}\n")
+        print(f"Checked: {query}")
+        f.write(f"Checked: {query}\n")
 
-        if output.stderr:
-            print(f"Error:\n{output.stderr}")
-            f.write(f"Error:\n{output.stderr}\n")
+        print(output)
+        f.write(f"{output}\n")
 
-        if not output.stdout.strip():
+        if not output.strip():
             is_compliant = True
             print("noexec option is set on /dev/shm partition.")
             f.write("noexec option is set on /dev/shm partition.\n")
@@ -1343,15 +1101,16 @@ def ensure_noexec_on_dev_shm():
         f.write("===============================\n\n")
     print()
 
-    with open(CSV_FILE, "a", newline='') as csvfile:
-        csvwriter = csv.writer(csvfile)
-        scored = "Scored" if is_scored else "Not Scored"
-        compliant = "Compliant" if is_compliant else "Not Compliant"
-        row = [section, section_name, scored, compliant]
+    return status(is_compliant)
 
-        csvwriter.writerow(row)
-
-def ensure_nodev_on_removable_media():
+@check(
+    section="1.1.18",
+    title="Ensure nodev option set on removable media partitions",
+    scored=False,
+    levels=("Level 1 - Server", "Level 1 - Workstation"),
+    facts=("mounts",),
+)
+def ensure_nodev_on_removable_media(facts: Facts):
     """
     Profile Applicability:
     ----------------------
@@ -1368,34 +1127,24 @@ def ensure_nodev_on_removable_media():
     circumvent security controls by allowing non-root users to access sensitive device files
     such as `/dev/kmem` or the raw disk partitions.
     """
-    section = "1.1.18"
-    section_name = "Ensure nodev option set on removable media partitions"
-    is_scored = False
     is_compliant = False
 
-    pretty_print("[1.1.18] Ensure nodev option set on removable media partitions (Not Scored)")
-    print()
-
-    cmd = "mount"
+    query = "all mounts"
 
-    with open(OUTPUT_FILE, "a") as f:
+    with evidence() as f:
         f.write(f"[1.1.18] Ensure nodev option set on removable media partitions (Not Scored)\n")
 
-        output = subprocess.run(cmd, shell=True, capture_output=True, text=True)
-
-        print(f"Command Run: {cmd}")
-        f.write(f"Command Run: {cmd}\n")
+        output = "\n".join(str(mount) for mount in facts.mounts)
 
-        print(output.stdout)
-        f.write(f"{output.stdout}\n")
+        print(f"Checked: {query}")
+        f.write(f"Checked: {query}\n")
 
-        if output.stderr:
-            print(f"Error:\n{output.stderr}")
-            f.write(f"Error:\n{output.stderr}\n")
+        print(output)
+        f.write(f"{output}\n")
 
-        if output.stdout:
-            for media in output.stdout.splitlines():
-                if not "nodev" in media:
+        if facts.mounts:
+            for media in facts.mounts:
+                if not media.has_option("nodev"):
                     print("nodev option is NOT set on the removable medias.")
                     f.write("nodev option is NOT set on the removable medias.\n")
                     break
@@ -1407,15 +1156,16 @@ def ensure_nodev_on_removable_media():
         f.write("===============================\n\n")
     print()
 
-    with open(CSV_FILE, "a", newline='') as csvfile:
-        csvwriter = csv.writer(csvfile)
-        scored = "Scored" if is_scored else "Not Scored"
-        compliant = "Compliant" if is_compliant else "Not Compliant"
-        row = [section, section_name, scored, compliant]
+    return status(is_compliant)
 
-        csvwriter.writerow(row)
-
-def ensure_nosuid_on_removable_media():
+@check(
+    section="1.1.19",
+    title="Ensure nosuid option set on removable media partitions",
+    scored=False,
+    levels=("Level 1 - Server", "Level 1 - Workstation"),
+    facts=("mounts",),
+)
+def ensure_nosuid_on_removable_media(facts: Facts):
     """
     Profile Applicability:
     ----------------------
@@ -1431,33 +1181,24 @@ def ensure_nosuid_on_removable_media():
     Run the following command and verify that the nosuid option is set on all removable media
     partitions.
     """
-    section = "1.1.19"
-    section_name = "Ensure nosuid option set on removable media partitions"
-    is_scored = False
     is_compliant = False
-    pretty_print("[1.1.19] Ensure nosuid option set on removable media partitions (Not Scored)")
-    print()
 
-    cmd = "mount"
+    query = "all mounts"
 
-    with open(OUTPUT_FILE, "a") as f:
+    with evidence() as f:
         f.write(f"[1.1.19] Ensure nosuid option set on removable media partitions (Not Scored)\n")
 
-        output = subprocess.run(cmd, shell=True, capture_output=True, text=True)
-
-        print(f"Command Run: {cmd}")
-        f.write(f"Command Run: {cmd}\n")
+        output = "\n".join(str(mount) for mount in facts.mounts)
 
-        print(output.stdout)
-        f.write(f"{output.stdout}\n")
+        print(f"Checked: {query}")
+        f.write(f"Checked: {query}\n")
 
-        if output.stderr:
-            print(f"Error:\n{output.stderr}")
-            f.write(f"Error:\n{output.stderr}\n")
+        print(output)
+        f.write(f"{output}\n")
 
-        if output.stdout:
-            for media in output.stdout.splitlines():
-                if not "nosuid" in media:
+        if facts.mounts:
+            for media in facts.mounts:
+                if not media.has_option("nosuid"):
                     print("nosuid option is NOT set on the removable medias.")
                     f.write("nosuid option is NOT set on the removable medias.\n")
                     break
@@ -1469,15 +1210,16 @@ def ensure_nosuid_on_removable_media():
         f.write("===============================\n\n")
     print()
 
-    with open(CSV_FILE, "a", newline='') as csvfile:
-        csvwriter = csv.writer(csvfile)
-        scored = "Scored" if is_scored else "Not Scored"
-        compliant = "Compliant" if is_compliant else "Not Compliant"
-        row = [section, section_name, scored, compliant]
+    return status(is_compliant)
 
-        csvwriter.writerow(row)
-
-def ensure_noexec_on_removable_media():
+@check(
+    section="1.1.20",
+    title="Ensure noexec option set on removable media partitions",
+    scored=False,
+    levels=("Level 1 - Server", "Level 1 - Workstation"),
+    facts=("mounts",),
+)
+def ensure_noexec_on_removable_media(facts: Facts):
     """
     Profile Applicability:
     ----------------------
@@ -1493,33 +1235,24 @@ def ensure_noexec_on_removable_media():
     Run the following command and verify that the noexec option is set on all removable media
     partitions.
     """
-    section = "1.1.20"
-    section_name = "Ensure noexec option set on removable media partitions"
-    is_scored = False
     is_compliant = False
-    pretty_print("[1.1.20] Ensure noexec option set on removable media partitions (Not Scored)")
-    print()
 
-    cmd = "mount"
+    query = "all mounts"
 
-    with open(OUTPUT_FILE, "a") as f:
+    with evidence() as f:
         f.write(f"[1.1.20] Ensure noexec option set on removable media partitions (Not Scored)\n")
 
-        output = subprocess.run(cmd, shell=True, capture_output=True, text=True)
+        output = "\n".join(str(mount) for mount in facts.mounts)
 
-        print(f"Command Run: {cmd}")
-        f.write(f"Command Run: {cmd}\n")
+        print(f"Checked: {query}")
+        f.write(f"Checked: {query}\n")
 
-        print(output.stdout)
-        f.write(f"{output.stdout}\n")
+        print(output)
+        f.write(f"{output}\n")
 
-        if output.stderr:
-            print(f"Error:\n{output.stderr}")
-            f.write(f"Error:\n{output.stderr}\n")
-
-        if output.stdout:
-            for media in output.stdout.splitlines():
-                if not "noexec" in media:
+        if facts.mounts:
+            for media in facts.mounts:
+                if not media.has_option("noexec"):
                     print("noexec option is NOT set on the removable medias.")
                     f.write("noexec option is NOT set on the removable medias.\n")
                     break
@@ -1531,15 +1264,16 @@ def ensure_noexec_on_removable_media():
         f.write("===============================\n\n")
     print()
 
-    with open(CSV_FILE, "a", newline='') as csvfile:
-        csvwriter = csv.writer(csvfile)
-        scored = "Scored" if is_scored else "Not Scored"
-        compliant = "Compliant" if is_compliant else "Not Compliant"
-        row = [section, section_name, scored, compliant]
-
-        csvwriter.writerow(row)
+    return status(is_compliant)
 
-def ensure_sticky_bit_on_world_writable_directories():
+@check(
+    section="1.1.21",
+    title="Ensure sticky bit is set on all world-writable directories",
+    scored=True,
+    levels=("Level 1 - Server", "Level 1 - Workstation"),
+    facts=("mounts", "directories"),
+)
+def ensure_sticky_bit_on_world_writable_directories(facts: Facts):
     """
     Profile Applicability:
     ----------------------
@@ -1556,31 +1290,60 @@ def ensure_sticky_bit_on_world_writable_directories():
     This feature prevents the ability to delete or rename files in world writable directories
     (such as `/tmp` ) that are owned by another user.
     """
-    section = "1.1.21"
-    section_name = "Ensure sticky bit is set on all world-writable directories"
-    is_scored = True
     is_compliant = False
-    pretty_print("[1.1.21] Ensure sticky bit is set on all world-writable directories (Scored)")
-    print()
 
-    cmd = "df --local -P | awk '{if (NR!=1) print $6}' | xargs -I '{}' find '{}' -xdev -type d \( -perm -0002 -a ! -perm -1000 \) 2>/dev/null"
+    roots = local_mount_points(facts.mounts)
 
-    with open(OUTPUT_FILE, "a") as f:
+    # The complete list replaces the previous one once the scan is over
+    paths = atomic_file(output_file(WORLD_WRITABLE_FILE)) if _settings["world_writable_file"] else nullcontext()
+    with evidence() as f, paths as paths_file:
         f.write(f"[1.1.21] Ensure sticky bit is set on all world-writable directories (Scored)\n")
 
-        output = subprocess.run(cmd, shell=True, capture_output=True, text=True)
-
-        print(f"Command Run: {cmd}")
-        f.write(f"Command Run: {cmd}\n")
-
-        print(output.stdout)
-        f.write(f"{output.stdout}\n")
-
-        if output.stderr:
-            print(f"Error:\n{output.stderr}")
-            f.write(f"Error:\n{output.stderr}\n")
-
-        if not output.stdout.strip():
+        print(f"Scanned: {' '.join(roots)}")
+        f.write(f"Scanned: {' '.join(roots)}\n")
+
+        # Stream the paths so that memory stays bounded on hosts with millions
+        # of offending directories, only the first ones go to the report
+        cache = scan_cache()
+        scan = WorldWritableScan(
+            [facts.host_path(root) for root in roots],
+            timeout=effective_timeout(None), cache=cache.load() if cache else None,
+            collect_state=cache is not None
+        )
+        found = 0
+        for path in scan:
+            path = facts.system_path(path)
+            found += 1
+            if paths_file is not None:
+                paths_file.write(f"{path}\n")
+            if found <= MAX_REPORTED_PATHS:
+                print(path)
+                f.write(f"{path}\n")
+
+        if found > MAX_REPORTED_PATHS:
+            more = f"... and {found - MAX_REPORTED_PATHS} more"
+            if paths_file is not None:
+                more += f", see {WORLD_WRITABLE_FILE}"
+            print(more)
+            f.write(f"{more}\n")
+        print()
+        f.write("\n")
+
+        if scan.errors:
+            print(f"{scan.errors} directories could not be read.")
+            f.write(f"{scan.errors} directories could not be read.\n")
+
+        if cache:
+            print(f"{scan.reused} of {scan.scanned} directory listings reused from {cache.path}.")
+            f.write(f"{scan.reused} of {scan.scanned} directory listings reused from {cache.path}.\n")
+            if not scan.timed_out:
+                cache.save(scan.state)
+
+        timed_out = scan.timed_out
+        if timed_out:
+            print(f"Scan timed out after {found} directories, the list above is partial.")
+            f.write(f"Scan timed out after {found} directories, the list above is partial.\n")
+        elif not found:
             is_compliant = True
             print("Sticky bit is set on all world-writable directories.")
             f.write("Sticky bit is set on all world-writable directories.\n")
@@ -1591,15 +1354,16 @@ def ensure_sticky_bit_on_world_writable_directories():
         f.write("===============================\n\n")
     print()
 
-    with open(CSV_FILE, "a", newline='') as csvfile:
-        csvwriter = csv.writer(csvfile)
-        scored = "Scored" if is_scored else "Not Scored"
-        compliant = "Compliant" if is_compliant else "Not Compliant"
-        row = [section, section_name, scored, compliant]
-
-        csvwriter.writerow(row)
+    return status(is_compliant, timed_out)
 
-def ensure_disabled_automounting():
+@check(
+    section="1.1.22",
+    title="Disable Automounting",
+    scored=True,
+    levels=("Level 1 - Server", "Level 2 - Workstation"),
+    facts=("unit_states",),
+)
+def ensure_disabled_automounting(facts: Facts):
     """
     Profile Applicability:
     ----------------------
@@ -1616,35 +1380,26 @@ def ensure_disabled_automounting():
     and have its contents available in system even if they lacked permissions to mount it
     themselves.
     """
-    section = "1.1.22"
-    section_name = "Disable Automounting"
-    is_scored = True
     is_compliant = False
-    pretty_print("[1.1.22] Disable Automounting (Scored)")
-    print()
-
-    cmd = "systemctl is-enabled autofs"
 
-    with open(OUTPUT_FILE, "a") as f:
+    with evidence() as f:
         f.write(f"[1.1.22] Disable Automounting (Scored)\n")
 
-        output = subprocess.run(cmd, shell=True, capture_output=True, text=True)
+        autofs = facts.unit_states["autofs"]
 
-        print(f"Command Run: {cmd}")
-        f.write(f"Command Run: {cmd}\n")
+        print(f"Checked: unit state of autofs")
+        f.write(f"Checked: unit state of autofs\n")
 
-        print(output.stdout)
-        f.write(f"{output.stdout}\n")
+        print(autofs.describe())
+        f.write(f"{autofs.describe()}\n")
 
-        if output.stderr:
-            print(f"Error:\n{output.stderr}\n\nAutomounting is disabled as autofs is not in service.")
-            pretty_underline(output.stderr, "-")
-            f.write(f"Error:\n{output.stderr}\n\nAutomounting is disabled as autofs is not in service.\n")
+        if not autofs.found:
+            print("Automounting is disabled as autofs is not in service.")
+            f.write("Automounting is disabled as autofs is not in service.\n")
             f.write("===============================\n\n")
             print()
-            return
-
-        if output.stdout.strip() == "disabled":
+            return status(True)
+        elif autofs.state == "disabled" or autofs.masked:
             is_compliant = True
             print("Automounting is disabled.")
             f.write("Automounting is disabled.\n")
@@ -1655,15 +1410,16 @@ def ensure_disabled_automounting():
         f.write("===============================\n\n")
     print()
 
-    with open(CSV_FILE, "a", newline='') as csvfile:
-        csvwriter = csv.writer(csvfile)
-        scored = "Scored" if is_scored else "Not Scored"
-        compliant = "Compliant" if is_compliant else "Not Compliant"
-        row = [section, section_name, scored, compliant]
-
-        csvwriter.writerow(row)
+    return status(is_compliant)
 
-def ensure_usb_storage_disabled():
+@check(
+    section="1.1.23",
+    title="Disable USB Storage",
+    scored=True,
+    levels=("Level 1 - Server", "Level 2 - Workstation"),
+    facts=("modprobe", "loaded_modules"),
+)
+def ensure_usb_storage_disabled(facts: Facts):
     """
     Profile Applicability:
     ----------------------
@@ -1682,57 +1438,35 @@ def ensure_usb_storage_disabled():
     Restricting USB access on the system will decrease the physical attack surface for a device
     and diminish the possible vectors to introduce malware.
     """
-    section = "1.1.23"
-    section_name = "Disabled USB Storage"
-    is_scored = True
-    is_compliant = False
-    pretty_print("[1.1.23] Disable USB Storage (Scored)")
-    print()
-    
+    is_compliant = False    
     filesystem = 'usb-storage'
 
-    modprobe_command = f'modprobe -n -v {filesystem}'
-    lsmod_command = f'lsmod | grep {filesystem}'
-
-    print(f"Running command: {modprobe_command}")
-    modprobe_result = subprocess.run(modprobe_command, shell=True, capture_output=True, text=True)
-    print(modprobe_result.stdout)
-    if modprobe_result.stderr:
-        print("Error:")
-        print(modprobe_result.stderr.strip())
-        pretty_underline(modprobe_result.stderr, "-")
-
-    print(f"Running command: {lsmod_command}")
-    lsmod_result = subprocess.run(lsmod_command, shell=True, capture_output=True, text=True)
-    print(lsmod_result.stdout)
-    if lsmod_result.stderr:
-        print("Error:")
-        print(lsmod_result.stderr.strip())
-        pretty_underline(lsmod_result.stderr, "-")
-    else:
-        pretty_underline(lsmod_result.stdout, "-")
+    modprobe_query = f'modprobe resolution of {filesystem}'
+    loaded_query = f'{filesystem} in /proc/modules'
+
+    print(f"Checking: {modprobe_query}")
+    modprobe_resolution = facts.modprobe_resolution(filesystem)
+    modprobe_output = modprobe_resolution.describe()
+    print(modprobe_output)
 
-    expected_output_modprobe = "insmod /lib/modules/6.5.0-35-generic/kernel/fs/storage/usb-storage.ko"
+    print(f"Checking: {loaded_query}")
+    loaded_output = facts.loaded_module(filesystem)
+    print(loaded_output)
+    pretty_underline(loaded_output, "-")
 
-    modprobe_disabled = expected_output_modprobe in modprobe_result.stdout or not modprobe_result.stdout.strip()
-    lsmod_disabled = not lsmod_result.stdout.strip()
+    modprobe_disabled = modprobe_resolution.disabled
+    module_unloaded = not loaded_output.strip()
 
-    with open(OUTPUT_FILE, "a") as f:
+    with evidence() as f:
         f.write(f"[1.1.23] Disable USB Storage (Scored)")
         
-        f.write(f"Command Run: {modprobe_command}\n")
-        if modprobe_result.stderr:
-            f.write(f"Error:\n{modprobe_result.stderr}\n")
-        else:
-            f.write(f"{modprobe_result.stdout}\n")
+        f.write(f"Checked: {modprobe_query}\n")
+        f.write(f"{modprobe_output}\n")
 
-        f.write(f"Command Run: {lsmod_command}\n")
-        if lsmod_result.stderr:
-            f.write(f"Error:\n{lsmod_result.stderr}\n")
-        else:
-            f.write(f"{lsmod_result.stdout}\n")
+        f.write(f"Checked: {loaded_query}\n")
+        f.write(f"{loaded_output}\n")
 
-        if modprobe_disabled and lsmod_disabled:
+        if modprobe_disabled and module_unloaded:
             is_compliant = True
             print(f"USB Access is restricted.")
             f.write("USB Access is restricted.\n")
@@ -1744,38 +1478,220 @@ def ensure_usb_storage_disabled():
         f.write("===============================\n\n")
     print()
 
-    with open(CSV_FILE, "a", newline='') as csvfile:
-        csvwriter = csv.writer(csvfile)
-        scored = "Scored" if is_scored else "Not Scored"
-        compliant = "Compliant" if is_compliant else "Not Compliant"
-        row = [section, section_name, scored, compliant]
-
-        csvwriter.writerow(row)
-
-def run():
-    with open(OUTPUT_FILE, "w") as f:
-        now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        f.write("CIS BENCHMARKING CHECKLIST\n")
-        f.write("==========================\n")
-        f.write(f"Starting @ {now}\n\n")
+    return status(is_compliant)
+
+def _log_result(run: CheckRun):
+    # Compliant checks only show up at the info level
+    level = console.INFO if run.status == COMPLIANT else console.WARNING
+    console.log(level, "[%s] %s: %s", run.check.section, run.check.title, run.status)
+
+def _on_complete(*sinks):
+    sinks = [sink for sink in sinks if sink is not None]
+    if not sinks:
+        return None
+
+    def on_complete(run):
+        for sink in sinks:
+            sink.add(run)
+    return on_complete
+
+def _write_header(report: ReportSink):
+    # No start time, a report whose checks did not change is not rewritten
+    report.write("CIS BENCHMARKING CHECKLIST\n")
+    report.write("==========================\n\n")
+
+def run(jobs: int = 1, sections: list[str] = None, level: int = None, profile: str = None,
+        jsonl_file: str = None, facts: Facts = None, root: str = "/", output_dir: str = None,
+        history_file: str = None, diff: bool = False) -> list[CheckRun]:
+    """Run the selected checks and write the reports.
+
+    Args:
+        jobs (int): Number of checks run at the same time.
+        sections (list[str]): Only run these sections and their subsections.
+        level (int): Only run checks of this profile level (1 or 2).
+        profile (str): Only run checks of this profile (server or workstation).
+        jsonl_file (str): Stream one JSON record per check to this file.
+        facts (Facts): Snapshot to check, collected from the host when None.
+        root (str): Directory the system to check is found at, `/` for the running host.
+        output_dir (str): Directory the reports are written to, relative
+        report paths included. Defaults to the current directory.
+        history_file (str): Store the results in this SQLite history
+        database, under the host name, or under `root` for another system.
+        diff (bool): Only print the status changes and new evidence lines
+        since the previous run stored in `history_file`. Everything is
+        printed when there is no previous run. The reports are complete.
+
+    Returns:
+        list[CheckRun]: The outcome of every check.
+    """
+    # Only imported when used, to keep listing the checks fast
+    from .history import HistorySink, format_changes
 
-    pretty_print("[1.1] Filesystem Configuration", upper_underline=True)
-    print()
+    shown = console.rendering()
+    if shown:
+        pretty_print("[1.1] Filesystem Configuration", upper_underline=True)
+        print()
 
-    # Get the current module
-    current_module = inspect.getmodule(inspect.currentframe())
-    
-    # Get all functions in the current module
-    # functions = inspect.getmembers(current_module, inspect.isfunction)
+    checks = select_checks(sections, level, profile)
+    runs = []
+
+    with output_directory(output_dir):
+        # Another system is named after its root, like in the history
+        host = root if root != "/" else None
+        stream = JsonLinesSink(output_file(jsonl_file), host=host) if jsonl_file else nullcontext()
+        records = JsonLinesSink("-", include_evidence=False, host=host) if console.json_output() else nullcontext()
+        history = HistorySink(history_file, host=host) if history_file else nullcontext()
+
+        report = ReportSink(output_file(OUTPUT_FILE), output_file(CSV_FILE), CSV_HEADERS, output_file(COSTS_FILE))
+        with report, stream, records, history:
+            _write_header(report)
+
+            # Snapshot the system once so that every check sees the same state
+            if facts is None:
+                facts = collect_facts(needs=required_facts(checks), root=root)
+
+            def on_result(run):
+                report.add(run)
+                runs.append(run)
+                if history_file:
+                    history.add(run)
+                if not console.rendering() and not console.json_output():
+                    _log_result(run)
+
+            with routed_stdout() if diff else nullcontext(), buffered_output() if diff else nullcontext() as output:
+                run_checks(
+                    checks, facts, jobs=jobs, on_result=on_result,
+                    on_complete=_on_complete(stream if jsonl_file else None, records if console.json_output() else None)
+                )
+
+                # What each check cost, to set time budgets and spot regressions
+                summary = summary_table(runs)
+                if shown:
+                    pretty_print("Check Costs")
+                    print(summary)
+                report.set_costs(summary)
+
+            if diff and shown:
+                changes = history.changes()
+                if changes is None:
+                    print(output.getvalue(), end="")
+                else:
+                    pretty_print("Changes Since The Previous Run")
+                    print(format_changes(changes))
+
+    console.info("%d of %d checks compliant", sum(run.status == COMPLIANT for run in runs), len(runs))
+    return runs
+
+def root_output_dirs(roots: list[str]) -> dict[str, str]:
+    """The directory `scan_roots` writes the reports of each root to.
+
+    Returns:
+        dict[str, str]: Directory by root, eg: /mnt/images/golden-22.04 ->
+        mnt_images_golden-22.04.
+
+    Raises:
+        ValueError: If two roots would write to the same directory (eg: /a/b_c
+            and /a_b/c).
+    """
+    output_dirs = {}
+    roots_by_dir = {}
+    for root in roots:
+        output_dir = root.strip("/").replace("/", "_") or "host"
+        if output_dir in roots_by_dir:
+            raise ValueError(f"{roots_by_dir[output_dir]} and {root} would both write their reports to {output_dir}")
+        roots_by_dir[output_dir] = root
+        output_dirs[root] = output_dir
+    return output_dirs
+
+def scan_roots(roots: list[str], jobs: int = 1, sections: list[str] = None, level: int = None,
+               profile: str = None, jsonl_file: str = None, history_file: str = None) -> dict[str, list[CheckRun]]:
+    """Check several systems found under `roots` (eg: mounted disk images) at the same time.
+
+    The reports of each root are written to a directory of the current
+    directory named after the root (see `root_output_dirs`). Their console
+    output is not shown, a summary line is printed as each root completes.
+
+    Args:
+        roots (list[str]): Directories the systems to check are found at.
+        jobs (int): Number of roots checked at the same time.
+
+    Returns:
+        dict[str, list[CheckRun]]: The outcome of every check, by root.
+
+    Raises:
+        ValueError: If two roots would write their reports to the same directory.
+    """
+    from concurrent.futures import ThreadPoolExecutor, as_completed
+
+    output_dirs = root_output_dirs(roots)
+    results = {}
+    with routed_stdout(), ThreadPoolExecutor(max_workers=max(jobs, 1)) as pool:
+        futures = {}
+        for root, output_dir in output_dirs.items():
+            os.makedirs(output_dir, exist_ok=True)
+            futures[pool.submit(_scan_root, root, output_dir, sections, level, profile, jsonl_file, history_file)] = (root, output_dir)
+        for future in as_completed(futures):
+            root, output_dir = futures[future]
+            runs = results[root] = future.result()
+            compliant = sum(run.status == COMPLIANT for run in runs)
+            console.info("%s: %d/%d compliant, reports in %s", root, compliant, len(runs), output_dir)
+    return {root: results[root] for root in roots}
+
+def _scan_root(root: str, output_dir: str, sections, level, profile, jsonl_file, history_file) -> list[CheckRun]:
+    with buffered_output():
+        return run(
+            sections=sections, level=level, profile=profile, jsonl_file=jsonl_file,
+            root=root, output_dir=output_dir, history_file=history_file
+        )
+
+def watch(jobs: int = 1, sections: list[str] = None, level: int = None, profile: str = None,
+          jsonl_file: str = None, interval: float = WATCH_INTERVAL):
+    """Evaluate the checks, then keep re-evaluating those affected by changes.
+
+    The facts are collected once. Afterwards only the facts reported changed
+    by the ChangeMonitor are collected again, and only the checks declaring
+    one of them run again. Every `interval` seconds all checks run again. The
+    reports are rewritten after every evaluation with the latest status of
+    every check, status changes are printed as they are detected. Runs until
+    interrupted.
+    """
+    from .monitor import ChangeMonitor, directory_watch_list
 
-    source_lines, _ = inspect.getsourcelines(current_module)
+    if console.rendering():
+        pretty_print("[1.1] Filesystem Configuration", upper_underline=True)
+        print()
 
-    functions = []
-    for line in source_lines:
-        if line.strip().startswith('def ensure'):
-            func_name = line.split('(')[0].replace('def ', '').strip()
-            functions.append(func_name)
+    checks = select_checks(sections, level, profile)
+    needs = required_facts(checks)
+    facts = collect_facts(needs=needs)
+
+    directories = []
+    if "directories" in needs:
+        directories = directory_watch_list(local_mount_points(facts.mounts))
+
+    latest = {}
+    stream = JsonLinesSink(jsonl_file) if jsonl_file else nullcontext()
+    records = JsonLinesSink("-", include_evidence=False) if console.json_output() else nullcontext()
+
+    def record(run):
+        previous = latest.get(run.check.section)
+        if previous is not None and previous.status != run.status:
+            console.warning("[%s] changed from %s to %s", run.check.section, previous.status, run.status)
+        latest[run.check.section] = run
+
+    with ChangeMonitor(directories) as monitor, stream, records:
+        on_complete = _on_complete(stream if jsonl_file else None, records if console.json_output() else None)
+        pending = checks
+        while True:
+            run_checks(pending, facts, jobs=jobs, on_result=record, on_complete=on_complete)
+            with ReportSink(OUTPUT_FILE, CSV_FILE, CSV_HEADERS) as report:
+                _write_header(report)
+                for c in checks:
+                    report.add(latest[c.section])
+
+            changed = monitor.wait(interval)
+            if changed is None:
+                changed = needs
+            refresh_facts(facts, changed)
+            pending = [c for c in checks if changed.intersection(c.facts)]
 
-    for func_name in functions:
-        func = getattr(current_module, func_name)
-        func()
\ No newline at end of file
@@ -0,0 +1,351 @@
+"""
+================
+Directory Walker
+================
+
+Native replacement for
+`df --local -P | xargs -I '{}' find '{}' -xdev -type d -perm -0002 ! -perm -1000`.
+
+The local filesystems are walked with `os.scandir` on a pool of worker
+threads sharing one queue of directories, so that many mounts and subtrees
+are scanned at the same time. Like `find -xdev`, the walk never leaves the
+device of the mount it started from. Offending paths are handed to the
+caller as soon as they are found.
+
+With a ScanCache the scan is incremental: a directory whose inode and mtime
+did not change since the previous run has the same entries, so only its
+known subdirectories are lstat'ed instead of reading it again.
+
+The walk is a probe: the paths it finds are added to the archive being
+recorded, and taken from the archive being replayed without walking.
+"""
+
+import gzip
+import json
+import os
+import queue
+import stat
+import tempfile
+import threading
+import time
+
+from . import probes
+from .mountinfo import MountTable
+
+# Seconds after which ScanCache forces a full scan
+FULL_RESCAN_INTERVAL = 7 * 24 * 60 * 60
+
+CACHE_VERSION = 1
+
+_settings = {"cache_file": None, "full_rescan": False}
+
+# Filesystems `df --local` leaves out, either remote or without backing storage
+REMOTE_FSTYPES = frozenset((
+    "nfs", "nfs4", "cifs", "smb3", "smbfs", "ncpfs", "afs", "coda", "9p",
+    "ceph", "glusterfs", "lustre", "gpfs", "fuse.sshfs", "fuse.glusterfs",
+))
+PSEUDO_FSTYPES = frozenset((
+    "proc", "sysfs", "cgroup", "cgroup2", "devpts", "securityfs", "debugfs",
+    "tracefs", "pstore", "bpf", "mqueue", "hugetlbfs", "configfs", "fusectl",
+    "binfmt_misc", "autofs", "efivarfs", "rpc_pipefs", "nsfs", "selinuxfs",
+))
+
+def local_mount_points(mounts: MountTable) -> list[str]:
+    """Mount points of the local filesystems.
+
+    A bind mount is skipped when the subtree it shows is already walked
+    from another mount of the same device (eg: the mount of the filesystem
+    root), and so are mounts hidden by another mount on the same mount
+    point, so no directory is scanned twice. Binds of separate subtrees of
+    a device (eg: container volumes) are all kept.
+    """
+    entries = [
+        entry for entry in mounts
+        if entry.fstype not in REMOTE_FSTYPES and entry.fstype not in PSEUDO_FSTYPES
+        # Skip mounts hidden under another one stacked on the same mount point
+        and mounts.get(entry.mount_point) is entry
+    ]
+    # Shallowest subtree first, so that a bind of a nested subtree comes
+    # after the mount it is part of
+    entries.sort(key=lambda entry: (entry.root.rstrip("/").count("/"), entry.root, entry.mount_point))
+    kept, mount_points = {}, []
+    for entry in entries:
+        roots = kept.setdefault(entry.device, [])
+        if any(entry.root == root or entry.root.startswith(root.rstrip("/") + "/") for root in roots):
+            continue
+        roots.append(entry.root)
+        mount_points.append(entry.mount_point)
+    return sorted(mount_points)
+
+def is_world_writable_without_sticky(mode: int) -> bool:
+    return stat.S_ISDIR(mode) and bool(mode & stat.S_IWOTH) and not mode & stat.S_ISVTX
+
+class WorldWritableScan:
+    """Iterates over the world-writable directories without the sticky bit.
+
+    Args:
+        roots (list[str]): Directories to walk, each without leaving its device.
+        A root nested in another one is only walked once, from itself.
+        workers (int): Number of threads scanning directories. Defaults to the
+        ThreadPoolExecutor default of min(32, cpu count + 4).
+        timeout (float | None): Seconds the scan may run.
+        cache (dict): Directory state of a previous scan, see ScanCache. The
+        subdirectories of a directory whose inode and mtime did not change
+        are taken from it instead of reading the directory again.
+        collect_state (bool): Keep the directory state of this scan in
+        `state`, for a ScanCache. It holds an entry per directory, so memory
+        is only bounded without it.
+
+    After iteration, `scanned` holds the number of directories read,
+    `reused` the number whose listing came from the cache, `errors` the
+    number that could not be read and `timed_out` whether the scan ran out
+    of time. With `collect_state`, `state` holds the directory state to cache
+    for the next scan.
+    """
+    def __init__(self, roots: list[str], workers: int = None, timeout: float | None = None, cache: dict = None,
+                 collect_state: bool = False):
+        self.roots = roots
+        self._roots = set(roots)
+        self.workers = workers or min(32, (os.cpu_count() or 1) + 4)
+        self.timeout = timeout
+        self.cache = cache or {}
+        self.collect_state = collect_state
+        self.state = {}
+        self.scanned = 0
+        self.reused = 0
+        self.errors = 0
+        self.timed_out = False
+
+        self._dirs = queue.Queue()
+        self._found = queue.Queue(maxsize=10000)
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        # Directories changed this close to the start of the scan may change
+        # again within the same timestamp tick, their listing is not cached
+        self._settled_ns = time.time_ns() - 2 * 10 ** 9
+
+    def _subdirectories(self, path: str, st: os.stat_result):
+        """(name, path, lstat) of the subdirectories of `path` and whether the
+        listing came from the cache."""
+        cached = self.cache.get(path)
+        if cached is not None and cached[0] == st.st_ino and cached[1] == st.st_mtime_ns:
+            # Entries were neither added nor removed, but a subdirectory may
+            # have been chmod'ed, so each one is still lstat'ed
+            subdirs = []
+            for name in cached[2]:
+                child = os.path.join(path, name)
+                try:
+                    child_st = os.lstat(child)
+                except OSError:
+                    continue
+                if stat.S_ISDIR(child_st.st_mode):
+                    subdirs.append((name, child, child_st))
+            return subdirs, True
+
+        subdirs = []
+        with os.scandir(path) as entries:
+            for entry in entries:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        subdirs.append((entry.name, entry.path, entry.stat(follow_symlinks=False)))
+                except OSError:
+                    continue
+        return subdirs, False
+
+    def _scan(self, path: str, st: os.stat_result, device: int):
+        # Walk depth-first on a local stack and only hand subtrees over to the
+        # shared queue when other workers are running out of work
+        stack = [(path, st)]
+        scanned = reused = errors = 0
+        while stack and not self._stop.is_set():
+            path, st = stack.pop()
+            try:
+                subdirs, from_cache = self._subdirectories(path, st)
+            except OSError:
+                errors += 1
+                continue
+            scanned += 1
+            reused += from_cache
+
+            if self.collect_state and st.st_mtime_ns < self._settled_ns:
+                self.state[path] = (st.st_ino, st.st_mtime_ns, [name for name, _, _ in subdirs])
+
+            for _, child, child_st in subdirs:
+                # Nested roots only differ in device on a live system, not
+                # in a sysroot or fixture, so they are skipped explicitly
+                if child_st.st_dev != device or child in self._roots:
+                    continue
+                if is_world_writable_without_sticky(child_st.st_mode):
+                    self._found.put(child)
+                if self._dirs.qsize() < self.workers:
+                    self._dirs.put((child, child_st, device))
+                else:
+                    stack.append((child, child_st))
+        with self._lock:
+            self.scanned += scanned
+            self.reused += reused
+            self.errors += errors
+
+    def _work(self):
+        while True:
+            item = self._dirs.get()
+            try:
+                if item is None:
+                    return
+                if not self._stop.is_set():
+                    self._scan(*item)
+            finally:
+                self._dirs.task_done()
+
+    def _seed(self):
+        for root in self.roots:
+            try:
+                st = os.lstat(root)
+            except OSError:
+                with self._lock:
+                    self.errors += 1
+                continue
+            # Bind mounts of files (eg: /etc/resolv.conf in a container) have nothing to walk
+            if not stat.S_ISDIR(st.st_mode):
+                continue
+            if is_world_writable_without_sticky(st.st_mode):
+                self._found.put(root)
+            self._dirs.put((root, st, st.st_dev))
+
+    def _wait_until_drained(self):
+        self._dirs.join()
+        self._drained.set()
+
+    def _shutdown(self, threads: list[threading.Thread]):
+        self._stop.set()
+        for _ in threads:
+            self._dirs.put(None)
+        # Unblock workers waiting on a full result queue
+        while any(thread.is_alive() for thread in threads):
+            try:
+                self._found.get(timeout=0.05)
+            except queue.Empty:
+                pass
+        # Settle what is left so the drain waiter exits too
+        while True:
+            try:
+                self._dirs.get_nowait()
+            except queue.Empty:
+                break
+            self._dirs.task_done()
+
+    def __iter__(self):
+        key = json.dumps(self.roots)
+        archive = probes.replaying()
+        if archive is not None:
+            # An unrecorded walk fails as if no root could be read
+            walk = archive.walks.get(key, {"paths": [], "errors": len(self.roots), "timed_out": False})
+            self.errors = walk["errors"]
+            self.timed_out = walk["timed_out"]
+            yield from walk["paths"]
+            return
+
+        archive = probes.recording()
+        if archive is None:
+            yield from self._walk()
+            return
+        found = []
+        try:
+            for path in self._walk():
+                found.append(path)
+                yield path
+        finally:
+            archive.walks[key] = {"paths": found, "errors": self.errors, "timed_out": self.timed_out}
+
+    def _walk(self):
+        end = time.monotonic() + self.timeout if self.timeout is not None else None
+        threads = [threading.Thread(target=self._work, daemon=True) for _ in range(self.workers)]
+        for thread in threads:
+            thread.start()
+        self._drained = threading.Event()
+        self._seed()
+        threading.Thread(target=self._wait_until_drained, daemon=True).start()
+
+        try:
+            while True:
+                remaining = end - time.monotonic() if end is not None else None
+                if remaining is not None and remaining <= 0:
+                    self.timed_out = True
+                    return
+                try:
+                    yield self._found.get(timeout=min(remaining, 0.1) if remaining is not None else 0.1)
+                except queue.Empty:
+                    if self._drained.is_set() and self._found.empty():
+                        return
+        finally:
+            # Also reached on timeout or when the caller stops early
+            self._shutdown(threads)
+
+class ScanCache:
+    """Directory state persisted between scans.
+
+    For every directory it keeps the inode, the mtime and the names of the
+    subdirectories, which is what a later scan needs to skip reading the
+    directories that did not change. The state is dropped, and a full scan
+    forced, once it is older than `max_age` seconds.
+
+    Args:
+        path (str): Path of the gzip-compressed JSON cache file.
+        max_age (float): Seconds after which a full scan is forced.
+        full_rescan (bool): Ignore the cached state for this run.
+    """
+    def __init__(self, path: str, max_age: float = FULL_RESCAN_INTERVAL, full_rescan: bool = False):
+        self.path = path
+        self.max_age = max_age
+        self.full_rescan = full_rescan
+        self.full_scan_at = None
+
+    def load(self) -> dict:
+        """The cached directory state, empty if a full scan is due."""
+        if self.full_rescan:
+            return {}
+        try:
+            with gzip.open(self.path, "rt") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if data.get("version") != CACHE_VERSION or time.time() - data.get("full_scan_at", 0) > self.max_age:
+            return {}
+        self.full_scan_at = data["full_scan_at"]
+        return {path: tuple(entry) for path, entry in data["dirs"].items()}
+
+    def save(self, state: dict):
+        """Persist the state of a completed scan, atomically."""
+        data = {
+            "version": CACHE_VERSION,
+            # A scan started from an empty cache read every directory
+            "full_scan_at": self.full_scan_at or time.time(),
+            "dirs": state,
+        }
+        # A temporary file of its own, so that concurrent runs cannot clobber it
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(self.path)}.")
+        try:
+            with os.fdopen(fd, "wb") as raw, gzip.open(raw, "wt") as f:
+                json.dump(data, f, separators=(",", ":"))
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+def configure_cache(cache_file: str = None, full_rescan: bool = False):
+    """Enable the incremental scan with the cache at `cache_file`.
+
+    Args:
+        cache_file (str): Path of the cache, None disables it.
+        full_rescan (bool): Ignore the cached state for this run.
+    """
+    _settings["cache_file"] = cache_file
+    _settings["full_rescan"] = full_rescan
+
+def scan_cache() -> ScanCache | None:
+    """The configured cache, if any. None when replaying, as there is no
+    directory state to cache."""
+    if _settings["cache_file"] is None or probes.replaying() is not None:
+        return None
+    return ScanCache(_settings["cache_file"], full_rescan=_settings["full_rescan"])